@@ -0,0 +1,7 @@
+#!/bin/sh
+# Usage:
+#   ./benchmark.sh [--scale 0.1] [--output results.json] [--compare baseline.json] [benchmark ...]
+set -e
+cd `dirname $0`
+
+PYTHONPATH=. python -m benchmarks.run "$@"
@@ -0,0 +1,207 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tracemalloc
+from time import perf_counter
+from marketsim import Market, Order, Side, TimeOrderQueue, OrderEntry
+from marketsim.replay import PLACE
+from marketsim.stats import percentile
+from benchmarks import workloads
+
+# Usage:
+#   python -m benchmarks.run [--scale 0.1] [--output results.json] [--compare baseline.json] [benchmark ...]
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, op, func, *args):
+        start = perf_counter()
+        result = func(*args)
+        self.samples.setdefault(op, []).append(perf_counter() - start)
+        return result
+
+def summarize(samples):
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        'count': len(samples),
+        'total_seconds': total,
+        'ops_per_second': len(samples) / total if total > 0 else None,
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p90_us': percentile(samples, 90) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+        'max_us': samples[-1] * 1e6,
+    }
+
+def scaled(n, scale):
+    return max(1, int(n * scale))
+
+def bench_deep_book(recorder, seed, scale):
+    market = Market()
+    orders = workloads.deep_book(seed, levels=scaled(1000, scale))
+    for order in orders:
+        recorder.time('place', market.place, order)
+
+    product = market['DEEP']
+    for _ in range(scaled(100, scale)):
+        recorder.time('get_order_book', product[Side.BUY].get_order_book)
+        recorder.time('get_order_book', product[Side.SELL].get_order_book)
+
+    # Sweep the top of the book with crossing limit orders
+    for i in range(scaled(1000, scale)):
+        side = Side.BUY if i % 2 == 0 else Side.SELL
+        price = product.ask_price if side == Side.BUY else product.bid_price
+        if price is None:
+            break
+        order = Order(side, 'DEEP', 50, price, time=len(orders) + i, id=len(orders) + i)
+        recorder.time('execute', market.execute, order)
+
+def bench_pro_rata(recorder, seed, scale):
+    bids, ask = workloads.pro_rata(seed, orders=scaled(10000, scale))
+
+    queue = TimeOrderQueue(0)
+    for order in bids:
+        queue.push(OrderEntry(order))
+    for i in range(1, scaled(50, scale) + 1):
+        recorder.time('allocate', queue.allocate, queue.volume * i // (scaled(50, scale) + 1) or 1)
+
+    market = Market()
+    for order in bids:
+        recorder.time('place', market.place, order)
+    market.place(ask)
+    recorder.time('execute', market.execute)
+
+def bench_cancel_heavy(recorder, seed, scale):
+    market = Market()
+    for action, order in workloads.cancel_heavy(seed, orders=scaled(50000, scale)):
+        if action == PLACE:
+            recorder.time('place', market.place, order)
+        else:
+            recorder.time('cancel', market.cancel, order)
+
+    product = market['CANCEL']
+    for _ in range(scaled(100, scale)):
+        recorder.time('get_order_book', product[Side.BUY].get_order_book)
+        recorder.time('get_order_book', product[Side.SELL].get_order_book)
+
+def bench_market_order_flood(recorder, seed, scale):
+    market = Market()
+    book, flood = workloads.market_order_flood(seed, resting=scaled(20000, scale), market_orders=scaled(20000, scale))
+    for order in book:
+        recorder.time('place', market.place, order)
+    for order in flood:
+        recorder.time('execute', market.execute, order)
+
+def bench_many_symbols(recorder, seed, scale):
+    market = Market()
+    for order in workloads.many_symbols(seed, symbols=scaled(10000, scale)):
+        recorder.time('place', market.place, order)
+    for product in market.get_products():
+        recorder.time('get_order_book', product[Side.BUY].get_order_book)
+    recorder.time('execute', market.execute)
+
+BENCHMARKS = {
+    'deep_book'         : bench_deep_book,
+    'pro_rata'          : bench_pro_rata,
+    'cancel_heavy'      : bench_cancel_heavy,
+    'market_order_flood': bench_market_order_flood,
+    'many_symbols'      : bench_many_symbols,
+}
+
+def run_benchmark(name, seed=0, scale=1.0, memory=True):
+    recorder = Recorder()
+    BENCHMARKS[name](recorder, seed, scale)
+    result = {op: summarize(samples) for op, samples in recorder.samples.items()}
+
+    if memory:
+        # Separate pass, since tracing allocations slows everything down
+        tracemalloc.start()
+        BENCHMARKS[name](Recorder(), seed, scale)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_memory_bytes'] = peak
+
+    return result
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(names=None, seed=0, scale=1.0, memory=True):
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'seed': seed,
+        'scale': scale,
+        'results': {name: run_benchmark(name, seed, scale, memory) for name in (names or BENCHMARKS)},
+    }
+
+def format_ratio(new, old):
+    if new is None or old is None or old == 0:
+        return '-'
+    return '{:.2f}x'.format(new / old)
+
+def report(results, baseline=None, out=sys.stdout):
+    out.write('revision={} python={} seed={} scale={}\n'.format(results['revision'], results['python'], results['seed'], results['scale']))
+    if baseline is not None:
+        out.write('baseline: revision={} seed={} scale={}\n'.format(baseline['revision'], baseline['seed'], baseline['scale']))
+
+    header = '{:20} {:15} {:>8} {:>12} {:>10} {:>10} {:>10}'.format('benchmark', 'op', 'count', 'ops/s', 'p50 us', 'p99 us', 'max us')
+    if baseline is not None:
+        header += ' {:>10} {:>10}'.format('ops/s vs', 'p99 vs')
+    out.write(header + '\n')
+
+    for name, result in results['results'].items():
+        old_result = baseline['results'].get(name, {}) if baseline is not None else {}
+        for op, stats in result.items():
+            if op == 'peak_memory_bytes':
+                continue
+            line = '{:20} {:15} {:>8} {:>12.0f} {:>10.1f} {:>10.1f} {:>10.1f}'.format(
+                name, op, stats['count'], stats['ops_per_second'] or 0, stats['p50_us'], stats['p99_us'], stats['max_us'])
+            if baseline is not None:
+                old = old_result.get(op)
+                line += ' {:>10} {:>10}'.format(
+                    format_ratio(stats['ops_per_second'], old and old['ops_per_second']),
+                    format_ratio(stats['p99_us'], old and old['p99_us']))
+            out.write(line + '\n')
+
+        if 'peak_memory_bytes' in result:
+            line = '{:20} {:15} {:>8} {:>12}'.format(name, 'peak_memory', '', '{:.1f} MiB'.format(result['peak_memory_bytes'] / 1048576.0))
+            if baseline is not None:
+                line += ' ' * 33 + ' {:>10}'.format(format_ratio(result['peak_memory_bytes'], old_result.get('peak_memory_bytes')))
+            out.write(line + '\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run marketsim benchmarks')
+    parser.add_argument('benchmarks', nargs='*', help='benchmarks to run (default: all): {}'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scale', type=float, default=1.0, help='workload size multiplier')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory pass')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+    args = parser.parse_args(argv)
+
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: {}'.format(name))
+
+    result = run(args.benchmarks, args.seed, args.scale, not args.no_memory)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report(result, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
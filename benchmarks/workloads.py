@@ -0,0 +1,83 @@
+import random
+from marketsim import Order, Side
+from marketsim.replay import PLACE, CANCEL
+
+# Seeded generators of synthetic workloads. All orders carry explicit ids and
+# times, so that a given seed always produces the same workload.
+
+def deep_book(seed=0, levels=1000, orders_per_level=10, symbol='DEEP'):
+    """
+    Limit orders spread over many price levels on both sides, placed in random
+    order, without crossing.
+    """
+    rng = random.Random(seed)
+    orders = []
+    for level in range(levels):
+        for i in range(orders_per_level):
+            orders.append((Side.BUY, 10000 - 1 - level))
+            orders.append((Side.SELL, 10000 + 1 + level))
+    rng.shuffle(orders)
+    return [Order(side, symbol, rng.randint(1, 100), price, time=i, id=i) for i, (side, price) in enumerate(orders)]
+
+def pro_rata(seed=0, orders=10000, symbol='PRORATA'):
+    """
+    Many bid orders sharing a single price and timestamp, so that a fill is
+    allocated pro-rata across all of them, followed by an ask order for about
+    half of the bid volume at the same price.
+    """
+    rng = random.Random(seed)
+    bids = [Order(Side.BUY, symbol, rng.randint(1, 100), 10000, time=0, id=i) for i in range(orders)]
+    volume = sum(order.quantity for order in bids)
+    ask = Order(Side.SELL, symbol, volume // 2, 10000, time=0, id=orders)
+    return bids, ask
+
+def cancel_heavy(seed=0, orders=50000, cancel_ratio=0.9, symbol='CANCEL'):
+    """
+    (action, order) events where most placed orders are cancelled shortly
+    afterwards, as with aggressive requoting.
+    """
+    rng = random.Random(seed)
+    events = []
+    live = []
+    for i in range(orders):
+        side = Side.BUY if rng.random() < 0.5 else Side.SELL
+        price = 10000 - rng.randint(1, 50) if side == Side.BUY else 10000 + rng.randint(1, 50)
+        events.append((PLACE, Order(side, symbol, rng.randint(1, 100), price, time=i, id=i)))
+        live.append(i)
+        while live and rng.random() < cancel_ratio:
+            id = live.pop(rng.randrange(len(live)))
+            events.append((CANCEL, Order(symbol=symbol, id=id)))
+    return events
+
+def market_order_flood(seed=0, resting=20000, market_orders=20000, symbol='FLOOD'):
+    """
+    A resting book on both sides followed by a flood of small market orders.
+    Returns (resting orders, market orders).
+    """
+    rng = random.Random(seed)
+    book = []
+    for i in range(resting):
+        side = Side.BUY if i % 2 == 0 else Side.SELL
+        price = 10000 - rng.randint(1, 100) if side == Side.BUY else 10000 + rng.randint(1, 100)
+        book.append(Order(side, symbol, rng.randint(50, 500), price, time=i, id=i))
+    flood = []
+    for i in range(resting, resting + market_orders):
+        side = Side.BUY if rng.random() < 0.5 else Side.SELL
+        flood.append(Order(side, symbol, rng.randint(1, 20), None, time=i, id=i))
+    return book, flood
+
+def many_symbols(seed=0, symbols=10000, orders_per_symbol=4):
+    """
+    Crossing limit orders spread over many symbols, to be matched in a single
+    auction.
+    """
+    rng = random.Random(seed)
+    orders = []
+    for s in range(symbols):
+        symbol = 'SYM{:05d}'.format(s)
+        for i in range(orders_per_symbol):
+            side = Side.BUY if i % 2 == 0 else Side.SELL
+            price = 100 + rng.randint(-2, 2)
+            orders.append(Order(side, symbol, rng.randint(1, 100), price, time=0, id=len(orders)))
+    rng.shuffle(orders)
+    return orders
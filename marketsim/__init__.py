@@ -1 +1,14 @@
 from marketsim.market import *
+from marketsim.replay import Replay, ReplayStats, read_csv_events, read_binary_events, write_binary_events
+from marketsim.sink import ExecutionSink, NpyWriter, ArrowWriter
+from marketsim.shared_book import BookSnapshot, SharedOrderBookWriter, SharedOrderBookReader
+from marketsim.tracing import Stage, TraceRecorder
+from marketsim.events import Event, EventBatch, StateChange, LevelUpdate, Subscription
+from marketsim.timer_wheel import TimerWheel
+from marketsim.allocation import Allocation, AllocationPolicy, Fifo, ProRata, ProRataMinLot, ProRataTopOrder
+from marketsim.pool import QueuePool
+from marketsim.bars import TradeStats, BarSeries
+from marketsim.auction import AuctionBatch, BatchAuction
+from marketsim.bbo import Quote, BboTable
+from marketsim.entry_table import EntryTable
+from marketsim.backtest import Backtest
@@ -0,0 +1,195 @@
+import math
+
+class Allocation:
+    def __init__(self, entry, quantity):
+        self._entry = entry
+        self._quantity = quantity
+
+    @property
+    def entry(self):
+        return self._entry
+
+    @property
+    def quantity(self):
+        return self._quantity
+
+    def __repr__(self):
+        return 'Allocation(entry={}, quantity={})'.format(self.entry, self.quantity)
+
+    @property
+    def pair(self):
+        return (self.entry, self.quantity)
+
+class AllocationPolicy:
+    """
+    Splits a quantity among the entries of a time bucket (a TimeOrderQueue),
+    which all have the same price and time. Subclasses implement
+    allocate(entries, volume, quantity, stats), where entries is the bucket's
+    deque in arrival order (including cancelled or filled entries with nothing
+    remaining), volume is the sum of their remaining quantities, and quantity
+    is at most volume. It returns Allocation objects with positive quantities
+    summing to quantity, in the order they should be filled.
+    """
+
+    def allocate(self, entries, volume, quantity, stats=None):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+def allocate_all(entries):
+    return [Allocation(entry, entry._remaining) for entry in entries if entry._remaining > 0]
+
+class Fifo(AllocationPolicy):
+    """
+    Fills entries in arrival order, visiting only the entries it fills.
+    """
+
+    def allocate(self, entries, volume, quantity, stats=None):
+        allocations = []
+        for entry in entries:
+            remaining = entry._remaining
+            if remaining > 0:
+                if remaining >= quantity:
+                    allocations.append(Allocation(entry, quantity))
+                    break
+                allocations.append(Allocation(entry, remaining))
+                quantity -= remaining
+        return allocations
+
+class ProRata(AllocationPolicy):
+    """
+    Allocates in proportion to the remaining quantities, rounded, then adds
+    or removes single units from the first or last entries until the sum is
+    exact. This is the default policy.
+    """
+
+    def allocate(self, entries, volume, quantity, stats=None):
+        if quantity >= volume:
+            return allocate_all(entries)
+
+        unit = float(quantity) / volume
+        allocations = [Allocation(entry, round(entry._remaining * unit)) for entry in entries if entry._remaining > 0]
+
+        current_sum = sum([allocation.quantity for allocation in allocations])
+
+        while current_sum != quantity:
+            if current_sum < quantity:
+                incr = 1
+                alloc_iter = iter(allocations)
+            else:
+                incr = -1
+                alloc_iter = reversed(allocations)
+
+            while current_sum != quantity:
+                allocation = next(alloc_iter)
+                allocation._quantity += incr
+                current_sum += incr
+                if stats is not None:
+                    stats.allocation_adjustments += 1
+
+        return [allocation for allocation in allocations if allocation.quantity > 0]
+
+def allocate_lots(entries, volume, quantity, min_lot, stats, head=None, head_quantity=0):
+    # Pro-rata shares rounded down to multiples of min_lot, with the residual
+    # filled in arrival order. The head entry, if any, was already allocated
+    # head_quantity, which is excluded from volume and quantity.
+    unit = float(quantity) / volume
+    allocations = []
+    allocated = 0
+    for entry in entries:
+        remaining = entry._remaining
+        if remaining > 0:
+            if entry is head:
+                remaining -= head_quantity
+            lots = int(remaining * unit / min_lot) * min_lot
+            allocations.append(Allocation(entry, lots))
+            allocated += lots
+
+    residual = quantity - allocated
+    for allocation in allocations:
+        if residual == 0:
+            break
+        available = allocation.entry._remaining - allocation.quantity
+        if allocation.entry is head:
+            available -= head_quantity
+        extra = min(available, residual)
+        if extra > 0:
+            allocation._quantity += extra
+            residual -= extra
+            if stats is not None:
+                stats.allocation_adjustments += 1
+
+    if head is not None:
+        if allocations and allocations[0].entry is head:
+            allocations[0]._quantity += head_quantity
+        else:
+            allocations.insert(0, Allocation(head, head_quantity))
+
+    return [allocation for allocation in allocations if allocation.quantity > 0]
+
+class ProRataMinLot(AllocationPolicy):
+    """
+    Allocates in proportion to the remaining quantities, rounded down to
+    multiples of min_lot, so that entries whose share is below min_lot get
+    nothing. The residual is filled in arrival order, stopping as soon as it
+    is exhausted.
+    """
+
+    def __init__(self, min_lot=1):
+        if min_lot < 1:
+            raise ValueError('min_lot must be positive: {}'.format(min_lot))
+        self._min_lot = min_lot
+
+    @property
+    def min_lot(self):
+        return self._min_lot
+
+    def allocate(self, entries, volume, quantity, stats=None):
+        if quantity >= volume:
+            return allocate_all(entries)
+        return allocate_lots(entries, volume, quantity, self.min_lot, stats)
+
+    def __repr__(self):
+        return 'ProRataMinLot(min_lot={})'.format(self.min_lot)
+
+class ProRataTopOrder(AllocationPolicy):
+    """
+    Gives the first live entry of the bucket (the top order) up to share of
+    the quantity (rounded up) before allocating the rest as ProRataMinLot,
+    the top order's leftover included. When the top order takes the whole
+    quantity, no other entry is visited.
+    """
+
+    def __init__(self, share=1.0, min_lot=1):
+        if not 0 < share <= 1:
+            raise ValueError('share must be in (0, 1]: {}'.format(share))
+        if min_lot < 1:
+            raise ValueError('min_lot must be positive: {}'.format(min_lot))
+        self._share = share
+        self._min_lot = min_lot
+
+    @property
+    def share(self):
+        return self._share
+
+    @property
+    def min_lot(self):
+        return self._min_lot
+
+    def allocate(self, entries, volume, quantity, stats=None):
+        if quantity >= volume:
+            return allocate_all(entries)
+
+        top = next((entry for entry in entries if entry._remaining > 0), None)
+        if top is None:
+            return []
+
+        top_quantity = min(top._remaining, quantity, math.ceil(quantity * self.share))
+        if top_quantity == quantity:
+            return [Allocation(top, quantity)]
+
+        return allocate_lots(entries, volume - top_quantity, quantity - top_quantity, self.min_lot, stats, top, top_quantity)
+
+    def __repr__(self):
+        return 'ProRataTopOrder(share={}, min_lot={})'.format(self.share, self.min_lot)
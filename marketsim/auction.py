@@ -0,0 +1,163 @@
+import math
+
+class AuctionBatch:
+    """
+    The result of one auction of a BatchAuction: the executions of each
+    symbol that matched, at the symbol's uniform clearing price.
+    """
+
+    def __init__(self, number, time, executions, messages):
+        self._number = number
+        self._time = time
+        self._executions = executions
+        self._messages = messages
+
+    @property
+    def number(self):
+        return self._number
+
+    @property
+    def time(self):
+        return self._time
+
+    @property
+    def executions(self):
+        return self._executions
+
+    @property
+    def messages(self):
+        """
+        The number of place and cancel calls accumulated for this auction.
+        """
+        return self._messages
+
+    @property
+    def count(self):
+        return sum(len(executions) for executions in self._executions.values())
+
+    def __repr__(self):
+        return 'AuctionBatch(number={}, time={}, symbols={}, count={}, messages={})'.format(self.number, self.time, list(self.executions), self.count, self.messages)
+
+class BatchAuction:
+    """
+    Frequent batch auctions over a Market. place() and cancel() only change
+    the book; the products with new orders since the last auction are matched
+    together by run(), which advance_time() calls every interval and place()
+    or cancel() calls after max_messages messages (if given). Each auction
+    returns an AuctionBatch, which is also passed to callback(batch) if given,
+    and publishes the market's pending events once.
+
+    IOC orders are cancelled at the auction following their placement.
+    """
+
+    def __init__(self, market, interval=None, max_messages=None, callback=None, origin=0.0):
+        if interval is not None and interval <= 0:
+            raise ValueError('interval must be positive: {}'.format(interval))
+        if max_messages is not None and max_messages < 1:
+            raise ValueError('max_messages must be positive: {}'.format(max_messages))
+        self._market = market
+        self._interval = interval
+        self._max_messages = max_messages
+        self._callback = callback
+        self._next_auction = origin + interval if interval is not None else None
+        self._dirty = {}
+        self._messages = 0
+        self._number = 0
+        self._now = origin
+
+    @property
+    def market(self):
+        return self._market
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def max_messages(self):
+        return self._max_messages
+
+    @property
+    def next_auction(self):
+        return self._next_auction
+
+    @property
+    def now(self):
+        return self._now
+
+    @property
+    def pending_messages(self):
+        return self._messages
+
+    def place(self, order):
+        """
+        Places the order without matching, and returns the AuctionBatch if
+        this message triggered an auction, or None.
+        """
+        self._market.place(order)
+        self._dirty[order.symbol] = None
+        return self.count_message()
+
+    def place_batch(self, orders):
+        for order in orders:
+            self._market.place(order)
+            self._dirty[order.symbol] = None
+            self._messages += 1
+        if self._max_messages is not None and self._messages >= self._max_messages:
+            return self.run()
+        return None
+
+    def cancel(self, order):
+        self._market.cancel(order)
+        return self.count_message()
+
+    def count_message(self):
+        self._messages += 1
+        if self._max_messages is not None and self._messages >= self._max_messages:
+            return self.run()
+        return None
+
+    def advance_time(self, now):
+        """
+        Moves the clock to now, running the auctions due by then (each after
+        expiring the orders due by its time), and returns their batches.
+        Intervals without new orders are skipped.
+        """
+        batches = []
+        interval = self._interval
+        while self._next_auction is not None and self._next_auction <= now:
+            time = self._next_auction
+            self._market.advance_time(time)
+            batches.append(self.run(time))
+            # Skip the remaining intervals with nothing to match
+            self._next_auction = time + interval * max(1, math.floor((now - time) / interval) + 1)
+        self._market.advance_time(now)
+        self._now = now
+        return batches
+
+    def run(self, time=None):
+        """
+        Matches the products with new orders since the last auction, then
+        publishes the market's events. Returns the AuctionBatch.
+        """
+        if time is None:
+            time = self._now
+        market = self._market
+        dirty = self._dirty
+        self._dirty = {}
+
+        executions = {}
+        for symbol in dirty:
+            product = market.peek(symbol)
+            if product is not None and (product.can_execute() or product._pending_ioc):
+                symbol_executions = market.own(symbol).execute(publish=False)
+                if symbol_executions:
+                    executions[symbol] = symbol_executions
+        market.flush()
+
+        self._number += 1
+        batch = AuctionBatch(self._number, time, executions, self._messages)
+        self._messages = 0
+        if self._callback is not None:
+            self._callback(batch)
+        return batch
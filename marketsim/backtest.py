@@ -0,0 +1,172 @@
+import heapq
+from marketsim.market import Market, shallow_copy
+
+ORDER    = 1
+CANCEL   = 2
+AUCTION  = 3
+CALLBACK = 4
+
+class Backtest:
+    """
+    A discrete-event driver around a Market. Orders, cancels, auctions and
+    callbacks are scheduled at simulated times and processed in time order
+    (then in scheduling order), with the clock jumping straight to each event,
+    so a run takes as long as the matching and no wall clock is involved.
+
+    Orders without a time are placed as copies stamped with their event
+    time, which therefore sets their time priority instead of
+    OrderEntry.default_time(); the given Order objects are left unchanged, and
+    entry.order is the copy. The market clock follows the simulated one (see
+    Market.advance_time()), so expiries and bars happen at simulated times too.
+
+    Callbacks are called as callback(backtest) and may schedule further
+    events or act immediately through submit() and cancel(). If given,
+    on_executions(backtest, executions) is called after each event that
+    produced executions.
+    """
+
+    def __init__(self, market=None, start=0.0, on_executions=None):
+        self._market = market if market is not None else Market()
+        self._now = start
+        self._events = []
+        self._sequence = 0
+        self._on_executions = on_executions
+        self._processed = 0
+        self._rejected_cancels = 0
+
+    @property
+    def market(self):
+        return self._market
+
+    @property
+    def now(self):
+        return self._now
+
+    @property
+    def pending(self):
+        return len(self._events)
+
+    @property
+    def processed(self):
+        return self._processed
+
+    @property
+    def rejected_cancels(self):
+        """
+        The number of cancels of orders already filled or cancelled by the
+        time they were processed, which are skipped.
+        """
+        return self._rejected_cancels
+
+    def push(self, time, kind, payload):
+        if time < self._now:
+            raise ValueError('cannot schedule in the past: {} < {}'.format(time, self._now))
+        self._sequence += 1
+        heapq.heappush(self._events, (time, self._sequence, kind, payload))
+
+    def schedule_order(self, time, order, execute=True):
+        """
+        Schedules the order to be executed (or only placed, with
+        execute=False, e.g. for auctions) at time.
+        """
+        self.push(time, ORDER, (order, execute))
+
+    def schedule_cancel(self, time, order):
+        self.push(time, CANCEL, order)
+
+    def schedule_auction(self, time):
+        """
+        Schedules a Market.execute() of all products at time.
+        """
+        self.push(time, AUCTION, None)
+
+    def schedule(self, time, callback):
+        self.push(time, CALLBACK, callback)
+
+    def every(self, interval, callback, start=None, end=None):
+        """
+        Schedules callback(backtest) every interval from start (now if None)
+        until end (inclusive, forever if None).
+        """
+        if interval <= 0:
+            raise ValueError('interval must be positive: {}'.format(interval))
+
+        def repeat(backtest):
+            callback(backtest)
+            time = backtest.now + interval
+            if end is None or time <= end:
+                backtest.schedule(time, repeat)
+
+        self.schedule(self._now if start is None else start, repeat)
+
+    def submit(self, order, execute=True):
+        """
+        Executes (or places) the order now, and returns the executions.
+        """
+        if order.time is None:
+            order = shallow_copy(order)
+            order._time = self._now
+        if execute:
+            executions = self._market.execute(order)
+        else:
+            self._market.place(order)
+            executions = []
+        if executions and self._on_executions is not None:
+            self._on_executions(self, executions)
+        return executions
+
+    def cancel(self, order):
+        """
+        Cancels the order now. Returns False if it was already filled or
+        cancelled.
+        """
+        entry = self._market.entries.get(order.id)
+        if entry is not None and not entry.remaining:
+            self._rejected_cancels += 1
+            return False
+        self._market.cancel(order)
+        return True
+
+    def advance(self, time):
+        if time < self._now:
+            raise ValueError('time cannot go backwards: {} < {}'.format(time, self._now))
+        self._now = time
+        self._market.advance_time(time)
+
+    def step(self):
+        """
+        Processes the next event. Returns False if there are none.
+        """
+        if not self._events:
+            return False
+        time, _, kind, payload = heapq.heappop(self._events)
+        self.advance(time)
+
+        if kind == ORDER:
+            order, execute = payload
+            self.submit(order, execute)
+        elif kind == CANCEL:
+            self.cancel(payload)
+        elif kind == AUCTION:
+            executions = self._market.execute()
+            if executions and self._on_executions is not None:
+                self._on_executions(self, executions)
+        else:
+            payload(self)
+
+        self._processed += 1
+        return True
+
+    def run(self, until=None):
+        """
+        Processes events in time order, up to and including those at until if
+        given (then moving the clock to until), or until none are left.
+        Returns the number of events processed.
+        """
+        processed = self._processed
+        events = self._events
+        while events and (until is None or events[0][0] <= until):
+            self.step()
+        if until is not None and until > self._now:
+            self.advance(until)
+        return self._processed - processed
@@ -0,0 +1,184 @@
+import math
+from array import array
+
+BAR_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume', 'count', 'vwap']
+
+class TradeStats:
+    """
+    Open, high, low and close prices, volume, trade count and VWAP of a
+    sequence of trades, updated in O(1) per trade. Prices are None and vwap
+    is None until the first trade.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._open = None
+        self._high = None
+        self._low = None
+        self._close = None
+        self._volume = 0
+        self._count = 0
+        self._turnover = 0.0
+
+    def copy(self):
+        stats = TradeStats()
+        stats.__dict__.update(self.__dict__)
+        return stats
+
+    @property
+    def open(self):
+        return self._open
+
+    @property
+    def high(self):
+        return self._high
+
+    @property
+    def low(self):
+        return self._low
+
+    @property
+    def close(self):
+        return self._close
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def turnover(self):
+        return self._turnover
+
+    @property
+    def vwap(self):
+        return self._turnover / self._volume if self._volume else None
+
+    def add(self, price, quantity):
+        if self._count == 0:
+            self._open = self._high = self._low = price
+        elif price > self._high:
+            self._high = price
+        elif price < self._low:
+            self._low = price
+        self._close = price
+        self._volume += quantity
+        self._count += 1
+        self._turnover += price * quantity
+
+    def __repr__(self):
+        return 'TradeStats(open={}, high={}, low={}, close={}, volume={}, count={}, vwap={})'.format(self.open, self.high, self.low, self.close, self.volume, self.count, self.vwap)
+
+class BarSeries:
+    """
+    Trade statistics per time bar of the given interval, aligned to origin.
+    The bar in progress is a TradeStats object (current); completed bars are
+    appended to typed columns (see arrays()). Intervals without trades
+    produce no bar.
+
+    Trades are expected in non-decreasing time order; a trade older than the
+    current bar is counted in the current bar.
+    """
+
+    def __init__(self, interval, origin=0.0):
+        if interval <= 0:
+            raise ValueError('interval must be positive: {}'.format(interval))
+        self._interval = interval
+        self._origin = origin
+        self._current = TradeStats()
+        self._start = None
+        self._columns = {
+            'time'  : array('d'),
+            'open'  : array('d'),
+            'high'  : array('d'),
+            'low'   : array('d'),
+            'close' : array('d'),
+            'volume': array('q'),
+            'count' : array('q'),
+            'vwap'  : array('d'),
+        }
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def start(self):
+        """
+        The start time of the current bar, or None before the first trade.
+        """
+        return self._start
+
+    def __len__(self):
+        return len(self._columns['time'])
+
+    def copy(self):
+        series = BarSeries(self._interval, self._origin)
+        series._current = self._current.copy()
+        series._start = self._start
+        series._columns = {name: array(column.typecode, column) for name, column in self._columns.items()}
+        return series
+
+    @property
+    def end(self):
+        """
+        The end time of the current bar, or None before the first trade.
+        """
+        return self._start + self._interval if self._start is not None else None
+
+    def get_start(self, time):
+        return self._origin + math.floor((time - self._origin) / self._interval) * self._interval
+
+    def add(self, time, price, quantity):
+        if self._start is None:
+            self._start = self.get_start(time)
+        elif time >= self._start + self._interval:
+            self.complete()
+            self._start = self.get_start(time)
+        self._current.add(price, quantity)
+
+    def due(self, time):
+        return self._start is not None and time >= self._start + self._interval
+
+    def advance(self, time):
+        """
+        Completes the current bar if time is past its end, without waiting
+        for the next trade.
+        """
+        if self.due(time):
+            self.complete()
+            self._start = None
+
+    def complete(self):
+        current = self._current
+        if current.count:
+            columns = self._columns
+            columns['time'].append(self._start)
+            columns['open'].append(current.open)
+            columns['high'].append(current.high)
+            columns['low'].append(current.low)
+            columns['close'].append(current.close)
+            columns['volume'].append(current.volume)
+            columns['count'].append(current.count)
+            columns['vwap'].append(current.vwap)
+        self._current = TradeStats()
+
+    def arrays(self):
+        """
+        Returns the completed bars as a dict of column name (see BAR_COLUMNS)
+        to array.array, in time order. The arrays are copies (a memcpy each),
+        since buffers exported to e.g. numpy.frombuffer() could not grow.
+        """
+        return {name: array(column.typecode, column) for name, column in self._columns.items()}
+
+    def __repr__(self):
+        return 'BarSeries(interval={}, bars={}, current={})'.format(self.interval, len(self), self.current)
@@ -0,0 +1,193 @@
+from array import array
+from collections.abc import Mapping
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BBO_COLUMNS = ['bid_price', 'ask_price', 'bid_volume', 'ask_volume', 'last_price']
+
+class Quote:
+    """
+    The best bid and ask prices of a product, the volumes of those levels and
+    the last price. Prices are None if missing; volumes are then 0.
+    """
+
+    def __init__(self, bid_price, ask_price, bid_volume, ask_volume, last_price):
+        self._bid_price = bid_price
+        self._ask_price = ask_price
+        self._bid_volume = bid_volume
+        self._ask_volume = ask_volume
+        self._last_price = last_price
+
+    @property
+    def bid_price(self):
+        return self._bid_price
+
+    @property
+    def ask_price(self):
+        return self._ask_price
+
+    @property
+    def bid_volume(self):
+        return self._bid_volume
+
+    @property
+    def ask_volume(self):
+        return self._ask_volume
+
+    @property
+    def last_price(self):
+        return self._last_price
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self):
+        return 'Quote(bid_price={}, ask_price={}, bid_volume={}, ask_volume={}, last_price={})'.format(self.bid_price, self.ask_price, self.bid_volume, self.ask_volume, self.last_price)
+
+def to_float(price):
+    return float('nan') if price is None else price
+
+def from_float(price):
+    return None if price != price else price
+
+class BboTable(Mapping):
+    """
+    A table of the Quote of each product of a Market, one row per symbol in
+    typed columns (see BBO_COLUMNS), as a read-only mapping of symbol to
+    Quote and as NumPy arrays (see arrays()).
+
+    Products mark their symbol when they change one of their order queues
+    (see touch()), and refresh() rewrites only the rows of marked symbols, so
+    reading the table costs nothing for symbols without activity. version is
+    incremented by each refresh() that changed a row.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._symbols = []
+        self._columns = {
+            'bid_price' : array('d'),
+            'ask_price' : array('d'),
+            'bid_volume': array('q'),
+            'ask_volume': array('q'),
+            'last_price': array('d'),
+        }
+        self._dirty = {}
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def symbols(self):
+        """
+        The symbols in row order.
+        """
+        return self._symbols
+
+    def copy(self):
+        table = BboTable()
+        table._rows = dict(self._rows)
+        table._symbols = list(self._symbols)
+        table._columns = {name: array(column.typecode, column) for name, column in self._columns.items()}
+        table._dirty = dict(self._dirty)
+        table._version = self._version
+        return table
+
+    def touch(self, symbol):
+        self._dirty[symbol] = None
+
+    def refresh(self, products):
+        """
+        Updates the rows of the symbols touched since the last refresh from
+        the given dict of symbol to Product. Returns the number of rows that
+        changed.
+        """
+        if not self._dirty:
+            return 0
+        dirty = self._dirty
+        self._dirty = {}
+
+        changed = 0
+        for symbol in dirty:
+            product = products.get(symbol)
+            if product is None:
+                changed += self.discard(symbol)
+            elif self.update(symbol, product.quote()):
+                changed += 1
+        if changed:
+            self._version += 1
+        return changed
+
+    def update(self, symbol, quote):
+        row = (to_float(quote.bid_price), to_float(quote.ask_price), quote.bid_volume, quote.ask_volume, to_float(quote.last_price))
+
+        columns = self._columns
+        index = self._rows.get(symbol)
+        if index is None:
+            self._rows[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+            for name, value in zip(BBO_COLUMNS, row):
+                columns[name].append(value)
+            return True
+
+        old = tuple(columns[name][index] for name in BBO_COLUMNS)
+        # NaN != NaN, so compare the missing prices separately
+        if all(a == b or (a != a and b != b) for a, b in zip(old, row)):
+            return False
+        for name, value in zip(BBO_COLUMNS, row):
+            columns[name][index] = value
+        return True
+
+    def discard(self, symbol):
+        """
+        Removes the row of the symbol, if any, moving the last row into its
+        place. Returns the number of rows removed.
+        """
+        index = self._rows.pop(symbol, None)
+        if index is None:
+            return 0
+        last = self._symbols.pop()
+        for column in self._columns.values():
+            value = column.pop()
+            if last != symbol:
+                column[index] = value
+        if last != symbol:
+            self._symbols[index] = last
+            self._rows[last] = index
+        return 1
+
+    def __getitem__(self, symbol):
+        index = self._rows[symbol]
+        columns = self._columns
+        return Quote(
+            from_float(columns['bid_price'][index]),
+            from_float(columns['ask_price'][index]),
+            columns['bid_volume'][index],
+            columns['ask_volume'][index],
+            from_float(columns['last_price'][index]),
+        )
+
+    def __iter__(self):
+        return iter(self._symbols)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def arrays(self):
+        """
+        Returns a dict of column name (see BBO_COLUMNS) to NumPy array, in the
+        row order of symbols: float64 prices, NaN if missing, and int64
+        volumes. The arrays are copies (a memcpy each), since the columns
+        grow as products are added.
+        """
+        if numpy is None:
+            raise ImportError('arrays requires numpy')
+        return {name: numpy.array(column, dtype=numpy.float64 if column.typecode == 'd' else numpy.int64) for name, column in self._columns.items()}
+
+    def __repr__(self):
+        return 'BboTable(symbols={}, version={})'.format(len(self), self.version)
@@ -0,0 +1,154 @@
+import sys
+from collections.abc import Mapping
+
+# A table is merged into the layer below it once it holds at least
+# 1/MERGE_RATIO as many entries, which keeps the number of layers logarithmic
+MERGE_RATIO = 4
+
+_missing = object()
+
+class EntryTable(dict):
+    """
+    A dict of order id to entry, layered over the read-only tables it was
+    forked from (see layer()). Writes go to this table only; lookups that miss
+    fall back to the layers, newest first, so forking does not copy the
+    entries written so far.
+
+    Entries are never removed from a table, so a key in a layer is only ever
+    shadowed by a newer version of its entry. Lookups of keys written to this
+    table stay plain dict lookups, len() is kept as a count of distinct keys,
+    and iteration visits every layer.
+    """
+
+    def __init__(self, layers=(), count=None):
+        super().__init__()
+        self._layers = list(layers)
+        if count is None:
+            count = sum(1 for _ in self.items())
+        self._count = count
+
+    @classmethod
+    def layer(cls, table):
+        """
+        Returns a new, empty table over the given dict or EntryTable, which
+        must not be written to afterwards. Small layers are merged into the
+        layer below them, so each entry is copied O(log n) times at most over
+        any number of forks.
+        """
+        layers = [table] + getattr(table, '_layers', [])
+        layers = [layer for layer in layers if dict.__len__(layer)]
+        while len(layers) > 1 and dict.__len__(layers[0]) * MERGE_RATIO >= dict.__len__(layers[1]):
+            merged = dict(dict.items(layers[1]))
+            merged.update(dict.items(layers[0]))
+            layers[0:2] = [merged]
+        return cls(layers, len(table))
+
+    @property
+    def layers(self):
+        return self._layers
+
+    def __missing__(self, key):
+        for layer in self._layers:
+            entry = dict.get(layer, key, _missing)
+            if entry is not _missing:
+                return entry
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        entry = dict.get(self, key, _missing)
+        if entry is _missing:
+            for layer in self._layers:
+                entry = dict.get(layer, key, _missing)
+                if entry is not _missing:
+                    return entry
+            return default
+        return entry
+
+    def __setitem__(self, key, entry):
+        if key not in self:
+            self._count += 1
+        dict.__setitem__(self, key, entry)
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, 'keys') else other
+        for key, entry in items:
+            self[key] = entry
+        for key, entry in kwargs.items():
+            self[key] = entry
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return True
+        for layer in self._layers:
+            if dict.__contains__(layer, key):
+                return True
+        return False
+
+    def items(self):
+        # Oldest layer first, so that keys come roughly in insertion order
+        tables = [self] + self._layers
+        for i in range(len(tables) - 1, -1, -1):
+            newer = tables[:i]
+            for key, entry in dict.items(tables[i]):
+                if not any(dict.__contains__(other, key) for other in newer):
+                    yield key, entry
+
+    def keys(self):
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        for _, entry in self.items():
+            yield entry
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return self._count
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def copy(self):
+        return dict(self.items())
+
+    def __sizeof__(self):
+        # Includes the layers, so sys.getsizeof() covers the whole table
+        return dict.__sizeof__(self) + sum(sys.getsizeof(layer) for layer in self._layers)
+
+    def __repr__(self):
+        return 'EntryTable({!r})'.format(dict(self.items()))
+
+class SymbolEntries(Mapping):
+    """
+    A read-only view of the entries of one symbol in an entry table shared by
+    several symbols, given the ids of that symbol's entries (a dict or
+    EntryTable used as an ordered set).
+    """
+
+    def __init__(self, table, ids):
+        self._table = table
+        self._ids = ids
+
+    def __getitem__(self, order_id):
+        if order_id not in self._ids:
+            raise KeyError(order_id)
+        return self._table[order_id]
+
+    def __contains__(self, order_id):
+        return order_id in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return 'SymbolEntries(entries={})'.format(len(self))
@@ -0,0 +1,181 @@
+from enum import Enum
+
+class Event(Enum):
+    EXECUTIONS    = 1
+    STATE_CHANGES = 2
+    LEVEL_UPDATES = 3
+
+class StateChange:
+    def __init__(self, order_id, side, old_state, new_state):
+        self._order_id = order_id
+        self._side = side
+        self._old_state = old_state
+        self._new_state = new_state
+
+    @property
+    def order_id(self):
+        return self._order_id
+
+    @property
+    def side(self):
+        return self._side
+
+    @property
+    def old_state(self):
+        return self._old_state
+
+    @property
+    def new_state(self):
+        return self._new_state
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self):
+        return 'StateChange(order_id={}, side={}, old_state={}, new_state={})'.format(self.order_id, self.side, self.old_state, self.new_state)
+
+class LevelUpdate:
+    """
+    The volume and count of a price level after a batch; zero when the level
+    was emptied. The price is None for the market-order level.
+    """
+
+    def __init__(self, side, price, volume, count):
+        self._side = side
+        self._price = price
+        self._volume = volume
+        self._count = count
+
+    @property
+    def side(self):
+        return self._side
+
+    @property
+    def price(self):
+        return self._price
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @property
+    def count(self):
+        return self._count
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self):
+        return 'LevelUpdate(side={}, price={}, volume={}, count={})'.format(self.side, self.price, self.volume, self.count)
+
+class EventBatch:
+    """
+    Events of a single symbol since the previous batch. State changes and level
+    updates are grouped by side, so that side filters apply per group rather
+    than per event.
+    """
+
+    def __init__(self, symbol, executions, state_changes, level_updates):
+        self._symbol = symbol
+        self._executions = executions
+        self._state_changes = state_changes
+        self._level_updates = level_updates
+
+    @property
+    def symbol(self):
+        return self._symbol
+
+    @property
+    def executions(self):
+        return self._executions
+
+    @property
+    def state_changes(self):
+        return [change for changes in self._state_changes.values() for change in changes]
+
+    @property
+    def level_updates(self):
+        return [update for updates in self._level_updates.values() for update in updates]
+
+    def empty(self):
+        return not (self._executions or self._state_changes or self._level_updates)
+
+    def select(self, sides=None, events=None):
+        if sides is None and events is None:
+            return self
+        state_changes = self._state_changes
+        level_updates = self._level_updates
+        if sides is not None:
+            state_changes = {side: changes for side, changes in state_changes.items() if side in sides}
+            level_updates = {side: updates for side, updates in level_updates.items() if side in sides}
+        if events is not None:
+            if Event.STATE_CHANGES not in events:
+                state_changes = {}
+            if Event.LEVEL_UPDATES not in events:
+                level_updates = {}
+        executions = self._executions if events is None or Event.EXECUTIONS in events else []
+        return EventBatch(self.symbol, executions, state_changes, level_updates)
+
+    def __repr__(self):
+        return 'EventBatch(symbol={}, executions={}, state_changes={}, level_updates={})'.format(self.symbol, self.executions, self.state_changes, self.level_updates)
+
+class EventBuffer:
+    """
+    Collects the events of a product between batches. Only the touched levels
+    are recorded; their volume and count are read when the batch is taken.
+    """
+
+    def __init__(self):
+        self.executions = []
+        self.state_changes = {}
+        self.levels = {}
+
+    def __bool__(self):
+        return bool(self.executions or self.state_changes or self.levels)
+
+    def change(self, order_id, side, old_state, new_state):
+        self.state_changes.setdefault(side, []).append(StateChange(order_id, side, old_state, new_state))
+
+    def touch(self, side, price):
+        # A dict rather than a set, to report levels in the order first touched
+        self.levels.setdefault(side, {})[price] = None
+
+class Subscription:
+    """
+    A callback registered with Market.subscribe() or Product.subscribe(). The
+    callback receives a list of EventBatch objects, restricted to the given
+    symbols, sides and Event kinds (all if None).
+    """
+
+    def __init__(self, callback, symbols=None, sides=None, events=None):
+        self._callback = callback
+        self._symbols = frozenset(symbols) if symbols is not None else None
+        self._sides = frozenset(sides) if sides is not None else None
+        self._events = frozenset(events) if events is not None else None
+
+    @property
+    def callback(self):
+        return self._callback
+
+    @property
+    def symbols(self):
+        return self._symbols
+
+    @property
+    def sides(self):
+        return self._sides
+
+    @property
+    def events(self):
+        return self._events
+
+    def deliver(self, batches):
+        symbols = self._symbols
+        selected = []
+        for batch in batches:
+            if symbols is None or batch.symbol in symbols:
+                batch = batch.select(self._sides, self._events)
+                if not batch.empty():
+                    selected.append(batch)
+        if selected:
+            self._callback(selected)
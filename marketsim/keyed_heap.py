@@ -1,9 +1,20 @@
-from heapq import heappush, heappop
+import sys
+from heapq import heapify, heappush, heappop
 
 class KeyedHeap:
-    def __init__(self):
+    """
+    A heap of keys with a value per key. Keys removed from the middle of the
+    heap by remove() are marked dead and left in pq_list until they reach the
+    top, so removal costs O(1) instead of a linear search for the key. The
+    top of pq_list is always a live key; other readers of pq_list must skip
+    keys missing from pq_map.
+    """
+
+    def __init__(self, stats=None):
         self.pq_map = {}
         self.pq_list = []
+        self.dead = set()
+        self.stats = stats
 
     def __contains__(self, key):
         return key in self.pq_map
@@ -12,30 +23,95 @@ class KeyedHeap:
         return self.pq_map[key]
 
     def __len__(self):
-        return len(self.pq_list)
+        return len(self.pq_map)
 
     def __bool__(self):
-        return len(self.pq_list) != 0
+        return len(self.pq_map) != 0
 
     def __nonzero__(self):
-        return len(self.pq_list) != 0
+        return len(self.pq_map) != 0
 
     def empty(self):
-        return len(self.pq_list) == 0
+        return len(self.pq_map) == 0
+
+    def copy(self):
+        heap = KeyedHeap(self.stats)
+        heap.pq_map = dict(self.pq_map)
+        heap.pq_list = list(self.pq_list)
+        heap.dead = set(self.dead)
+        return heap
+
+    def clear(self):
+        self.pq_map.clear()
+        del self.pq_list[:]
+        self.dead.clear()
 
     def push(self, key, value):
         if key in self:
             raise KeyError('key already exists: {}'.format(key))
         self.pq_map[key] = value
-        heappush(self.pq_list, (key, value))
+        if key in self.dead:
+            # Still in pq_list, at a valid position for its key
+            self.dead.discard(key)
+        else:
+            heappush(self.pq_list, key)
+        if self.stats is not None:
+            self.stats.heap_pushes += 1
+
+    def memory_usage(self):
+        """
+        Approximate bytes held by the heap list, the map and the keys, excluding
+        the values.
+        """
+        size = sys.getsizeof(self.pq_list) + sys.getsizeof(self.pq_map) + sys.getsizeof(self.dead)
+        if self.pq_list:
+            size += sys.getsizeof(self.pq_list[0]) * len(self.pq_list)
+        return size
+
+    def replace(self, key, value):
+        if key not in self:
+            raise KeyError('key does not exist: {}'.format(key))
+        self.pq_map[key] = value
 
     def pop(self):
         if self.empty():
             raise IndexError('pop from an empty queue')
-        key, value = heappop(self.pq_list)
-        del self.pq_map[key]
+        key = heappop(self.pq_list)
+        value = self.pq_map.pop(key)
+        self.pop_dead()
+        if self.stats is not None:
+            self.stats.heap_pops += 1
         return (key, value)
 
+    def remove(self, key):
+        if key not in self:
+            raise KeyError('key does not exist: {}'.format(key))
+        value = self.pq_map.pop(key)
+        if key == self.pq_list[0]:
+            heappop(self.pq_list)
+            self.pop_dead()
+        else:
+            self.dead.add(key)
+            if len(self.dead) > len(self.pq_map):
+                self.compact()
+        if self.stats is not None:
+            self.stats.heap_removes += 1
+        return value
+
+    def pop_dead(self):
+        # Keeps a live key on top, so that peek() does not change the heap
+        dead = self.dead
+        pq_list = self.pq_list
+        while dead and pq_list and pq_list[0] in dead:
+            dead.discard(heappop(pq_list))
+
+    def compact(self):
+        # Drops the dead keys once they outnumber the live ones: O(n), but
+        # only after n/2 removals
+        self.pq_list = [key for key in self.pq_list if key not in self.dead]
+        heapify(self.pq_list)
+        self.dead.clear()
+
     def pop_key(self):
         key, _ = self.pop()
         return key
@@ -47,8 +123,8 @@ class KeyedHeap:
     def peek(self):
         if self.empty():
             raise IndexError('peek from an empty queue')
-        key, value = self.pq_list[0]
-        return (key, value)
+        key = self.pq_list[0]
+        return (key, self.pq_map[key])
 
     def peek_key(self):
         key, _ = self.peek()
@@ -61,8 +137,9 @@ class KeyedHeap:
     def items(self):
         pq_list = list(self.pq_list)
         while len(pq_list) > 0:
-            key, value = heappop(pq_list)
-            yield key, value
+            key = heappop(pq_list)
+            if key not in self.dead:
+                yield key, self.pq_map[key]
 
     def keys(self):
         for key, _ in self.items():
@@ -1,10 +1,68 @@
+import gc
+import heapq
+import itertools
+import sys
+from array import array
 from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 from enum import Enum
 from time import mktime
 from marketsim.keyed_heap import KeyedHeap
-
-builtin_id = id
+from marketsim.allocation import ProRata
+from marketsim.stats import Stats, perf_counter_ns
+from marketsim.tracing import Stage
+from marketsim.events import EventBatch, EventBuffer, LevelUpdate, Subscription
+from marketsim.timer_wheel import TimerWheel
+from marketsim.pool import QueuePool
+from marketsim.bars import TradeStats, BarSeries
+from marketsim.bbo import BboTable, Quote
+from marketsim.entry_table import EntryTable, SymbolEntries
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def shallow_copy(obj):
+    # Shallow copy; faster than copy.copy() for plain objects
+    clone = obj.__class__.__new__(obj.__class__)
+    clone.__dict__.update(obj.__dict__)
+    return clone
+
+@contextmanager
+def gc_paused():
+    # Bulk operations allocate many short-lived, acyclic objects (e.g. entry
+    # clones), which would otherwise trigger full collections of the book
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+_object_sizes = {}
+
+def object_size(obj):
+    # Approximate bytes of a plain object and its attribute dict, excluding the
+    # attribute values. Cached per class, since instances share the same layout.
+    cls = obj.__class__
+    if cls not in _object_sizes:
+        _object_sizes[cls] = sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+    return _object_sizes[cls]
+
+def price_key(side, price):
+    # Same as OrderQueue.get_price_key(), without an entry
+    if price is None:
+        return float('-inf')
+    elif side == Side.BUY:
+        return -price
+    else:
+        return price
+
+MEMORY_USAGE_BYTES = ['entries', 'time_queues', 'heaps', 'dead', 'total']
+MEMORY_USAGE_COUNTS = ['entry_count', 'dead_entry_count', 'queued_dead_count', 'level_count', 'time_queue_count']
 
 class Side(Enum):
     BUY  = 1
@@ -28,15 +86,116 @@ class State(Enum):
     PARTIALLY_FILLED = 1
     FULLY_FILLED     = 2
     CANCELLED        = 3
+    PENDING          = 4
+
+class TimeInForce(Enum):
+    # Values as in FIX tag 59
+    DAY = 0
+    GTC = 1
+    IOC = 3
+    GTT = 6
+
+    @classmethod
+    def normalize(cls, value):
+        if value is None:
+            return cls.GTC
+        elif isinstance(value, cls):
+            return value
+        elif isinstance(value, str):
+            return cls[value.upper()]
+        elif isinstance(value, int):
+            return cls(value)
+        else:
+            raise ValueError('invalid time in force: {}'.format(value))
+
+class Owner:
+    """
+    Identifies the Product allowed to mutate a structure in place. Structures
+    shared with a fork (see Product.fork()) have a different owner and are
+    cloned before they are mutated, so that the fork and its parent do not see
+    each other's changes.
+    """
+
+    def __init__(self, product):
+        self._product = product
+
+    @property
+    def stats(self):
+        return self._product._stats
+
+    @property
+    def pool(self):
+        return self._product._pool
+
+    def adopt(self, entry):
+        clone = shallow_copy(entry)
+        clone._owner = self
+        self._product.replace_entry(clone)
+        return clone
+
+    def resolve(self, entry):
+        return self._product._entries[entry.order_id]
+
+class OrderIdAllocator:
+    """
+    Allocates increasing integer order ids. Unlike object ids, which the
+    interpreter reuses after garbage collection, an allocated id is never
+    handed out twice, and allocation skips past the int ids supplied by the
+    caller so far (see reserve()). An order whose allocated id was taken by
+    a caller-supplied id anyway is given a new one when placed (see
+    allocate_id()).
+    """
+
+    def __init__(self, start=1):
+        self._counter = itertools.count(start)
+        self._reserved = start - 1
+
+    def next(self):
+        order_id = next(self._counter)
+        if order_id <= self._reserved:
+            self._counter = itertools.count(self._reserved + 1)
+            order_id = next(self._counter)
+        return order_id
+
+    def reserve(self, order_id):
+        if order_id > self._reserved:
+            self._reserved = order_id
+
+# Ids of orders created without one
+order_ids = OrderIdAllocator()
+
+def allocate_id(order, entries):
+    """
+    Called when the order's id is already in the entry table: raises a
+    ValueError if the id was supplied by the caller or the order itself was
+    placed already, otherwise gives the order a new allocated id.
+    """
+    if not order._allocated_id or entries[order._id].order is order:
+        raise ValueError('duplicate order id')
+    while order._id in entries:
+        order._id = order_ids.next()
 
 class Order:
-    def __init__(self, side=None, symbol=None, quantity=None, price=None, time=None, id=None):
+    def __init__(self, side=None, symbol=None, quantity=None, price=None, time=None, id=None, account=None, tif=None, expire_time=None, stop_price=None):
         self._side = Side.normalize(side)
         self._symbol = symbol
         self._quantity = quantity
         self._price = price
         self._time = time
-        self._id = id if id is not None else builtin_id(self)
+        # Whether the id was allocated rather than supplied (see allocate_id())
+        self._allocated_id = id is None
+        if id is None:
+            id = order_ids.next()
+        elif type(id) is int:
+            order_ids.reserve(id)
+        self._id = id
+        self._account = account
+        self._tif = TimeInForce.normalize(tif)
+        self._expire_time = expire_time
+        self._stop_price = stop_price
+
+        if self._tif == TimeInForce.GTT and expire_time is None:
+            raise ValueError('expire_time is required for GTT orders')
 
     @property
     def side(self):
@@ -62,6 +221,22 @@ class Order:
     def id(self):
         return self._id
 
+    @property
+    def account(self):
+        return self._account
+
+    @property
+    def tif(self):
+        return self._tif
+
+    @property
+    def expire_time(self):
+        return self._expire_time
+
+    @property
+    def stop_price(self):
+        return self._stop_price
+
     def __repr__(self):
         return 'Order(side={}, symbol={}, quantity={}, price={})'.format(self.side, self.symbol, self.quantity, self.price)
 
@@ -165,9 +340,11 @@ class OrderEntry:
         self._price = order.price
         self._time = order.time if order.time is not None else self.default_time()
         self._order_id = order.id
+        self._account = order.account
 
         self._remaining = order.quantity
         self._state = State.NEW
+        self._owner = None
 
     @property
     def order(self):
@@ -197,6 +374,10 @@ class OrderEntry:
     def order_id(self):
         return self._order_id
 
+    @property
+    def account(self):
+        return self._account
+
     @property
     def remaining(self):
         return self._remaining
@@ -255,31 +436,16 @@ class OrderStat:
     def __repr__(self):
         return 'OrderStat(price={}, volume={}, count={})'.format(self.price, self.volume, self.count)
 
-class Allocation:
-    def __init__(self, entry, quantity):
-        self._entry = entry
-        self._quantity = quantity
-
-    @property
-    def entry(self):
-        return self._entry
-
-    @property
-    def quantity(self):
-        return self._quantity
-
-    def __repr__(self):
-        return 'Allocation(entry={}, quantity={})'.format(self.entry, self.quantity)
-
-    @property
-    def pair(self):
-        return (self.entry, self.quantity)
+DEFAULT_ALLOCATION = ProRata()
 
 class TimeOrderQueue:
-    def __init__(self, time):
+    def __init__(self, time, stats=None):
         self._time = time
         self._volume = 0
+        self._count = 0
         self._entries = deque()
+        self._owner = None
+        self._stats = stats
 
     @property
     def time(self):
@@ -295,22 +461,46 @@ class TimeOrderQueue:
 
     @property
     def count(self):
-        return len(self.entries)
+        """
+        The number of live entries. Filled and cancelled entries are dropped
+        from the front of entries; those behind a live entry stay until it is
+        filled or cancelled, or the whole queue is drained and dropped.
+        """
+        return self._count
 
     def empty(self):
         return len(self.entries) == 0
 
+    def clone(self, owner):
+        queue = shallow_copy(self)
+        queue._owner = owner
+        queue._stats = owner.stats
+        queue._entries = deque(owner.adopt(entry) for entry in self._entries)
+        return queue
+
     def push(self, entry):
         self._volume += entry.remaining
+        self._count += 1
         self.entries.append(entry)
         return self
 
     def cancel(self, entry):
+        if entry._owner is not self._owner:
+            entry = self._owner.resolve(entry)
         self._volume -= entry.remaining
+        self._count -= 1
         entry.cancel()
+        self.pop_dead()
         return self
 
-    def execute(self, ask_queue):
+    def pop_dead(self):
+        # Drops filled and cancelled entries from the front, so that FIFO
+        # allocation does not walk over them again on the next execution
+        entries = self._entries
+        while entries and entries[0]._remaining == 0:
+            entries.popleft()
+
+    def execute(self, ask_queue, tracer=None, allocation=None):
         bid_queue = self
 
         sum_quantity = min(bid_queue.volume, ask_queue.volume)
@@ -318,8 +508,14 @@ class TimeOrderQueue:
         if sum_quantity == 0:
             return []
 
-        bid_allocations = bid_queue.allocate(sum_quantity)
-        ask_allocations = ask_queue.allocate(sum_quantity)
+        bid_allocations = bid_queue.allocate(sum_quantity, allocation)
+        ask_allocations = ask_queue.allocate(sum_quantity, allocation)
+
+        if tracer is not None:
+            now = perf_counter_ns()
+            for allocations in (bid_allocations, ask_allocations):
+                for item in allocations:
+                    tracer(Stage.ALLOCATION_DONE, now, item.entry.order_id)
 
         executions = []
         b = 0
@@ -338,44 +534,37 @@ class TimeOrderQueue:
             ask_quantity -= execution.quantity
 
             if bid_quantity == 0:
+                if bid_entry.remaining == 0:
+                    bid_queue._count -= 1
                 b += 1
                 if b < len(bid_allocations):
                     bid_entry, bid_quantity = bid_allocations[b].pair
             if ask_quantity == 0:
+                if ask_entry.remaining == 0:
+                    ask_queue._count -= 1
                 a += 1
                 if a < len(ask_allocations):
                     ask_entry, ask_quantity = ask_allocations[a].pair
 
-        return executions
-
-    def allocate(self, sum_quantity):
-        unit = float(sum_quantity) / self.volume
-        remaining_entries = filter(lambda entry: entry.remaining > 0, self.entries)
-        allocations = [Allocation(entry, round(entry.remaining * unit)) for entry in remaining_entries]
+        bid_queue.pop_dead()
+        ask_queue.pop_dead()
 
-        current_sum = sum([allocation.quantity for allocation in allocations])
-
-        while current_sum != sum_quantity:
-            if current_sum < sum_quantity:
-                incr = 1
-                alloc_iter = iter(allocations)
-            else:
-                incr = -1
-                alloc_iter = reversed(allocations)
-
-            while current_sum != sum_quantity:
-                allocation = next(alloc_iter)
-                allocation._quantity += incr
-                current_sum += incr
+        return executions
 
-        return allocations
+    def allocate(self, sum_quantity, allocation=None):
+        if allocation is None:
+            allocation = DEFAULT_ALLOCATION
+        return allocation.allocate(self._entries, self._volume, sum_quantity, self._stats)
 
 class PriceOrderQueue:
-    def __init__(self, price):
-        self._heap = KeyedHeap()
+    def __init__(self, price, stats=None, pool=None):
+        self._heap = KeyedHeap(stats)
         self._price = price
         self._count = 0
         self._volume = 0
+        self._owner = None
+        self._stats = stats
+        self._pool = pool
 
     @property
     def heap(self):
@@ -396,6 +585,22 @@ class PriceOrderQueue:
     def empty(self):
         return self.heap.empty()
 
+    def clone(self, owner):
+        queue = shallow_copy(self)
+        queue._owner = owner
+        queue._stats = owner.stats
+        queue._pool = owner.pool
+        queue._heap = self._heap.copy()
+        queue._heap.stats = queue._stats
+        return queue
+
+    def own(self, time_key):
+        child = self.heap[time_key]
+        if child._owner is not self._owner:
+            child = child.clone(self._owner)
+            self.heap.replace(time_key, child)
+        return child
+
     def get_time_key(self, entry):
         return entry.time
 
@@ -404,9 +609,9 @@ class PriceOrderQueue:
         time_key = self.get_time_key(entry)
 
         if time_key in self.heap:
-            child = self.heap[time_key]
+            child = self.own(time_key)
         else:
-            child = TimeOrderQueue(time)
+            child = self.new_time_queue(time)
             self.heap.push(time_key, child)
 
         child.push(entry)
@@ -422,32 +627,71 @@ class PriceOrderQueue:
         # Note: Update volume before child.cancel(entry). Otherwise, entry.remaining would already be zero.
         self._count -= 1
         self._volume -= entry.remaining
-        child = self.heap[time_key]
+        child = self.own(time_key)
         child.cancel(entry)
 
+        if child.volume == 0:
+            self.drop_time_queue(time_key)
+
         return self
 
+    def drop_time_queue(self, time_key):
+        # Drained time queues are removed wherever they are in the heap
+        child = self.heap.remove(time_key)
+        if self._pool is not None:
+            self.release_time_queue(child)
+
+    def new_time_queue(self, time):
+        child = self._pool.acquire_time_queue() if self._pool is not None else None
+        if child is None:
+            child = TimeOrderQueue(time, self._stats)
+        else:
+            child._time = time
+            child._stats = self._stats
+        child._owner = self._owner
+        return child
+
+    def release_time_queue(self, child):
+        # Only time queues not shared with a fork can be reset and reused
+        if child._owner is self._owner:
+            child._entries.clear()
+            child._volume = 0
+            child._count = 0
+            self._pool.release_time_queue(child)
+
+    def release(self):
+        for child in self.heap.pq_map.values():
+            self.release_time_queue(child)
+        self.heap.clear()
+        self._count = 0
+        self._volume = 0
+
     def pop_empty_values(self):
         while not self.heap.empty():
+            if self._stats is not None:
+                self._stats.pop_empty_iterations += 1
             if self.heap.peek_value().empty() or self.heap.peek_value().volume == 0:
-                self.heap.pop()
+                _, child = self.heap.pop()
+                if self._pool is not None:
+                    self.release_time_queue(child)
             else:
                 break
 
-    def execute(self, ask_queue):
+    def execute(self, ask_queue, tracer=None, allocation=None):
         bid_queue = self
 
         executions = []
 
         while not bid_queue.heap.empty() and not ask_queue.heap.empty():
-            bid_child = bid_queue.heap.peek_value()
-            ask_child = ask_queue.heap.peek_value()
+            bid_child = bid_queue.own(bid_queue.heap.peek_key())
+            ask_child = ask_queue.own(ask_queue.heap.peek_key())
 
             bid_orig_count = bid_child.count
             ask_orig_count = ask_child.count
 
-            child_executions = bid_child.execute(ask_child)
+            child_executions = bid_child.execute(ask_child, tracer, allocation)
 
+            # Counts of live entries, so fully filled ones are subtracted
             bid_queue._count -= bid_orig_count - bid_child.count
             ask_queue._count -= ask_orig_count - ask_child.count
 
@@ -463,8 +707,8 @@ class PriceOrderQueue:
         return executions
 
 class OrderQueue:
-    def __init__(self):
-        self._heap = KeyedHeap()
+    def __init__(self, stats=None, pool=None):
+        self._heap = KeyedHeap(stats)
         self._count = 0
         self._volume = 0
         self._market_order_count = 0
@@ -472,6 +716,10 @@ class OrderQueue:
         self._limit_order_count = 0
         self._limit_order_volume = 0
         self._next_price = None
+        self._owner = None
+        self._stats = stats
+        self._pool = pool
+        self._book_arrays = None
 
     @property
     def heap(self):
@@ -505,7 +753,25 @@ class OrderQueue:
     def next_price(self):
         return self._next_price
 
+    def clone(self, owner):
+        queue = shallow_copy(self)
+        queue._owner = owner
+        queue._stats = owner.stats
+        queue._pool = owner.pool
+        queue._heap = self._heap.copy()
+        queue._heap.stats = queue._stats
+        return queue
+
+    def own(self, price_key):
+        child = self.heap[price_key]
+        if child._owner is not self._owner:
+            child = child.clone(self._owner)
+            self.heap.replace(price_key, child)
+        return child
+
     def update_stats(self, delta_count, delta_quantity, is_market_order):
+        # Every change of the levels goes through here
+        self._book_arrays = None
         self._count += delta_count
         self._volume += delta_quantity
         if is_market_order:
@@ -543,20 +809,45 @@ class OrderQueue:
         return price_key
 
     def pop_empty_values(self):
+        popped = 0
         while not self.heap.empty():
+            if self._stats is not None:
+                self._stats.pop_empty_iterations += 1
             if self.heap.peek_value().empty() or self.heap.peek_value().volume == 0:
-                self.heap.pop()
+                _, child = self.heap.pop()
+                if self._pool is not None:
+                    self.release_level(child)
+                popped += 1
             else:
                 break
+        return popped
+
+    def new_level(self, price):
+        child = self._pool.acquire_level() if self._pool is not None else None
+        if child is None:
+            child = PriceOrderQueue(price, self._stats, self._pool)
+        else:
+            child._price = price
+            child._stats = self._stats
+            child._heap.stats = self._stats
+            child._pool = self._pool
+        child._owner = self._owner
+        return child
+
+    def release_level(self, child):
+        # Only levels not shared with a fork can be reset and reused
+        if child._owner is self._owner:
+            child.release()
+            self._pool.release_level(child)
 
     def push(self, entry):
         price = entry.price
         price_key = self.get_price_key(entry)
 
         if price_key in self.heap:
-            child = self.heap[price_key]
+            child = self.own(price_key)
         else:
-            child = PriceOrderQueue(price)
+            child = self.new_level(price)
             self.heap.push(price_key, child)
 
         child.push(entry)
@@ -571,12 +862,54 @@ class OrderQueue:
 
         # Note: Update stats before child.cancel(entry). Otherwise, entry.remaining would already be zero.
         self.update_stats(-1, -entry.remaining, entry.price is None)
-        self.update_next_price()
-        child = self.heap[price_key]
+        child = self.own(price_key)
         child.cancel(entry)
 
+        # Drop the level if drained, at any depth, so that neither next_price
+        # (and can_execute()) nor get_order_book() walks see it again
+        if child.volume == 0:
+            self.drop_level(price_key)
+        self.update_next_price()
+
+        return self
+
+    def cancel_batch(self, entries):
+        """
+        Cancels entries of this side, updating next_price once at the end.
+        """
+        for entry in entries:
+            self.update_stats(-1, -entry.remaining, entry.price is None)
+            price_key = self.get_price_key(entry)
+            child = self.own(price_key)
+            child.cancel(entry)
+            if child.volume == 0:
+                self.drop_level(price_key)
+
+        self.update_next_price()
+
         return self
 
+    def drop_level(self, price_key):
+        child = self.heap.remove(price_key)
+        if self._pool is not None:
+            self.release_level(child)
+
+    def remove_level(self, price_key):
+        """
+        Removes a whole price level and returns its live entries, which are
+        left for the caller to cancel.
+        """
+        level = self.heap.remove(price_key)
+        entries = [entry for time_queue in level.heap.pq_map.values() for entry in time_queue.entries if entry.remaining > 0]
+
+        self.update_stats(-len(entries), -sum(entry.remaining for entry in entries), level.price is None)
+        self.update_next_price()
+
+        if self._pool is not None:
+            self.release_level(level)
+
+        return entries
+
     def can_execute(self, ask_queue):
         """
         In order for a product to be executable, certain conditions must be
@@ -615,7 +948,7 @@ class OrderQueue:
 
         return True
 
-    def execute(self, ask_queue):
+    def execute(self, ask_queue, tracer=None, allocation=None):
         bid_queue = self
 
         if not bid_queue.can_execute(ask_queue):
@@ -624,17 +957,28 @@ class OrderQueue:
         executions = []
 
         while not bid_queue.heap.empty() and not ask_queue.heap.empty():
-            bid_child = bid_queue.heap.peek_value()
-            ask_child = ask_queue.heap.peek_value()
+            bid_key, bid_child = bid_queue.heap.peek()
+            ask_key, ask_child = ask_queue.heap.peek()
 
             if bid_child.price is not None and ask_child.price is not None:
                 if bid_child.price < ask_child.price:
                     break
 
-            child_executions = bid_child.execute(ask_child)
+            bid_child = bid_queue.own(bid_key)
+            ask_child = ask_queue.own(ask_key)
 
-            bid_queue.pop_empty_values()
-            ask_queue.pop_empty_values()
+            child_executions = bid_child.execute(ask_child, tracer, allocation)
+
+            bid_popped = bid_queue.pop_empty_values()
+            ask_popped = ask_queue.pop_empty_values()
+
+            if tracer is not None and child_executions:
+                # Attributed to the orders filled last on each side
+                now = perf_counter_ns()
+                for _ in range(bid_popped):
+                    tracer(Stage.LEVEL_POPPED, now, child_executions[-1].bid_fill.order_id)
+                for _ in range(ask_popped):
+                    tracer(Stage.LEVEL_POPPED, now, child_executions[-1].ask_fill.order_id)
 
             executions.extend(child_executions)
 
@@ -666,24 +1010,184 @@ class OrderQueue:
 
         return executions
 
-    def get_order_book(self):
+    def get_order_book(self, depth=None):
         order_book = []
         for child in self.heap.values():
+            if depth is not None and len(order_book) >= depth:
+                break
             if child.volume > 0:
                 order_book.append(OrderStat(child.price, child.volume, child.count))
         return order_book
 
+    def get_order_book_arrays(self, depth=None):
+        """
+        Returns the same levels as get_order_book() as a tuple of read-only
+        NumPy arrays (price, volume, count): float64 prices, NaN for market
+        orders, and int64 volumes and counts.
+
+        The arrays are views over buffers built on the first call after the
+        book changes, so repeated snapshots of an unchanged side (at the same
+        or a smaller depth) do not copy. Earlier results are not modified when
+        the book changes.
+        """
+        if numpy is None:
+            raise ImportError('get_order_book_arrays requires numpy')
+
+        book = self._book_arrays
+        if book is None or (book[0] is not None and (depth is None or depth > book[0])):
+            book = self.build_book_arrays(depth)
+            self._book_arrays = book
+
+        _, prices, volumes, counts = book
+        if depth is not None:
+            return (prices[:depth], volumes[:depth], counts[:depth])
+        return (prices, volumes, counts)
+
+    def build_book_arrays(self, depth):
+        pq_map = self.heap.pq_map
+        keys = self.heap.pq_list
+        if self.heap.dead:
+            keys = [key for key in keys if key in pq_map]
+        if depth is None:
+            keys = sorted(keys)
+        else:
+            top = heapq.nsmallest(depth, keys)
+            # Deeper levels are needed only if some of the top ones are empty
+            keys = top if all(pq_map[key].volume > 0 for key in top) else sorted(keys)
+
+        prices = array('d')
+        volumes = array('q')
+        counts = array('q')
+        for key in keys:
+            if depth is not None and len(prices) >= depth:
+                break
+            child = pq_map[key]
+            if child.volume > 0:
+                prices.append(child.price if child.price is not None else float('nan'))
+                volumes.append(child.volume)
+                counts.append(child.count)
+
+        columns = []
+        for values, dtype in ((prices, numpy.float64), (volumes, numpy.int64), (counts, numpy.int64)):
+            column = numpy.frombuffer(values, dtype=dtype) if values else numpy.empty(0, dtype=dtype)
+            column.flags.writeable = False
+            columns.append(column)
+
+        return (depth,) + tuple(columns)
+
+class TriggerIndex:
+    """
+    Ids of pending stop orders, in one heap per side ordered by how soon they
+    trigger: buy stops by ascending and sell stops by descending stop price,
+    then by placement. Cancelled ids are left in the heaps and skipped when
+    popped, until they outnumber the pending ones.
+    """
+
+    def __init__(self):
+        self._heaps = {
+            Side.BUY : [],
+            Side.SELL: [],
+        }
+        self._pending = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, order_id):
+        return order_id in self._pending
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def copy(self):
+        index = TriggerIndex()
+        index._heaps = {side: list(heap) for side, heap in self._heaps.items()}
+        index._pending = dict(self._pending)
+        index._sequence = self._sequence
+        return index
+
+    def get_key(self, side, stop_price):
+        return stop_price if side == Side.BUY else -stop_price
+
+    def triggered(self, side, stop_price, price):
+        # Buy stops trigger at or above, and sell stops at or below, the stop price
+        return price is not None and self.get_key(side, stop_price) <= self.get_key(side, price)
+
+    def push(self, side, stop_price, order_id):
+        self._sequence += 1
+        heapq.heappush(self._heaps[side], (self.get_key(side, stop_price), self._sequence, order_id))
+        self._pending[order_id] = side
+
+    def cancel(self, order_id):
+        side = self._pending.pop(order_id)
+        heap = self._heaps[side]
+        if len(heap) > 2 * len(self._pending) + 16:
+            pending = self._pending
+            heap = [item for item in heap if item[2] in pending]
+            heapq.heapify(heap)
+            self._heaps[side] = heap
+
+    def release(self, price):
+        """
+        Removes and returns the ids of the stops triggered by price, in order
+        of their stop price and then placement, buy stops first.
+        """
+        pending = self._pending
+        released = []
+        for side, heap in self._heaps.items():
+            limit = self.get_key(side, price)
+            while heap and heap[0][0] <= limit:
+                order_id = heapq.heappop(heap)[2]
+                if pending.pop(order_id, None) is not None:
+                    released.append(order_id)
+        return released
+
 class Product:
-    def __init__(self, symbol):
+    def __init__(self, symbol, sink=None, stats=False, tracer=None, allocation=None, pool=False, trade_stats=False, bar_interval=None):
         self._symbol = symbol
+        self._sink = sink
+        self._stats = Stats() if stats else None
+        self._tracer = tracer
+        self._allocation = allocation if allocation is not None else DEFAULT_ALLOCATION
+        self._pool = QueuePool() if pool else None
 
         self._order_queues = {
-            Side.BUY : OrderQueue(),
-            Side.SELL: OrderQueue(),
+            Side.BUY : OrderQueue(self._stats, self._pool),
+            Side.SELL: OrderQueue(self._stats, self._pool),
         }
 
         self._entries = {}
+        self._entry_count = 0
+        # Ids of this product's entries, as an ordered set, so that its view
+        # of a shared entry table does not scan the other products' entries
+        self._ids = {}
         self._last_price = None
+        self._session = TradeStats() if trade_stats or bar_interval is not None else None
+        self._bars = BarSeries(bar_interval) if bar_interval is not None else None
+
+        # Ids of live (new or partially filled) entries, as ordered sets
+        self._open = {
+            Side.BUY : {},
+            Side.SELL: {},
+        }
+        self._accounts = {}
+        # The owner of the two indexes above, which are shared with forks
+        # until either side mutates them (see own_indexes())
+        self._index_owner = None
+        self._market_accounts = None
+        self._market_bbo = None
+        self._pending_ioc = []
+        self._triggers = TriggerIndex()
+
+        self._subscriptions = []
+        self._market_subscriptions = []
+        self._events = None
+
+        self._owner = None
+        self._market = None
+        self._market_owner = None
 
     @property
     def symbol(self):
@@ -695,7 +1199,73 @@ class Product:
 
     @property
     def entries(self):
-        return self._entries
+        """
+        The entries of this product by id, as a read-only view of the entry
+        table, which a product shares with its market and the market's other
+        products.
+        """
+        return SymbolEntries(self._entries, self._ids)
+
+    @property
+    def sink(self):
+        return self._sink
+
+    @sink.setter
+    def sink(self, sink):
+        self._sink = sink
+
+    @property
+    def tracer(self):
+        """
+        A callable tracer(stage, timestamp, order_id) called at each Stage of
+        placement and execution, with a perf_counter_ns() timestamp, or None.
+
+        ORDER_RECEIVED, LEVEL_CREATED and ENTRY_QUEUED are emitted by place(),
+        with the id of the placed order; for stop orders, the latter two are
+        emitted when the stop is triggered. During execution, ALLOCATION_DONE and
+        EXECUTION_EMITTED are emitted for each allocated or filled order, and
+        LEVEL_POPPED for each emptied price level, with the id of the order
+        filled last on that side.
+        """
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer):
+        self._tracer = tracer
+
+    @property
+    def allocation(self):
+        """
+        The AllocationPolicy splitting fills among orders of the same price
+        and time: ProRata (the default), ProRataMinLot, ProRataTopOrder, Fifo
+        or a custom subclass.
+        """
+        return self._allocation
+
+    @allocation.setter
+    def allocation(self, allocation):
+        self._allocation = allocation if allocation is not None else DEFAULT_ALLOCATION
+
+    @property
+    def pool(self):
+        """
+        The QueuePool reusing emptied price levels and time queues, or None if
+        the product was created without pool=True.
+        """
+        return self._pool
+
+    def stats(self, reset=False):
+        """
+        Returns a snapshot (dict) of the hot-path counters and latency
+        histograms, or None if the product was created without stats=True.
+        With reset=True, the counters are reset after taking the snapshot.
+        """
+        if self._stats is None:
+            return None
+        snapshot = self._stats.snapshot()
+        if reset:
+            self._stats.reset()
+        return snapshot
 
     @property
     def bid_price(self):
@@ -712,6 +1282,64 @@ class Product:
     @last_price.setter
     def last_price(self, last_price):
         self._last_price = last_price
+        if self._market_bbo is not None:
+            self._market_bbo.touch(self._symbol)
+
+    def idle(self):
+        """
+        Returns True if the product has no live or pending orders, so empty
+        order queues, and no subscriptions of its own.
+        """
+        order_queues = self._order_queues
+        return not (self._open[Side.BUY] or self._open[Side.SELL] or self._triggers.pending or self._pending_ioc
+                    or order_queues[Side.BUY].heap or order_queues[Side.SELL].heap or self._subscriptions)
+
+    def quote(self):
+        """
+        Returns the Quote of this product: the best prices, the volumes of the
+        best limit price levels and the last price.
+        """
+        bid_price = self.bid_price
+        ask_price = self.ask_price
+        bid_volume = self.order_queues[Side.BUY].heap[price_key(Side.BUY, bid_price)].volume if bid_price is not None else 0
+        ask_volume = self.order_queues[Side.SELL].heap[price_key(Side.SELL, ask_price)].volume if ask_price is not None else 0
+        return Quote(bid_price, ask_price, bid_volume, ask_volume, self._last_price)
+
+    @property
+    def session(self):
+        """
+        TradeStats (OHLC, volume, count and VWAP) of the executions since the
+        session started, or None if the product was created without
+        trade_stats=True or a bar_interval.
+        """
+        return self._session
+
+    @property
+    def bars(self):
+        """
+        The BarSeries of the executions, or None without a bar_interval. Bars
+        are timed by the later of the two orders of each execution.
+        """
+        return self._bars
+
+    def reset_session(self):
+        if self._session is not None:
+            self._session.reset()
+
+    def record_trades(self, executions):
+        session = self._session
+        bars = self._bars
+        end = bars.end if bars is not None else None
+        for execution in executions:
+            price = execution._price
+            quantity = execution._quantity
+            session.add(price, quantity)
+            if bars is not None:
+                fills = execution._fills
+                bars.add(max(fills[Side.BUY]._order_time, fills[Side.SELL]._order_time), price, quantity)
+        if bars is not None and bars.end != end and self._market is not None:
+            # A new bar started; the market completes it when the clock passes its end
+            self._market.schedule_bar(self._symbol, bars.end)
 
     def __lt__(self, other):
         return self.symbol < other.symbol
@@ -720,39 +1348,597 @@ class Product:
         side = Side.normalize(side)
         return self.order_queues[side]
 
+    def fork(self, entries=None):
+        """
+        Returns a logically independent copy of this product. The fork shares
+        order queues, price levels, entries and open order indexes with
+        this product until either side mutates them, at which point only the
+        affected structures are copied. The fork does not inherit the sink, stats, tracer or
+        subscriptions.
+
+        The fork gets a new entry table layered over the current one (see
+        fork_entries()), unless given the table to use instead (as
+        Market.own() does with the market's table).
+        """
+        if entries is None:
+            entries = self.fork_entries()
+        product = shallow_copy(self)
+        product._entries = entries
+        product._ids = EntryTable.layer(self._ids)
+        self._ids = EntryTable.layer(self._ids)
+        product._order_queues = dict(self._order_queues)
+        product._market_accounts = None
+        product._market_bbo = None
+        product._pending_ioc = list(self._pending_ioc)
+        product._triggers = self._triggers.copy()
+        product._session = self._session.copy() if self._session is not None else None
+        product._bars = self._bars.copy() if self._bars is not None else None
+        product._sink = None
+        product._stats = None
+        product._pool = QueuePool(self._pool.capacity) if self._pool is not None else None
+        product._tracer = None
+        product._subscriptions = []
+        product._market_subscriptions = []
+        product._events = None
+        product._owner = Owner(product)
+        product._market = None
+        product._market_owner = None
+
+        # Structures created so far are now shared with the fork
+        self._owner = Owner(self)
+
+        return product
+
+    def fork_entries(self):
+        """
+        Returns an entry table for a fork of this product. The current table
+        becomes a read-only layer of both the fork's table and a new one for
+        this product (or for its market and the market's products, which
+        share it), so no entries are copied.
+        """
+        table = self._entries
+        if self._market is not None and self._market.entries is table:
+            return self._market.fork_entries()
+        self._entries = EntryTable.layer(table)
+        return EntryTable.layer(table)
+
+    def attach(self, market_owner, market_entries, market_subscriptions, market_accounts, market_bbo=None, market=None):
+        # Products of a market share its entry table
+        if self._entries is not market_entries:
+            market_entries.update(self._entries)
+            self._entries = market_entries
+        if market is not None and market is not self._market and self._bars is not None and self._bars.end is not None:
+            market.schedule_bar(self._symbol, self._bars.end)
+        self._market = market
+        self._market_owner = market_owner
+        self._market_subscriptions = market_subscriptions
+        self._market_accounts = market_accounts
+        self._market_bbo = market_bbo
+        if market_bbo is not None:
+            market_bbo.touch(self._symbol)
+        self.update_events()
+
+    def own_indexes(self):
+        # Copies the open and account indexes if they are shared with a fork
+        if self._index_owner is not self._owner:
+            self._open = {side: dict(ids) for side, ids in self._open.items()}
+            self._accounts = {account: dict(ids) for account, ids in self._accounts.items()}
+            self._index_owner = self._owner
+
+    def open_entry(self, entry):
+        if self._index_owner is not self._owner:
+            self.own_indexes()
+        self._open[entry.side][entry.order_id] = None
+        account = entry.account
+        if account is not None:
+            self._accounts.setdefault(account, {})[entry.order_id] = None
+            if self._market_accounts is not None:
+                self._market_accounts.setdefault(account, {})[entry.order_id] = None
+
+    def close_entry(self, side, order_id):
+        if self._index_owner is not self._owner:
+            self.own_indexes()
+        del self._open[side][order_id]
+        account = self._entries[order_id].account
+        if account is not None:
+            self.close_account(account, order_id)
+
+    def close_account(self, account, order_id):
+        ids = self._accounts[account]
+        del ids[order_id]
+        if not ids:
+            del self._accounts[account]
+
+        if self._market_accounts is not None:
+            ids = self._market_accounts[account]
+            del ids[order_id]
+            if not ids:
+                del self._market_accounts[account]
+
+    def open_orders(self, side=None, account=None):
+        """
+        Returns the live (new or partially filled) entries of the given side
+        and/or account, in placement order, from indexes maintained on place,
+        fill and cancel.
+        """
+        if account is not None:
+            ids = self._accounts.get(account, {})
+            entries = [self._entries[order_id] for order_id in ids]
+            if side is not None:
+                side = Side.normalize(side)
+                entries = [entry for entry in entries if entry.side == side]
+            return entries
+        elif side is not None:
+            return [self._entries[order_id] for order_id in self._open[Side.normalize(side)]]
+        else:
+            return [self._entries[order_id] for ids in self._open.values() for order_id in ids]
+
+    def stop_orders(self, side=None, account=None):
+        """
+        Returns the pending (not yet triggered) stop orders of the given side
+        and/or account, in placement order. These are not in open_orders().
+        """
+        side = Side.normalize(side)
+        return [
+            self._entries[order_id] for order_id, order_side in self._triggers.pending.items()
+            if (side is None or order_side == side) and (account is None or self._entries[order_id].account == account)
+        ]
+
+    def update_events(self):
+        if self._subscriptions or self._market_subscriptions:
+            if self._events is None:
+                self._events = EventBuffer()
+        else:
+            self._events = None
+
+    def subscribe(self, callback, sides=None, events=None):
+        """
+        Registers callback(batches) to receive a list with an EventBatch of
+        this product at the end of each execute() (or flush()), restricted to
+        the given sides and Event kinds. Returns a Subscription.
+        """
+        if sides is not None:
+            sides = [Side.normalize(side) for side in sides]
+        subscription = Subscription(callback, sides=sides, events=events)
+        self._subscriptions.append(subscription)
+        self.update_events()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.remove(subscription)
+        self.update_events()
+
+    def get_level_update(self, side, price):
+        queue = self.order_queues[side]
+        key = price_key(side, price)
+        if key in queue.heap:
+            level = queue.heap[key]
+            if level.volume > 0:
+                return LevelUpdate(side, price, level.volume, level.count)
+        return LevelUpdate(side, price, 0, 0)
+
+    def take_batch(self):
+        """
+        Returns the pending events as an EventBatch, or None if there are none
+        (or no subscribers), and starts a new batch.
+        """
+        events = self._events
+        if not events:
+            return None
+        self._events = EventBuffer()
+
+        level_updates = {side: [self.get_level_update(side, price) for price in prices] for side, prices in events.levels.items()}
+        return EventBatch(self.symbol, events.executions, events.state_changes, level_updates)
+
+    def flush(self):
+        """
+        Delivers the pending events to the subscribers of this product and of
+        its market.
+        """
+        batch = self.take_batch()
+        if batch is not None:
+            for subscription in self._subscriptions + self._market_subscriptions:
+                subscription.deliver([batch])
+
+    def own(self, side):
+        # Every change of the order queues takes them here first, or replaces
+        # them through reset_queue()
+        if self._market_bbo is not None:
+            self._market_bbo.touch(self._symbol)
+        queue = self.order_queues[side]
+        if queue._owner is not self._owner:
+            queue = queue.clone(self._owner)
+            self.order_queues[side] = queue
+        return queue
+
+    def reset_queue(self, side):
+        # Replaces the order queue of the side with an empty one
+        if self._market_bbo is not None:
+            self._market_bbo.touch(self._symbol)
+        queue = OrderQueue(self._stats, self._pool)
+        queue._owner = self._owner
+        self.order_queues[side] = queue
+        return queue
+
+    def replace_entry(self, entry):
+        self._entries[entry.order_id] = entry
+
     def place(self, order):
-        if order.id in self.entries:
-            raise ValueError('duplicate order id')
+        """
+        Adds the order to the book and returns its entry. A stop order
+        (stop_price set) stays PENDING outside the order queues until the last
+        price reaches its stop price, unless it already has; see trigger().
+        """
+        if order.id in self._entries:
+            allocate_id(order, self._entries)
+
+        stats = self._stats
+        if stats is not None:
+            start = perf_counter_ns()
+
+        tracer = self._tracer
+        if tracer is not None:
+            tracer(Stage.ORDER_RECEIVED, perf_counter_ns(), order.id)
 
         entry = OrderEntry(order)
-        self.order_queues[order.side].push(entry)
-        self.entries[order.id] = entry
+        entry._owner = self._owner
+        self._entries[order.id] = entry
+        self._ids[order.id] = None
+        self._entry_count += 1
+
+        stop_price = order._stop_price
+        if stop_price is not None and not self._triggers.triggered(order.side, stop_price, self._last_price):
+            entry._state = State.PENDING
+            self._triggers.push(order.side, stop_price, order.id)
+            if self._events is not None:
+                self._events.change(order.id, order.side, None, State.PENDING)
+        else:
+            self.queue_entry(entry, None)
 
-    def cancel(self, order):
-        if order.id not in self.entries:
-            raise ValueError('no such order id')
+        if stats is not None:
+            stats.latency['place'].record(perf_counter_ns() - start)
+
+        return entry
 
+    def queue_entry(self, entry, old_state):
+        order_id = entry.order_id
+        side = entry.side
+        queue = self.own(side)
+
+        tracer = self._tracer
+        if tracer is not None:
+            created = queue.get_price_key(entry) not in queue.heap
+            queue.push(entry)
+            if created:
+                tracer(Stage.LEVEL_CREATED, perf_counter_ns(), order_id)
+            tracer(Stage.ENTRY_QUEUED, perf_counter_ns(), order_id)
+        else:
+            queue.push(entry)
+
+        self.open_entry(entry)
+
+        if entry.order._tif is TimeInForce.IOC:
+            self._pending_ioc.append(order_id)
+
+        if self._events is not None:
+            self._events.change(order_id, side, old_state, State.NEW)
+            self._events.touch(side, entry.price)
+
+    def trigger(self, price):
+        """
+        Moves the stops triggered by price from the trigger index into the
+        order queues, as limit orders at their price or as market orders
+        without one, and returns their ids.
+        """
+        released = self._triggers.release(price)
+        owner = self._owner
+        for order_id in released:
+            entry = self._entries[order_id]
+            if entry._owner is not owner:
+                entry = owner.adopt(entry)
+            entry._state = State.NEW
+            self.queue_entry(entry, State.PENDING)
+        return released
+
+    def cancel(self, order):
         # Note: Update volume before queue.cancel(entry). Otherwise, entry.remaining would already be zero.
-        entry = self.entries[order.id]
+        entry = self._entries.get(order.id)
+        if entry is None or entry.symbol != self.symbol:
+            raise ValueError('no such order id')
 
         if entry.state == State.FULLY_FILLED:
             raise ValueError('already fully filled')
         if entry.state == State.CANCELLED:
             raise ValueError('already cancelled')
 
-        self.order_queues[entry.side].cancel(entry)
+        stats = self._stats
+        if stats is not None:
+            start = perf_counter_ns()
+
+        old_state = entry.state
+        if old_state == State.PENDING:
+            self.cancel_stops([entry])
+        else:
+            self.own(entry.side).cancel(entry)
+            self.close_entry(entry.side, entry.order_id)
+
+            if self._events is not None:
+                self._events.change(entry.order_id, entry.side, old_state, State.CANCELLED)
+                self._events.touch(entry.side, entry.price)
+
+        if stats is not None:
+            stats.latency['cancel'].record(perf_counter_ns() - start)
+
+    def cancel_all(self, side=None, price=None, account=None):
+        """
+        Cancels all live orders matching the given side, price and account (any
+        if None) and returns their ids. Without an account, whole price levels
+        (or whole sides, without a price) are dropped at once; otherwise the
+        account's entries are cancelled in a single batch. Either way, the
+        order queue stats and next price are updated once per side. Pending
+        stop orders with a matching limit price are cancelled too.
+        """
+        sides = list(self._open) if side is None else [Side.normalize(side)]
+        with gc_paused():
+            ids = self.cancel_sides(sides, price, account)
+            if self._triggers:
+                stops = [entry for side in sides for entry in self.stop_orders(side, account) if price is None or entry.price == price]
+                ids.extend(self.cancel_stops(stops))
+            return ids
+
+    def cancel_sides(self, sides, price, account):
+        all_entries = self._entries
+        ids = []
+
+        for side in sides:
+            if account is not None:
+                entries = [all_entries[order_id] for order_id in self._accounts.get(account, {})]
+                entries = [entry for entry in entries if entry.side == side and (price is None or entry.price == price)]
+                ids.extend(self.cancel_entries(side, entries))
+            elif price is not None:
+                queue = self.own(side)
+                key = price_key(side, price)
+                entries = queue.remove_level(key) if key in queue.heap else []
+                ids.extend(self.cancel_entries(side, entries, dropped=True))
+            else:
+                entries = [all_entries[order_id] for order_id in self._open[side]]
+                self.reset_queue(side)
+                ids.extend(self.cancel_entries(side, entries, dropped=True))
+
+        return ids
+
+    def cancel_orders(self, order_ids):
+        """
+        Cancels the live orders among the given ids in a single batch per
+        side, and returns their ids. Unknown or terminal ids are skipped.
+        """
+        entries = {Side.BUY: [], Side.SELL: []}
+        stops = []
+        for order_id in order_ids:
+            entry = self._entries.get(order_id)
+            if entry is not None:
+                if order_id in self._open[entry.side]:
+                    entries[entry.side].append(entry)
+                elif order_id in self._triggers:
+                    stops.append(entry)
+
+        ids = []
+        with gc_paused():
+            for side, side_entries in entries.items():
+                ids.extend(self.cancel_entries(side, side_entries))
+            ids.extend(self.cancel_stops(stops))
+        return ids
+
+    def cancel_stops(self, entries):
+        """
+        Cancels pending stop orders, which are not in the order queues.
+        """
+        owner = self._owner
+        events = self._events
+        ids = []
+        for entry in entries:
+            self._triggers.cancel(entry.order_id)
+            if entry._owner is not owner:
+                entry = owner.adopt(entry)
+            entry.cancel()
+            if events is not None:
+                events.change(entry.order_id, entry.side, State.PENDING, State.CANCELLED)
+            ids.append(entry.order_id)
+        return ids
+
+    def cancel_entries(self, side, entries, dropped=False):
+        """
+        Cancels live entries of one side and updates the indexes in bulk. With
+        dropped=True, the entries' levels were already removed from the order
+        queue, so only the entries themselves are cancelled.
+        """
+        if not entries:
+            return []
+
+        events = self._events
+        if events is not None:
+            for entry in entries:
+                events.change(entry.order_id, side, entry.state, State.CANCELLED)
+                events.touch(side, entry.price)
+
+        ids = [entry._order_id for entry in entries]
+
+        # Entries are always a subset of the open ones
+        self.own_indexes()
+        open_ids = self._open[side]
+        if len(entries) == len(open_ids):
+            self._open[side] = {}
+        else:
+            for entry in entries:
+                del open_ids[entry._order_id]
+        if self._accounts:
+            for entry in entries:
+                if entry._account is not None:
+                    self.close_account(entry._account, entry._order_id)
+
+        if not dropped:
+            self.own(side).cancel_batch(entries)
+        else:
+            owner = self._owner
+            cancelled = State.CANCELLED
+            for entry in entries:
+                if entry._owner is not owner:
+                    entry = owner.adopt(entry)
+                entry._remaining = 0
+                entry._state = cancelled
+
+        return ids
+
+    def can_execute(self):
+        return self.order_queues[Side.BUY].can_execute(self.order_queues[Side.SELL])
+
+    def match(self, tracer):
+        if self.can_execute():
+            bid_order_queue = self.own(Side.BUY)
+            ask_order_queue = self.own(Side.SELL)
+            return bid_order_queue.execute(ask_order_queue, tracer, self._allocation)
+        else:
+            return []
+
+    def record_fills(self, executions):
+        # Recorded as each match happens, so that fills precede the changes
+        # that follow them (e.g. immediate-or-cancel or triggered orders)
+        events = self._events
+        for execution in executions:
+            for fill in execution.fills.values():
+                old_state = State.NEW if fill.cumulative_quantity == fill.quantity else State.PARTIALLY_FILLED
+                new_state = State.FULLY_FILLED if fill.cumulative_quantity == fill.order_quantity else State.PARTIALLY_FILLED
+                events.change(fill.order_id, fill.side, old_state, new_state)
+                events.touch(fill.side, fill.order_price)
+
+    def match_triggered(self, executions, tracer):
+        # Each batch of executions moves the last price, which may trigger
+        # stops, whose executions may in turn trigger further stops
+        executions = list(executions)
+        while self._triggers and self.trigger(executions[-1].price):
+            more = self.match(tracer)
+            if not more:
+                break
+            if self._events is not None:
+                self.record_fills(more)
+            executions.extend(more)
+        return executions
+
+    def memory_usage(self):
+        """
+        Returns a dict with the approximate bytes held by this product:
+
+            entries     : order entries (and their orders) and the entry map
+            time_queues : TimeOrderQueue objects and their deques
+            heaps       : OrderQueue/PriceOrderQueue objects and their heaps
+            dead        : cancelled or fully filled entries still referenced
+                          (included in entries)
+            total       : entries + time_queues + heaps
+
+        along with entry_count, dead_entry_count, queued_dead_count (dead
+        entries still held by deques), level_count and time_queue_count.
+
+        Sizes are estimated from per-class object sizes and a walk over price
+        levels and time queues, without visiting individual entries. Structures
+        shared with a fork are counted by both.
+        """
+        entry_count = self._entry_count
+        pending_count = len(self._triggers)
+        live_count = 0
+        queued_count = 0
+        level_count = 0
+        time_queue_count = 0
+        time_queues = 0
+        heaps = 0
+
+        for queue in self.order_queues.values():
+            live_count += queue.count
+            heaps += object_size(queue) + queue.heap.memory_usage()
+            for level in queue.heap.pq_map.values():
+                level_count += 1
+                heaps += object_size(level) + level.heap.memory_usage()
+                for time_queue in level.heap.pq_map.values():
+                    time_queue_count += 1
+                    queued_count += time_queue.count
+                    time_queues += object_size(time_queue) + sys.getsizeof(time_queue.entries)
+
+        entry_size = 0
+        if entry_count:
+            entry = next(iter(self._entries.values()))
+            entry_size = object_size(entry) + object_size(entry.order)
+
+        entries = entry_size * entry_count + sys.getsizeof(self._ids)
+        if self._market is None:
+            # Otherwise the table is shared with, and counted by, the market
+            entries += sys.getsizeof(self._entries)
+
+        return {
+            'entries': entries,
+            'time_queues': time_queues,
+            'heaps': heaps,
+            'dead': entry_size * (entry_count - live_count - pending_count),
+            'total': entries + time_queues + heaps,
+            'entry_count': entry_count,
+            'dead_entry_count': entry_count - live_count - pending_count,
+            'queued_dead_count': queued_count - live_count,
+            'level_count': level_count,
+            'time_queue_count': time_queue_count,
+        }
+
+    def execute(self, order=None, publish=True):
+        """
+        Places the order, if any, and executes crossing orders. Pending events
+        are delivered to subscribers afterwards, unless publish=False.
+        """
+        stats = self._stats
+        if stats is not None:
+            start = perf_counter_ns()
 
-    def execute(self, order=None):
         if order is not None:
             self.place(order)
 
-        bid_order_queue = self.order_queues[Side.BUY]
-        ask_order_queue = self.order_queues[Side.SELL]
+        tracer = self._tracer
+        executions = self.match(tracer)
 
-        executions = bid_order_queue.execute(ask_order_queue)
+        if executions and self._events is not None:
+            self.record_fills(executions)
+
+        if executions and self._triggers:
+            executions = self.match_triggered(executions, tracer)
 
         if executions:
             self._last_price = executions[-1].price
+            if self._session is not None:
+                self.record_trades(executions)
+            for execution in executions:
+                for fill in execution.fills.values():
+                    if fill.cumulative_quantity == fill.order_quantity:
+                        self.close_entry(fill.side, fill.order_id)
+            if self._sink is not None:
+                self._sink.extend(self.symbol, executions)
+            if tracer is not None:
+                now = perf_counter_ns()
+                for execution in executions:
+                    tracer(Stage.EXECUTION_EMITTED, now, execution.bid_fill.order_id)
+                    tracer(Stage.EXECUTION_EMITTED, now, execution.ask_fill.order_id)
+            if self._events is not None:
+                self._events.executions.extend(executions)
+
+        if self._pending_ioc:
+            # Immediate-or-cancel orders do not rest beyond the execution following their placement
+            pending_ioc = self._pending_ioc
+            self._pending_ioc = []
+            self.cancel_orders(pending_ioc)
+
+        if publish and self._events is not None:
+            self.flush()
+
+        if stats is not None:
+            if executions:
+                stats.auctions += 1
+                stats.executions += len(executions)
+                stats.executions_per_auction.record(len(executions))
+            stats.latency['execute'].record(perf_counter_ns() - start)
 
         return executions
 
@@ -766,9 +1952,9 @@ class Product:
         return self.execute(Order(*args, **kwargs))
 
     def get_order_by_id(self, order_id):
-        if order_id not in self.entries:
+        entry = self._entries.get(order_id)
+        if entry is None or entry.symbol != self.symbol:
             return None
-        entry = self.entries[order_id]
         return entry.order
 
     def format_order_book(self):
@@ -808,9 +1994,30 @@ class Product:
         return "\n".join(result)
 
 class Market:
-    def __init__(self):
+    def __init__(self, sink=None, stats=False, tracer=None, allocation=None, pool=False, trade_stats=False, bar_interval=None,
+                 timer_resolution=1.0, timer_slots=64, timer_levels=4):
         self._products = {}
         self._entries = {}
+        self._sink = sink
+        self._stats = stats
+        self._tracer = tracer
+        self._allocation = allocation
+        self._pool = pool
+        self._trade_stats = trade_stats
+        self._bar_interval = bar_interval
+        self._subscriptions = []
+        self._accounts = {}
+        self._evicted_entry_count = 0
+        self._bbo = BboTable()
+        # Expiry times in units finer than timer_resolution share a tick
+        self._timers = TimerWheel(timer_resolution, timer_slots, timer_levels)
+        # (end time, symbol) of the bars in progress, so that advance_time()
+        # visits only the products with a bar due
+        self._bar_ends = []
+        self._session_end = None
+        self._owner = None
+        self._lineage = set()
+        self._version = 0
 
     @property
     def products(self):
@@ -820,6 +2027,51 @@ class Market:
     def entries(self):
         return self._entries
 
+    @property
+    def sink(self):
+        return self._sink
+
+    @property
+    def tracer(self):
+        """
+        The tracer of this market. Setting it installs the tracer on all of
+        its products; see Product.tracer.
+        """
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer):
+        self._tracer = tracer
+        for product in self.products.values():
+            product.tracer = tracer
+
+    @property
+    def allocation(self):
+        """
+        The AllocationPolicy of products created by this market (None for the
+        default); see Product.allocation.
+        """
+        return self._allocation
+
+    @property
+    def now(self):
+        """
+        The time of the last advance_time(), or None.
+        """
+        return self._timers.now
+
+    @property
+    def session_end(self):
+        """
+        The time at which DAY orders expire; it must be set before placing DAY
+        orders.
+        """
+        return self._session_end
+
+    @session_end.setter
+    def session_end(self, session_end):
+        self._session_end = session_end
+
     def __contains__(self, symbol):
         return symbol in self.products
 
@@ -827,14 +2079,15 @@ class Market:
         if symbol is None:
             raise KeyError('symbol must be specified')
         if product is None:
-            product = Product(symbol)
+            product = Product(symbol, sink=self.sink, stats=self._stats, tracer=self.tracer, allocation=self._allocation, pool=self._pool, trade_stats=self._trade_stats, bar_interval=self._bar_interval)
+        product.attach(self._owner, self.entries, self._subscriptions, self._accounts, self._bbo, self)
         self.products[symbol] = product
         return product
 
     def __getitem__(self, symbol):
         if not self.has_product(symbol):
             self[symbol] = None
-        return self.products[symbol]
+        return self.own(symbol)
 
     def __iter__(self):
         return iter(self.products)
@@ -842,11 +2095,266 @@ class Market:
     def get_products(self):
         return self.products.values()
 
+    def open_orders(self, account=None, symbol=None, side=None):
+        """
+        Returns the live (new or partially filled) entries matching the given
+        account, symbol and side, without scanning terminal entries.
+        """
+        if account is not None:
+            entries = [self.entries[order_id] for order_id in self._accounts.get(account, {})]
+            if symbol is not None:
+                entries = [entry for entry in entries if entry.symbol == symbol]
+            if side is not None:
+                side = Side.normalize(side)
+                entries = [entry for entry in entries if entry.side == side]
+            return entries
+        elif symbol is not None:
+            if symbol not in self:
+                return []
+            return self.products[symbol].open_orders(side)
+        else:
+            return [entry for product in self.products.values() for entry in product.open_orders(side)]
+
+    def evict_idle(self, include_traded=False):
+        """
+        Removes the idle products (see Product.idle()), such as those created
+        by market[symbol] lookups of unknown symbols, and returns their
+        symbols. Products that have traded are kept, for their last price and
+        trade stats, unless include_traded=True. Pending events are published
+        first; the entries of evicted products stay in entries, and are
+        counted by memory_usage().
+        """
+        self.flush()
+        evicted = [symbol for symbol, product in self.products.items() if product.idle() and (include_traded or product.last_price is None)]
+        for symbol in evicted:
+            self._evicted_entry_count += self.products[symbol]._entry_count
+            del self.products[symbol]
+            self._bbo.touch(symbol)
+        return evicted
+
+    def bbo(self):
+        """
+        Returns the BboTable of the products of this market, after updating
+        the rows of the products changed since the last call.
+        """
+        self._bbo.refresh(self.products)
+        return self._bbo
+
+    def book_arrays(self, symbols=None, depth=None):
+        """
+        Returns a dict of symbol to {Side.BUY: arrays, Side.SELL: arrays} for
+        the given symbols (all if None), where arrays is the (price, volume,
+        count) tuple of OrderQueue.get_order_book_arrays().
+        """
+        if symbols is None:
+            symbols = list(self.products)
+        books = {}
+        for symbol in symbols:
+            if symbol in self:
+                # Read-only, so the product is not taken over from a fork
+                product = self.products[symbol]
+                books[symbol] = {side: queue.get_order_book_arrays(depth) for side, queue in product.order_queues.items()}
+        return books
+
+    def stats(self, reset=False):
+        """
+        Returns a dict with hot-path counters and latency histograms in total
+        and per symbol, for products with stats enabled (e.g. created by a
+        Market(stats=True)). With reset=True, the counters are reset after
+        taking the snapshot, e.g. to report per interval.
+        """
+        total = Stats()
+        symbols = {}
+        for symbol, product in self.products.items():
+            if product._stats is not None:
+                total.merge(product._stats)
+                symbols[symbol] = product.stats(reset)
+        return {
+            'total': total.snapshot(),
+            'symbols': symbols,
+        }
+
+    def memory_usage(self):
+        """
+        Returns a dict with the approximate memory usage in total and per
+        symbol; see Product.memory_usage(). The total also includes the
+        market's own entry map and the entries of evicted products (see
+        evict_idle()), which are all dead; their number is in
+        evicted_entry_count.
+        """
+        total = dict.fromkeys(MEMORY_USAGE_BYTES + MEMORY_USAGE_COUNTS, 0)
+        symbols = {}
+        for symbol, product in self.products.items():
+            usage = product.memory_usage()
+            for name in total:
+                total[name] += usage[name]
+            symbols[symbol] = usage
+
+        evicted = self._evicted_entry_count
+        evicted_size = 0
+        if evicted:
+            entry = next(iter(self.entries.values()))
+            evicted_size = (object_size(entry) + object_size(entry.order)) * evicted
+        total['evicted_entry_count'] = evicted
+        total['entry_count'] += evicted
+        total['dead_entry_count'] += evicted
+        total['dead'] += evicted_size
+        total['entries'] += sys.getsizeof(self.entries) + evicted_size
+        total['total'] += sys.getsizeof(self.entries) + evicted_size
+        return {
+            'total': total,
+            'symbols': symbols,
+        }
+
+    def subscribe(self, callback, symbols=None, sides=None, events=None):
+        """
+        Registers callback(batches) to receive a list of EventBatch objects,
+        one per symbol with activity, at the end of each execute() (or
+        flush()). Events are restricted to the given symbols, sides and Event
+        kinds (all if None). Returns a Subscription.
+        """
+        if sides is not None:
+            sides = [Side.normalize(side) for side in sides]
+        subscription = Subscription(callback, symbols, sides, events)
+        self._subscriptions.append(subscription)
+        self.update_events()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self._subscriptions.remove(subscription)
+        self.update_events()
+
+    def update_events(self):
+        for product in self.products.values():
+            if product._market_subscriptions is self._subscriptions:
+                product.update_events()
+
+    def flush(self):
+        """
+        Delivers the pending events of all products to their subscribers, and
+        to the subscribers of this market as a single list of batches.
+        """
+        batches = []
+        for product in self.products.values():
+            # Skip products still shared with the market this one was forked from
+            if product._events is not None and product._market_subscriptions is self._subscriptions:
+                batch = product.take_batch()
+                if batch is not None:
+                    for subscription in product._subscriptions:
+                        subscription.deliver([batch])
+                    batches.append(batch)
+        if batches:
+            for subscription in self._subscriptions:
+                subscription.deliver(batches)
+
+    def fork(self):
+        """
+        Returns a logically independent copy of this market, e.g. to simulate
+        what would execute if an order were added. Products are shared with the
+        fork until either market mutates them; see Product.fork(). The fork does
+        not inherit the sink, tracer or subscriptions.
+        """
+        market = shallow_copy(self)
+        market._products = dict(self._products)
+        # The current table stays with the shared products, which see neither
+        # market's changes, and becomes a read-only layer of both markets'
+        # tables; each market attaches its own table on own()
+        market._entries = EntryTable.layer(self._entries)
+        self._entries = EntryTable.layer(self._entries)
+        market._sink = None
+        market._tracer = None
+        market._subscriptions = []
+        market._accounts = {account: dict(ids) for account, ids in self._accounts.items()}
+        market._bbo = self._bbo.copy()
+        market._timers = self._timers.copy()
+        market._bar_ends = list(self._bar_ends)
+        market._owner = object()
+        market._lineage = set()
+
+        # Products are now shared with the fork
+        self._lineage.add(self._owner)
+        self._owner = object()
+
+        return market
+
+    def fork_entries(self):
+        """
+        Returns an entry table for a fork of one of this market's products
+        (see Product.fork_entries()). The current table becomes a read-only
+        layer of it and of a new table for this market and the products that
+        shared the current one.
+        """
+        table = self._entries
+        self._entries = EntryTable.layer(table)
+        for product in self.products.values():
+            if product._entries is table:
+                product._entries = self._entries
+        return EntryTable.layer(table)
+
+    def read_view(self):
+        """
+        Returns a ReadView of the products, order books and entry states as of
+        now, which stays unchanged while this market goes on placing and
+        executing orders. Taking the view copies nothing: the entry table
+        becomes a read-only layer of a new table for this market (see
+        EntryTable), and products are shared as with fork(), so a price level,
+        time queue or entry is copied only when this market first changes it
+        after the view was taken.
+
+        The view can be read from another thread without locking, as long as
+        read_view() itself is called by the thread changing the market.
+        """
+        self._version += 1
+        view = ReadView(self._version, self.now, dict(self._products), self._entries)
+        # The current table stays with the view and its products
+        self._entries = EntryTable.layer(self._entries)
+
+        # Products are now shared with the view. Only owners of products not
+        # yet taken over are kept, so that frequent views do not pile up.
+        owners = {product._market_owner for product in self._products.values()}
+        self._lineage = {owner for owner in self._lineage if owner in owners}
+        self._lineage.add(self._owner)
+        self._owner = object()
+
+        return view
+
+    def own(self, symbol):
+        product = self.products[symbol]
+        if product._market_owner is not self._owner:
+            forked = product.fork(self._entries)
+            if product._market_owner in self._lineage:
+                # The product was created by this market before it was forked
+                forked._sink = product._sink
+                forked._stats = product._stats
+                forked._pool = product._pool
+                forked._tracer = product._tracer
+                forked._subscriptions = product._subscriptions
+                forked._events = product._events
+            # Its bar in progress, if any, is already scheduled (see
+            # schedule_bar()) by this market or the one it was forked from
+            forked._market = self
+            self[symbol] = forked
+            product = forked
+        return product
+
     def has_product(self, symbol):
         return symbol in self
 
+    def peek(self, symbol):
+        """
+        Returns the product of the symbol, or None, without creating it or
+        taking it over from a fork or read view (see own()). For reads only.
+        """
+        return self.products.get(symbol)
+
     def get_product(self, symbol):
-        return self[symbol]
+        """
+        Returns the product of the symbol, or None; unlike market[symbol], it
+        does not create the product.
+        """
+        if symbol not in self:
+            return None
+        return self.own(symbol)
 
     def set_product(self, symbol, product):
         self[symbol] = product
@@ -866,30 +2374,137 @@ class Market:
     def values(self):
         return self.products.values()
 
+    def check_expiry(self, order):
+        if order.tif == TimeInForce.DAY and self.session_end is None:
+            raise ValueError('session_end must be set for DAY orders')
+        if order.tif == TimeInForce.GTT and self.now is not None and order.expire_time <= self.now:
+            raise ValueError('order already expired')
+
+    def schedule_expiry(self, order):
+        if order.tif == TimeInForce.GTT:
+            self._timers.schedule(order.id, order.expire_time)
+        elif order.tif == TimeInForce.DAY:
+            self._timers.schedule(order.id, self.session_end)
+
+    def advance_time(self, now):
+        """
+        Moves the market clock to now and cancels GTT and DAY orders that
+        expired by then, through the bulk cancel path of each product. Returns
+        the ids of the cancelled orders. Orders filled or cancelled before
+        expiring are skipped. Bars that ended by now are completed.
+        """
+        symbols = {}
+        for order_id in self._timers.advance(now):
+            symbols.setdefault(self.entries[order_id].symbol, []).append(order_id)
+
+        ids = []
+        for symbol, order_ids in symbols.items():
+            # Evicted products had no live orders to expire
+            if symbol in self:
+                ids.extend(self.own(symbol).cancel_orders(order_ids))
+
+        bar_ends = self._bar_ends
+        while bar_ends and bar_ends[0][0] <= now:
+            _, symbol = heapq.heappop(bar_ends)
+            # Skip evicted products and bars already completed by a later trade
+            product = self.products.get(symbol)
+            if product is not None and product._bars is not None and product._bars.due(now):
+                self.own(symbol).bars.advance(now)
+
+        return ids
+
+    def schedule_bar(self, symbol, end):
+        heapq.heappush(self._bar_ends, (end, symbol))
+
+    def end_session(self, next_session_end=None):
+        """
+        Expires DAY orders (and anything else due) at session_end, then starts
+        the next session, with fresh session trade stats. Returns the ids of
+        the cancelled orders.
+        """
+        if self.session_end is None:
+            raise ValueError('session_end is not set')
+        ids = self.advance_time(max(self.session_end, self.now if self.now is not None else self.session_end))
+        self.session_end = next_session_end
+        for symbol, product in list(self.products.items()):
+            if product._session is not None and product._session.count:
+                self.own(symbol).reset_session()
+        return ids
+
     def place(self, order):
         if order.id in self.entries:
-            raise ValueError('duplicate order id')
+            allocate_id(order, self.entries)
+        if order._tif is not TimeInForce.GTC:
+            self.check_expiry(order)
         product = self.ensure_product(order.symbol)
         product.place(order)
-        self.entries[order.id] = product.entries[order.id]
+        if order._tif is not TimeInForce.GTC:
+            self.schedule_expiry(order)
+
+    def place_batch(self, orders):
+        """
+        Places a sequence of orders without execution. Equivalent to calling
+        place() for each order, but consecutive orders of the same symbol share
+        a single product lookup.
+        """
+        entries = self.entries
+        symbol = None
+        product = None
+
+        for order in orders:
+            if order.id in entries:
+                allocate_id(order, entries)
+            if order._tif is not TimeInForce.GTC:
+                self.check_expiry(order)
+            if product is None or order.symbol != symbol:
+                symbol = order.symbol
+                product = self.ensure_product(symbol)
+            product.place(order)
+            if order._tif is not TimeInForce.GTC:
+                self.schedule_expiry(order)
 
     def cancel(self, order):
         if order.id not in self.entries:
             raise ValueError('no such order id')
         entry = self.entries[order.id]
-        product = self.ensure_product(entry.symbol)
+        product = self.get_product(entry.symbol)
+        if product is None:
+            # Evicted, so the order is filled or cancelled; see evict_idle()
+            raise ValueError('already fully filled' if entry.state == State.FULLY_FILLED else 'already cancelled')
         product.cancel(order)
 
+    def cancel_all(self, symbol=None, side=None, price=None, account=None):
+        """
+        Cancels all live orders matching the given symbol, side, price and
+        account (any if None) and returns their ids; see Product.cancel_all().
+        """
+        if symbol is not None:
+            symbols = [symbol] if symbol in self else []
+        elif account is not None:
+            symbols = list({self.entries[order_id].symbol: None for order_id in self._accounts.get(account, {})})
+        else:
+            symbols = list(self.products)
+
+        ids = []
+        for symbol in symbols:
+            ids.extend(self.own(symbol).cancel_all(side, price, account))
+        return ids
+
     def execute(self, order=None):
         if order is not None:
+            if order._tif is not TimeInForce.GTC:
+                self.check_expiry(order)
             product = self.ensure_product(order.symbol)
             executions = product.execute(order)
-            self.entries[order.id] = product.entries[order.id]
+            if order._tif is not TimeInForce.GTC:
+                self.schedule_expiry(order)
             return executions
         else:
             executions = []
-            for symbol in self.products:
-                executions.extend(self.products[symbol].execute())
+            for symbol, product in list(self.products.items()):
+                if product.can_execute() or product._pending_ioc:
+                    executions.extend(self.own(symbol).execute(publish=False))
+            self.flush()
             return executions
 
     def place_order(self, *args, **kwargs):
@@ -906,3 +2521,87 @@ class Market:
             return None
         entry = self.entries[order_id]
         return entry.order
+
+class ReadView:
+    """
+    A consistent, read-only snapshot of a Market, taken by Market.read_view().
+    Its products are those of the market at that time, which the market no
+    longer changes (it copies a structure before changing it); they must not
+    be changed through the view either.
+    """
+
+    def __init__(self, version, now, products, entries):
+        self._version = version
+        self._now = now
+        self._products = products
+        self._entries = entries
+
+    @property
+    def version(self):
+        """
+        The number of views taken of the market so far, this one included.
+        """
+        return self._version
+
+    @property
+    def now(self):
+        return self._now
+
+    @property
+    def products(self):
+        return self._products
+
+    @property
+    def entries(self):
+        return self._entries
+
+    def __contains__(self, symbol):
+        return symbol in self._products
+
+    def __getitem__(self, symbol):
+        return self._products[symbol]
+
+    def __iter__(self):
+        return iter(self._products)
+
+    def __len__(self):
+        return len(self._products)
+
+    def get_product(self, symbol):
+        return self._products.get(symbol)
+
+    def get_order_by_id(self, order_id):
+        entry = self._entries.get(order_id)
+        return entry.order if entry is not None else None
+
+    def open_orders(self, account=None, symbol=None, side=None):
+        """
+        Returns the live entries matching the given account, symbol and side;
+        see Market.open_orders(). Entries of an account are grouped by symbol,
+        from the account indexes of the products, since the view does not
+        keep the market's.
+        """
+        if symbol is not None:
+            if symbol not in self:
+                return []
+            return self._products[symbol].open_orders(side, account)
+        else:
+            return [entry for product in self._products.values() for entry in product.open_orders(side, account)]
+
+    def order_books(self, symbols=None, depth=None):
+        """
+        Returns a dict of symbol to {Side.BUY: order book, Side.SELL: order
+        book} for the given symbols (all if None), where each order book is a
+        list of OrderStat objects as returned by OrderQueue.get_order_book().
+        """
+        if symbols is None:
+            symbols = list(self._products)
+        books = {}
+        for symbol in symbols:
+            if symbol in self:
+                product = self._products[symbol]
+                books[symbol] = {side: queue.get_order_book(depth) for side, queue in product.order_queues.items()}
+        return books
+
+    def __repr__(self):
+        return 'ReadView(version={}, now={}, symbols={})'.format(self.version, self.now, list(self._products))
@@ -0,0 +1,61 @@
+class QueuePool:
+    """
+    Free lists of emptied price levels (PriceOrderQueue) and time queues
+    (TimeOrderQueue) of a product, reset on release and reused for new prices
+    and times instead of being allocated again. Each list holds at most
+    capacity objects; the rest are left to the garbage collector.
+
+    Only structures owned exclusively by the product are released, never
+    those still shared with a fork.
+    """
+
+    def __init__(self, capacity=4096):
+        self._capacity = capacity
+        self._levels = []
+        self._time_queues = []
+        self._reused = 0
+        self._released = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def reused(self):
+        return self._reused
+
+    @property
+    def released(self):
+        return self._released
+
+    def __len__(self):
+        return len(self._levels) + len(self._time_queues)
+
+    def acquire_level(self):
+        if self._levels:
+            self._reused += 1
+            return self._levels.pop()
+        return None
+
+    def release_level(self, level):
+        if len(self._levels) < self._capacity:
+            self._levels.append(level)
+            self._released += 1
+
+    def acquire_time_queue(self):
+        if self._time_queues:
+            self._reused += 1
+            return self._time_queues.pop()
+        return None
+
+    def release_time_queue(self, time_queue):
+        if len(self._time_queues) < self._capacity:
+            self._time_queues.append(time_queue)
+            self._released += 1
+
+    def clear(self):
+        self._levels = []
+        self._time_queues = []
+
+    def __repr__(self):
+        return 'QueuePool(levels={}, time_queues={}, reused={}, released={})'.format(len(self._levels), len(self._time_queues), self.reused, self.released)
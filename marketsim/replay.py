@@ -0,0 +1,332 @@
+import csv
+import math
+import struct
+import threading
+from queue import Queue, Full
+from time import perf_counter
+from marketsim.market import Order, Side
+
+PLACE  = 1
+CANCEL = 2
+
+ACTIONS = {
+    'place' : PLACE,
+    'cancel': CANCEL,
+}
+
+CSV_FIELDS = ['action', 'side', 'symbol', 'quantity', 'price', 'time', 'id']
+
+# action, side, symbol, quantity, price, time, id
+#   - side is 0 for a cancel
+#   - price and time are NaN when not specified (market order, default time)
+#   - id is -1 when not specified
+BINARY_RECORD = struct.Struct('<BB16sqddq')
+
+def parse_number(text):
+    if text == '':
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def parse_id(text):
+    if text == '':
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+def parse_side(text):
+    if text == '':
+        return None
+    elif text.isdigit():
+        return Side.normalize(int(text))
+    else:
+        return Side.normalize(text)
+
+def parse_action(text):
+    try:
+        return ACTIONS[text.lower()]
+    except KeyError:
+        raise ValueError('invalid action: {}'.format(text))
+
+def read_csv_events(path, chunk_size=10000):
+    """
+    Yields chunks (lists) of (action, order) pairs from a CSV file. The file
+    must have a header row with the columns in CSV_FIELDS, in any order.
+    Empty price, time and id columns mean a market order, the default time and
+    the default id, respectively.
+    """
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        index = [header.index(name) for name in CSV_FIELDS]
+        chunk = []
+
+        for row in reader:
+            if not row:
+                continue
+            action, side, symbol, quantity, price, time, id = [row[i] for i in index]
+            action = parse_action(action)
+            if action == CANCEL:
+                order = Order(symbol=symbol or None, id=parse_id(id))
+            else:
+                order = Order(parse_side(side), symbol, parse_number(quantity), parse_number(price), parse_number(time), parse_id(id))
+            chunk.append((action, order))
+
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+def read_binary_events(path, chunk_size=10000):
+    """
+    Yields chunks (lists) of (action, order) pairs from a file of fixed-size
+    BINARY_RECORD records, as written by write_binary_events().
+    """
+    with open(path, 'rb') as f:
+        while True:
+            buf = f.read(BINARY_RECORD.size * chunk_size)
+            if not buf:
+                break
+            if len(buf) % BINARY_RECORD.size != 0:
+                raise ValueError('truncated binary record')
+
+            chunk = []
+            for action, side, symbol, quantity, price, time, id in BINARY_RECORD.iter_unpack(buf):
+                symbol = symbol.rstrip(b'\0').decode()
+                if id < 0:
+                    id = None
+                if action == CANCEL:
+                    order = Order(symbol=symbol or None, id=id)
+                elif action == PLACE:
+                    price = None if math.isnan(price) else price
+                    time = None if math.isnan(time) else time
+                    order = Order(side, symbol, quantity, price, time, id)
+                else:
+                    raise ValueError('invalid action: {}'.format(action))
+                chunk.append((action, order))
+            yield chunk
+
+def write_binary_events(path, events):
+    """
+    Writes (action, order) pairs into a binary file readable by
+    read_binary_events(). Order ids must be non-negative integers or None.
+    """
+    nan = float('nan')
+    with open(path, 'wb') as f:
+        for action, order in events:
+            side = order.side.value if order.side is not None else 0
+            symbol = (order.symbol or '').encode()
+            if len(symbol) > 16:
+                raise ValueError('symbol too long: {}'.format(order.symbol))
+            f.write(BINARY_RECORD.pack(
+                action,
+                side,
+                symbol,
+                order.quantity or 0,
+                order.price if order.price is not None else nan,
+                order.time if order.time is not None else nan,
+                order.id if order.id is not None else -1,
+            ))
+
+class ReplayStats:
+    def __init__(self):
+        self.events = 0
+        self.chunks = 0
+        self.executions = 0
+        # Cancels of orders already filled or cancelled, which are skipped
+        self.rejected_cancels = 0
+        self.parse_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.apply_seconds = 0.0
+        self.execute_seconds = 0.0
+
+    @staticmethod
+    def rate(count, seconds):
+        return count / seconds if seconds > 0 else float('inf')
+
+    @property
+    def parse_rate(self):
+        return self.rate(self.events, self.parse_seconds)
+
+    @property
+    def apply_rate(self):
+        return self.rate(self.events, self.apply_seconds)
+
+    @property
+    def execute_rate(self):
+        return self.rate(self.events, self.execute_seconds)
+
+    @property
+    def total_seconds(self):
+        return self.wait_seconds + self.apply_seconds + self.execute_seconds
+
+    @property
+    def total_rate(self):
+        return self.rate(self.events, self.total_seconds)
+
+    def __repr__(self):
+        return 'ReplayStats(events={}, chunks={}, executions={}, rejected_cancels={}, parse_rate={:.0f}/s, apply_rate={:.0f}/s, execute_rate={:.0f}/s, total_rate={:.0f}/s)'.format(
+            self.events, self.chunks, self.executions, self.rejected_cancels, self.parse_rate, self.apply_rate, self.execute_rate, self.total_rate)
+
+class Replay:
+    """
+    Streams (action, order) chunks from a reader generator (e.g.
+    read_csv_events() or read_binary_events()) into a Market.
+
+    Reading and parsing run in a background thread, at most queue_size chunks
+    ahead of the market. By default each placement is executed immediately, as
+    with Market.execute(order), so the results do not depend on how the reader
+    chunks the events.
+
+    With continuous=False, placements are collected through
+    Market.place_batch() and matched together by a single Market.execute()
+    every batch_size events. This changes the matching semantics: orders in a
+    batch are uncrossed as a call auction rather than matched one at a time,
+    so executions differ from the continuous mode and depend on batch_size
+    (but not on the reader's chunk size).
+    """
+
+    def __init__(self, market, events, continuous=True, batch_size=10000, queue_size=4):
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive, got {}'.format(batch_size))
+        self._market = market
+        self._events = events
+        self._continuous = continuous
+        self._batch_size = batch_size
+        self._queue_size = queue_size
+        self._stats = ReplayStats()
+        # Placements and event count of the current batch (continuous=False)
+        self._pending = []
+        self._batch_events = 0
+
+    @property
+    def market(self):
+        return self._market
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def read(self, queue, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return
+                except Full:
+                    pass
+
+        stats = self.stats
+        try:
+            events = iter(self._events)
+            while not stop.is_set():
+                start = perf_counter()
+                chunk = next(events, None)
+                stats.parse_seconds += perf_counter() - start
+                if chunk is None:
+                    break
+                put((chunk, None))
+        except BaseException as e:
+            put((None, e))
+            return
+        put((None, None))
+
+    def place_pending(self):
+        if self._pending:
+            self.market.place_batch(self._pending)
+            self._pending = []
+
+    def flush(self):
+        """
+        Places the pending orders of the current batch and matches the book,
+        returning the executions. Does nothing in continuous mode.
+        """
+        if self._continuous:
+            return []
+        self.place_pending()
+        self._batch_events = 0
+        start = perf_counter()
+        executions = self.market.execute()
+        self.stats.execute_seconds += perf_counter() - start
+        self.stats.executions += len(executions)
+        return executions
+
+    def apply(self, chunk):
+        market = self.market
+        stats = self.stats
+        executions = []
+
+        start = perf_counter()
+        execute_seconds = stats.execute_seconds
+
+        for action, order in chunk:
+            if action == PLACE:
+                if self._continuous:
+                    executions.extend(market.execute(order))
+                else:
+                    self._pending.append(order)
+            else:
+                self.place_pending()
+                # Recorded flow may cancel orders the simulation already filled
+                entry = market.entries.get(order.id)
+                if entry is not None and not entry.remaining:
+                    stats.rejected_cancels += 1
+                else:
+                    market.cancel(order)
+            if not self._continuous:
+                self._batch_events += 1
+                if self._batch_events == self._batch_size:
+                    executions.extend(self.flush())
+
+        elapsed = perf_counter() - start
+
+        if self._continuous:
+            # Placement and execution are interleaved; attribute both to execution
+            stats.execute_seconds += elapsed
+            stats.executions += len(executions)
+        else:
+            stats.apply_seconds += elapsed - (stats.execute_seconds - execute_seconds)
+
+        stats.events += len(chunk)
+        stats.chunks += 1
+
+        return executions
+
+    def stream(self):
+        """
+        Yields a list of Execution objects per chunk, followed by those of
+        the last, partial batch when continuous=False.
+        """
+        queue = Queue(self._queue_size)
+        stop = threading.Event()
+        thread = threading.Thread(target=self.read, args=(queue, stop), daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                start = perf_counter()
+                chunk, error = queue.get()
+                self.stats.wait_seconds += perf_counter() - start
+
+                if error is not None:
+                    raise error
+                if chunk is None:
+                    if self._batch_events:
+                        yield self.flush()
+                    break
+
+                yield self.apply(chunk)
+        finally:
+            stop.set()
+            thread.join()
+
+    def run(self):
+        for _ in self.stream():
+            pass
+        return self.stats
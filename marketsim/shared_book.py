@@ -0,0 +1,273 @@
+import struct
+import sys
+from marketsim.market import OrderStat, Side
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    resource_tracker = None
+    shared_memory = None
+
+# version, symbol count, depth
+HEADER = struct.Struct('<QII')
+
+# symbol, last price, bid level count, ask level count
+SLOT_HEADER = struct.Struct('<32sdII')
+
+# price, volume, count
+LEVEL = struct.Struct('<dqq')
+
+NAN = float('nan')
+
+# Names of segments created by this process, which readers in the same process
+# (or forked children) must leave registered with the resource tracker.
+_created = set()
+
+def slot_size(depth):
+    return SLOT_HEADER.size + LEVEL.size * depth * 2
+
+def encode_price(price):
+    return NAN if price is None else price
+
+def decode_price(price):
+    return None if price != price else price
+
+class BookSnapshot:
+    def __init__(self, symbol, last_price, bids, asks):
+        self._symbol = symbol
+        self._last_price = last_price
+        self._bids = bids
+        self._asks = asks
+
+    @property
+    def symbol(self):
+        return self._symbol
+
+    @property
+    def last_price(self):
+        return self._last_price
+
+    @property
+    def bids(self):
+        return self._bids
+
+    @property
+    def asks(self):
+        return self._asks
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self):
+        return 'BookSnapshot(symbol={}, last_price={}, bids={}, asks={})'.format(self.symbol, self.last_price, self.bids, self.asks)
+
+class SharedOrderBookWriter:
+    """
+    Publishes the top depth levels of each symbol's order book, plus the last
+    price, into a multiprocessing.shared_memory segment for readers in other
+    processes.
+
+    The segment is protected by a seqlock: the version in the header is odd
+    while publish() is writing, and is incremented to the next even number when
+    done. Readers retry until they see the same even version before and after
+    copying.
+
+    Market-order levels are included with a NaN price (None when read).
+    """
+
+    def __init__(self, market, symbols, depth=10, name=None):
+        if shared_memory is None:
+            raise ImportError('SharedOrderBookWriter requires multiprocessing.shared_memory (Python 3.8+)')
+
+        self._market = market
+        self._symbols = list(symbols)
+        self._depth = depth
+        self._slots = {}
+
+        # Validate before creating the segment, which would otherwise be left behind
+        encoded_symbols = [symbol.encode() for symbol in self._symbols]
+        for symbol, encoded in zip(self._symbols, encoded_symbols):
+            if len(encoded) > 32:
+                raise ValueError('symbol too long: {}'.format(symbol))
+
+        size = HEADER.size + slot_size(depth) * len(self._symbols)
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created.add(self._shm.name)
+
+        buf = self._shm.buf
+        HEADER.pack_into(buf, 0, 0, len(self._symbols), depth)
+
+        for i, (symbol, encoded) in enumerate(zip(self._symbols, encoded_symbols)):
+            offset = HEADER.size + slot_size(depth) * i
+            SLOT_HEADER.pack_into(buf, offset, encoded, NAN, 0, 0)
+            self._slots[symbol] = offset
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def market(self):
+        return self._market
+
+    @property
+    def symbols(self):
+        return self._symbols
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @property
+    def version(self):
+        version, _, _ = HEADER.unpack_from(self._shm.buf, 0)
+        return version
+
+    def write_slot(self, buf, symbol, offset):
+        depth = self.depth
+        product = self.market.products.get(symbol)
+
+        if product is None:
+            last_price = None
+            bids = []
+            asks = []
+        else:
+            last_price = product.last_price
+            bids = product.order_queues[Side.BUY].get_order_book(depth)
+            asks = product.order_queues[Side.SELL].get_order_book(depth)
+
+        SLOT_HEADER.pack_into(buf, offset, symbol.encode(), encode_price(last_price), len(bids), len(asks))
+        offset += SLOT_HEADER.size
+
+        for levels in (bids, asks):
+            for i, stat in enumerate(levels):
+                LEVEL.pack_into(buf, offset + LEVEL.size * i, encode_price(stat.price), stat.volume, stat.count)
+            offset += LEVEL.size * depth
+
+    def publish(self, symbols=None):
+        """
+        Writes the current order books of the given symbols (all symbols by
+        default) into the segment.
+        """
+        if symbols is None:
+            symbols = self.symbols
+        else:
+            for symbol in symbols:
+                if symbol not in self._slots:
+                    raise KeyError('symbol not published: {}'.format(symbol))
+
+        buf = self._shm.buf
+        version = self.version
+
+        HEADER.pack_into(buf, 0, version + 1, len(self.symbols), self.depth)
+        try:
+            for symbol in symbols:
+                self.write_slot(buf, symbol, self._slots[symbol])
+        finally:
+            # Readers spin while the version is odd, so it must end even
+            HEADER.pack_into(buf, 0, version + 2, len(self.symbols), self.depth)
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        _created.discard(self._shm.name)
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        self.unlink()
+
+class SharedOrderBookReader:
+    """
+    Attaches to a segment created by SharedOrderBookWriter, by name.
+    """
+
+    def __init__(self, name):
+        if shared_memory is None:
+            raise ImportError('SharedOrderBookReader requires multiprocessing.shared_memory (Python 3.8+)')
+
+        self._shm = shared_memory.SharedMemory(name=name, create=False)
+
+        # Until Python 3.13, attaching registers the segment with this
+        # process's resource tracker, which would unlink it on exit.
+        if sys.version_info < (3, 13) and self._shm.name not in _created:
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+
+        _, count, depth = HEADER.unpack_from(self._shm.buf, 0)
+        self._depth = depth
+        self._slots = {}
+
+        for i in range(count):
+            offset = HEADER.size + slot_size(depth) * i
+            symbol, _, _, _ = SLOT_HEADER.unpack_from(self._shm.buf, offset)
+            self._slots[symbol.rstrip(b'\0').decode()] = offset
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def symbols(self):
+        return list(self._slots)
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @property
+    def version(self):
+        version, _, _ = HEADER.unpack_from(self._shm.buf, 0)
+        return version
+
+    def read_consistent(self, start, end):
+        buf = self._shm.buf
+        while True:
+            before = self.version
+            if before % 2 == 1:
+                continue
+            data = bytes(buf[start:end])
+            if self.version == before:
+                return before, data
+
+    def parse_slot(self, data, offset):
+        symbol, last_price, bid_count, ask_count = SLOT_HEADER.unpack_from(data, offset)
+        offset += SLOT_HEADER.size
+
+        sides = []
+        for count in (bid_count, ask_count):
+            levels = []
+            for i in range(count):
+                price, volume, level_count = LEVEL.unpack_from(data, offset + LEVEL.size * i)
+                levels.append(OrderStat(decode_price(price), volume, level_count))
+            sides.append(levels)
+            offset += LEVEL.size * self.depth
+
+        return BookSnapshot(symbol.rstrip(b'\0').decode(), decode_price(last_price), sides[0], sides[1])
+
+    def read(self, symbol):
+        """
+        Returns a consistent BookSnapshot of a single symbol.
+        """
+        offset = self._slots[symbol]
+        _, data = self.read_consistent(offset, offset + slot_size(self.depth))
+        return self.parse_slot(data, 0)
+
+    def read_all(self):
+        """
+        Returns a consistent dict of symbol to BookSnapshot for all symbols.
+        """
+        _, data = self.read_consistent(0, len(self._shm.buf))
+        return {symbol: self.parse_slot(data, offset) for symbol, offset in self._slots.items()}
+
+    def close(self):
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
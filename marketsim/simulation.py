@@ -0,0 +1,351 @@
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from marketsim.market import Market, Order, Side, State
+from marketsim.stats import percentile
+
+class Agent:
+    """
+    Base class of trader agents. Subclasses implement act(simulation), which is
+    called once per step and may place or cancel orders through the
+    simulation. Each agent draws from its own random.Random (self.rng), seeded
+    from the run seed and the agent's position, so that runs are reproducible.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self.rng = None
+        self.orders = []
+        self.position = 0
+        self.cash = 0.0
+
+    @property
+    def name(self):
+        return self._name
+
+    def reset(self, rng):
+        self.rng = rng
+        self.orders = []
+        self.position = 0
+        self.cash = 0.0
+
+    def act(self, simulation):
+        raise NotImplementedError
+
+    def fill(self, side, quantity, price):
+        if side == Side.BUY:
+            self.position += quantity
+            self.cash -= quantity * price
+        else:
+            self.position -= quantity
+            self.cash += quantity * price
+
+    def pnl(self, price):
+        return self.cash + self.position * price
+
+class NoiseTrader(Agent):
+    """
+    With the given probability per step, places a random buy or sell of 1 to
+    max_quantity, as a market order with market_order_ratio probability or
+    otherwise as a limit order within max_ticks of the last price.
+    """
+
+    def __init__(self, name, probability=0.5, max_quantity=10, max_ticks=5, market_order_ratio=0.1):
+        super().__init__(name)
+        self.probability = probability
+        self.max_quantity = max_quantity
+        self.max_ticks = max_ticks
+        self.market_order_ratio = market_order_ratio
+
+    def act(self, simulation):
+        rng = self.rng
+        if rng.random() >= self.probability:
+            return
+        side = Side.BUY if rng.random() < 0.5 else Side.SELL
+        quantity = rng.randint(1, self.max_quantity)
+        if rng.random() < self.market_order_ratio:
+            price = None
+        else:
+            price = simulation.offset_price(rng.randint(-self.max_ticks, self.max_ticks))
+        simulation.place(self, side, quantity, price)
+
+class MarketMaker(Agent):
+    """
+    Replaces its quotes every step with a bid and an ask of the given quantity,
+    spread_ticks away from the last price and skewed against its position by
+    skew_ticks per unit of quantity held.
+    """
+
+    def __init__(self, name, quantity=10, spread_ticks=2, skew_ticks=0.1):
+        super().__init__(name)
+        self.quantity = quantity
+        self.spread_ticks = spread_ticks
+        self.skew_ticks = skew_ticks
+
+    def act(self, simulation):
+        for order_id in self.orders:
+            simulation.cancel(order_id)
+        self.orders = []
+
+        skew = -int(round(self.position * self.skew_ticks))
+        simulation.place(self, Side.BUY, self.quantity, simulation.offset_price(skew - self.spread_ticks))
+        simulation.place(self, Side.SELL, self.quantity, simulation.offset_price(skew + self.spread_ticks))
+
+class MomentumTrader(Agent):
+    """
+    Places a market order in the direction of the price change over the last
+    lookback steps, if it exceeds threshold_ticks, while its position stays
+    within max_position.
+    """
+
+    def __init__(self, name, lookback=10, threshold_ticks=2, quantity=5, max_position=50):
+        super().__init__(name)
+        self.lookback = lookback
+        self.threshold_ticks = threshold_ticks
+        self.quantity = quantity
+        self.max_position = max_position
+
+    def act(self, simulation):
+        prices = simulation.prices
+        if len(prices) <= self.lookback:
+            return
+        change = (prices[-1] - prices[-1 - self.lookback]) / simulation.tick
+        if change > self.threshold_ticks and self.position + self.quantity <= self.max_position:
+            simulation.place(self, Side.BUY, self.quantity, None)
+        elif change < -self.threshold_ticks and self.position - self.quantity >= -self.max_position:
+            simulation.place(self, Side.SELL, self.quantity, None)
+
+def default_agents():
+    return [
+        MarketMaker('maker'),
+        NoiseTrader('noise-1'),
+        NoiseTrader('noise-2'),
+        NoiseTrader('noise-3'),
+        MomentumTrader('momentum'),
+    ]
+
+class SimulationResult:
+    def __init__(self, seed, prices, executions, volume, pnl, positions):
+        self._seed = seed
+        self._prices = prices
+        self._executions = executions
+        self._volume = volume
+        self._pnl = pnl
+        self._positions = positions
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def prices(self):
+        return self._prices
+
+    @property
+    def executions(self):
+        return self._executions
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @property
+    def pnl(self):
+        return self._pnl
+
+    @property
+    def positions(self):
+        return self._positions
+
+    @property
+    def final_price(self):
+        return self.prices[-1]
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+    def __repr__(self):
+        return 'SimulationResult(seed={}, final_price={}, executions={}, volume={})'.format(self.seed, self.final_price, self.executions, self.volume)
+
+class Simulation:
+    """
+    Runs a single Market with a set of agents for a number of steps. Agents act
+    in a random order each step and their orders are executed immediately, as
+    with Market.execute(order). The last price is recorded after every step,
+    starting from initial_price until the first execution.
+
+    agents is a callable returning a fresh list of agents with unique names,
+    which must be picklable (e.g. a module-level function) for run() with more
+    than one worker.
+    """
+
+    def __init__(self, agents=default_agents, steps=1000, symbol='SIM', initial_price=100.0, tick=0.01):
+        self._agents = agents
+        self._steps = steps
+        self._symbol = symbol
+        self._initial_price = initial_price
+        self._tick = tick
+
+        self._market = None
+        self._owners = None
+        self._prices = None
+        self._step = None
+        self._count = 0
+        self._executions = 0
+        self._volume = 0
+
+    @property
+    def steps(self):
+        return self._steps
+
+    @property
+    def symbol(self):
+        return self._symbol
+
+    @property
+    def tick(self):
+        return self._tick
+
+    @property
+    def market(self):
+        return self._market
+
+    @property
+    def prices(self):
+        return self._prices
+
+    @property
+    def step(self):
+        return self._step
+
+    @property
+    def last_price(self):
+        return self._prices[-1] if self._prices else self._initial_price
+
+    def offset_price(self, ticks):
+        # Round to the tick grid, so that prices compare exactly across agents
+        return round(round(self.last_price / self.tick) + ticks) * self.tick
+
+    def place(self, agent, side, quantity, price=None):
+        self._count += 1
+        order_id = '{}:{}'.format(agent.name, self._count)
+        self._owners[order_id] = agent
+        agent.orders.append(order_id)
+
+        for execution in self.market.execute(Order(side, self.symbol, quantity, price, time=self._step, id=order_id)):
+            for fill in execution.fills.values():
+                self._owners[fill.order_id].fill(fill.side, fill.quantity, execution.price)
+            self._executions += 1
+            self._volume += execution.quantity
+
+        return order_id
+
+    def cancel(self, order_id):
+        entry = self.market.entries.get(order_id)
+        if entry is not None and entry.state in (State.NEW, State.PARTIALLY_FILLED):
+            self.market.cancel(Order(id=order_id))
+
+    def run_one(self, seed):
+        agents = self._agents()
+        names = [agent.name for agent in agents]
+        if len(set(names)) != len(names):
+            raise ValueError('agent names must be unique')
+
+        rng = random.Random(seed)
+        for i, agent in enumerate(agents):
+            agent.reset(random.Random('{}:{}'.format(seed, i)))
+
+        self._market = Market()
+        self._owners = {}
+        self._prices = []
+        self._count = 0
+        self._executions = 0
+        self._volume = 0
+
+        try:
+            for step in range(self.steps):
+                self._step = step
+                order = list(agents)
+                rng.shuffle(order)
+                for agent in order:
+                    agent.act(self)
+                product = self.market.peek(self.symbol)
+                last_price = product.last_price if product is not None else None
+                self._prices.append(last_price if last_price is not None else self.last_price)
+
+            final_price = self.last_price
+            return SimulationResult(
+                seed,
+                self._prices,
+                self._executions,
+                self._volume,
+                {agent.name: agent.pnl(final_price) for agent in agents},
+                {agent.name: agent.position for agent in agents},
+            )
+        finally:
+            self._market = None
+            self._owners = None
+
+    def run(self, seeds, workers=None, chunksize=1):
+        """
+        Runs one simulation per seed and returns a SimulationReport. Results
+        are in the order of seeds and identical for any number of workers.
+        workers=None uses one process per CPU and workers=1 runs in this
+        process.
+        """
+        seeds = list(seeds)
+        if workers == 1:
+            results = [self.run_one(seed) for seed in seeds]
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(self.run_one, seeds, chunksize=chunksize))
+        return SimulationReport(results)
+
+class SimulationReport:
+    """
+    Aggregates the SimulationResult objects of many runs.
+    """
+
+    def __init__(self, results):
+        self._results = results
+
+    @property
+    def results(self):
+        return self._results
+
+    def __len__(self):
+        return len(self._results)
+
+    def mean_price_path(self):
+        """
+        Returns the mean price per step across runs.
+        """
+        return [statistics.mean(prices) for prices in zip(*[result.prices for result in self.results])]
+
+    def summary(self):
+        if not self.results:
+            # Means and percentiles of no runs are undefined
+            return {
+                'runs': 0,
+                'final_price': dict.fromkeys(['mean', 'stdev', 'p5', 'p50', 'p95']),
+                'executions': None,
+                'volume': None,
+                'pnl': {},
+            }
+        final_prices = sorted(result.final_price for result in self.results)
+        executions = [result.executions for result in self.results]
+        volumes = [result.volume for result in self.results]
+        names = self.results[0].pnl
+        return {
+            'runs': len(self),
+            'final_price': {
+                'mean': statistics.mean(final_prices),
+                'stdev': statistics.pstdev(final_prices),
+                'p5': percentile(final_prices, 5),
+                'p50': percentile(final_prices, 50),
+                'p95': percentile(final_prices, 95),
+            },
+            'executions': statistics.mean(executions),
+            'volume': statistics.mean(volumes),
+            'pnl': {name: statistics.mean(result.pnl[name] for result in self.results) for name in names},
+        }
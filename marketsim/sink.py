@@ -0,0 +1,205 @@
+import os
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+COLUMNS = [
+    'symbol',
+    'price',
+    'quantity',
+    'bid_order_id',
+    'ask_order_id',
+    'bid_cumulative_quantity',
+    'ask_cumulative_quantity',
+]
+
+class ExecutionSink:
+    """
+    Buffers executions in typed columns and hands them to a writer every
+    flush_rows rows. A writer is any object with write(columns) and close()
+    methods, where columns is a dict of column name to a list or array.
+
+    Prices are stored as doubles and quantities as 64-bit integers. Symbols and
+    order ids are kept as Python objects, since they can be of any type.
+    """
+
+    def __init__(self, writer, flush_rows=65536):
+        self._writer = writer
+        self._flush_rows = flush_rows
+        self._rows = 0
+        self.reset()
+
+    @property
+    def writer(self):
+        return self._writer
+
+    @property
+    def flush_rows(self):
+        return self._flush_rows
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def reset(self):
+        self._symbol = []
+        self._price = array('d')
+        self._quantity = array('q')
+        self._bid_order_id = []
+        self._ask_order_id = []
+        self._bid_cumulative_quantity = array('q')
+        self._ask_cumulative_quantity = array('q')
+
+    def __len__(self):
+        return len(self._price)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def extend(self, symbol, executions):
+        price = self._price.append
+        quantity = self._quantity.append
+        bid_order_id = self._bid_order_id.append
+        ask_order_id = self._ask_order_id.append
+        bid_cumulative_quantity = self._bid_cumulative_quantity.append
+        ask_cumulative_quantity = self._ask_cumulative_quantity.append
+
+        count = 0
+        for execution in executions:
+            bid_fill = execution.bid_fill
+            ask_fill = execution.ask_fill
+            price(execution.price)
+            quantity(execution.quantity)
+            bid_order_id(bid_fill.order_id)
+            ask_order_id(ask_fill.order_id)
+            bid_cumulative_quantity(bid_fill.cumulative_quantity)
+            ask_cumulative_quantity(ask_fill.cumulative_quantity)
+            count += 1
+
+        self._symbol.extend([symbol] * count)
+
+        if len(self) >= self.flush_rows:
+            self.flush()
+
+    def append(self, symbol, execution):
+        self.extend(symbol, [execution])
+
+    def columns(self):
+        return {name: getattr(self, '_' + name) for name in COLUMNS}
+
+    def flush(self):
+        if len(self) == 0:
+            return
+        self.writer.write(self.columns())
+        self._rows += len(self)
+        self.reset()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+def all_ints(values):
+    # Ints only; numeric-looking strings, floats and bools stay as they are
+    return all(isinstance(value, int) and not isinstance(value, bool) for value in values)
+
+def to_numpy_column(name, values):
+    if isinstance(values, array):
+        return numpy.frombuffer(values, dtype=values.typecode)
+    if name != 'symbol' and all_ints(values):
+        try:
+            return numpy.array(values, dtype=numpy.int64)
+        except OverflowError:
+            pass
+    return numpy.array([str(value) for value in values])
+
+class NpyWriter:
+    """
+    Writes each flushed batch as one .npy file per column into a directory,
+    named <column>-<batch number>.npy. Symbols, and order ids unless they are
+    all ints, are stored as unicode strings.
+    """
+
+    def __init__(self, directory):
+        if numpy is None:
+            raise ImportError('NpyWriter requires numpy')
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._batches = 0
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def batches(self):
+        return self._batches
+
+    def write(self, columns):
+        for name, values in columns.items():
+            path = os.path.join(self.directory, '{}-{:06d}.npy'.format(name, self.batches))
+            numpy.save(path, to_numpy_column(name, values))
+        self._batches += 1
+
+    def close(self):
+        pass
+
+class ArrowWriter:
+    """
+    Writes flushed batches as record batches of a single Arrow IPC stream file.
+    Order ids are stored as 64-bit integers if they are all ints, or strings
+    otherwise, so they must be of a consistent kind across batches.
+    """
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise ImportError('ArrowWriter requires pyarrow')
+        self._path = path
+        self._file = None
+        self._stream = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def write(self, columns):
+        arrays = []
+        for name in COLUMNS:
+            values = columns[name]
+            if isinstance(values, array):
+                type = pyarrow.float64() if values.typecode == 'd' else pyarrow.int64()
+                values = pyarrow.Array.from_buffers(type, len(values), [None, pyarrow.py_buffer(values)])
+            elif name == 'symbol':
+                values = pyarrow.array(values, type=pyarrow.string())
+            else:
+                try:
+                    if not all_ints(values):
+                        raise TypeError('not all ints')
+                    values = pyarrow.array([int(value) for value in values], type=pyarrow.int64())
+                except (TypeError, ValueError, OverflowError, pyarrow.ArrowException):
+                    values = pyarrow.array([str(value) for value in values], type=pyarrow.string())
+            arrays.append(values)
+        batch = pyarrow.RecordBatch.from_arrays(arrays, names=COLUMNS)
+
+        if self._stream is None:
+            self._file = open(self.path, 'wb')
+            self._stream = pyarrow.ipc.new_stream(self._file, batch.schema)
+        self._stream.write_batch(batch)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._file.close()
+            self._stream = None
+            self._file = None
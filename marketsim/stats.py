@@ -0,0 +1,127 @@
+try:
+    from time import perf_counter_ns
+except ImportError:
+    from time import perf_counter
+
+    def perf_counter_ns():
+        return int(perf_counter() * 1000000000)
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted, non-empty list
+    index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+COUNTERS = [
+    'heap_pushes',
+    'heap_pops',
+    'heap_removes',
+    'pop_empty_iterations',
+    'allocation_adjustments',
+    'auctions',
+    'executions',
+]
+
+LATENCIES = ['place', 'cancel', 'execute']
+
+class Histogram:
+    """
+    Counts non-negative integer samples (e.g. nanoseconds) in power-of-two
+    buckets: bucket i holds samples in [2 ** (i - 1), 2 ** i).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._buckets = [0] * 65
+        self._count = 0
+        self._total = 0
+        self._max = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def total(self):
+        return self._total
+
+    @property
+    def max(self):
+        return self._max
+
+    @property
+    def mean(self):
+        return self._total / self._count if self._count else None
+
+    def record(self, value):
+        self._buckets[min(value.bit_length(), 64)] += 1
+        self._count += 1
+        self._total += value
+        if value > self._max:
+            self._max = value
+
+    def merge(self, other):
+        for i, count in enumerate(other._buckets):
+            self._buckets[i] += count
+        self._count += other._count
+        self._total += other._total
+        self._max = max(self._max, other._max)
+
+    def percentile(self, p):
+        """
+        Returns the upper bound of the bucket holding the p-th percentile, or
+        None if there are no samples.
+        """
+        if self._count == 0:
+            return None
+        rank = p / 100.0 * self._count
+        seen = 0
+        for i, count in enumerate(self._buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** i - 1, self._max)
+        return self._max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {2 ** i - 1: count for i, count in enumerate(self._buckets) if count},
+        }
+
+class Stats:
+    """
+    Hot-path counters and latency histograms (in nanoseconds) of a single
+    product. Structures hold a reference to the Stats object of their product,
+    or None when instrumentation is disabled.
+    """
+
+    def __init__(self):
+        self.latency = {name: Histogram() for name in LATENCIES}
+        self.executions_per_auction = Histogram()
+        self.reset()
+
+    def reset(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        for histogram in self.latency.values():
+            histogram.reset()
+        self.executions_per_auction.reset()
+
+    def merge(self, other):
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name, histogram in self.latency.items():
+            histogram.merge(other.latency[name])
+        self.executions_per_auction.merge(other.executions_per_auction)
+
+    def snapshot(self):
+        snapshot = {name: getattr(self, name) for name in COUNTERS}
+        snapshot['latency'] = {name: histogram.snapshot() for name, histogram in self.latency.items()}
+        snapshot['executions_per_auction'] = self.executions_per_auction.snapshot()
+        return snapshot
@@ -0,0 +1,189 @@
+from heapq import heappush, heappop
+import itertools
+import math
+
+class TimerWheel:
+    """
+    A hierarchical timer wheel mapping keys to expiry times. Level 0 has one
+    slot per tick of the given resolution, and each level above covers slots
+    times the range of the level below; keys further away than the top level
+    wait in an overflow dict, ordered by a heap of their ticks. Keys move
+    down a level when their slot comes due (overflow keys once they are in
+    range of the top level), so advance() costs O(expired + moved) rather
+    than O(scheduled). Stretches of empty levels are skipped, and when only
+    the overflow holds keys, the clock jumps straight to the earliest of them.
+
+    Ticks start at the first time passed to schedule() or advance(), and
+    advance() must be called with non-decreasing times.
+    """
+
+    def __init__(self, resolution=1.0, slots=64, levels=4):
+        self._resolution = resolution
+        self._slots = slots
+        self._levels = levels
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._counts = [0] * levels
+        self._overflow = {}
+        # (tick, sequence, key) of the overflow keys; entries of cancelled
+        # keys stay until popped
+        self._overflow_heap = []
+        self._sequence = itertools.count()
+        self._due = {}
+        self._locations = {}
+        self._tick = None
+        self._now = None
+
+    @property
+    def resolution(self):
+        return self._resolution
+
+    @property
+    def now(self):
+        return self._now
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, key):
+        return key in self._locations
+
+    def copy(self):
+        wheel = TimerWheel(self._resolution, self._slots, self._levels)
+        wheel._wheels = [[dict(slot) for slot in wheel_slots] for wheel_slots in self._wheels]
+        wheel._counts = list(self._counts)
+        wheel._overflow = dict(self._overflow)
+        wheel._overflow_heap = list(self._overflow_heap)
+        wheel._sequence = itertools.count(next(self._sequence))
+        wheel._due = dict(self._due)
+        wheel._locations = dict(self._locations)
+        wheel._tick = self._tick
+        wheel._now = self._now
+        return wheel
+
+    def to_tick(self, time):
+        return math.floor(time / self._resolution)
+
+    def start(self, time):
+        if self._tick is None:
+            self._tick = self.to_tick(time)
+
+    def insert(self, key, time):
+        delta = self.to_tick(time) - self._tick
+        if delta < 0:
+            self._due[key] = time
+            self._locations[key] = None
+            return
+        span = 1
+        for level in range(self._levels):
+            if delta < span * self._slots:
+                index = (self.to_tick(time) // span) % self._slots
+                self._wheels[level][index][key] = time
+                self._counts[level] += 1
+                self._locations[key] = (level, index)
+                return
+            span *= self._slots
+        self._overflow[key] = time
+        heappush(self._overflow_heap, (self.to_tick(time), next(self._sequence), key))
+        self._locations[key] = -1
+
+    def schedule(self, key, time):
+        """
+        Schedules key to expire at time. Keys already due are returned by the
+        next advance().
+        """
+        if key in self._locations:
+            raise KeyError('key already exists: {}'.format(key))
+        self.start(time)
+        if self._now is not None and time <= self._now:
+            self._due[key] = time
+            self._locations[key] = None
+        else:
+            self.insert(key, time)
+
+    def cancel(self, key):
+        location = self._locations.pop(key)
+        if location is None:
+            del self._due[key]
+        elif location == -1:
+            del self._overflow[key]
+        else:
+            level, index = location
+            del self._wheels[level][index][key]
+            self._counts[level] -= 1
+
+    def take(self, slot, now, expired):
+        # Expires the keys of a level-0 slot due by now, and keeps the rest
+        for key, time in list(slot.items()):
+            if time <= now:
+                del slot[key]
+                del self._locations[key]
+                self._counts[0] -= 1
+                expired.append(key)
+
+    def cascade(self, tick):
+        slots = self._slots
+        top = slots ** (self._levels - 1)
+        # Overflow keys move down once they are in range of the top level
+        heap = self._overflow_heap
+        while heap and heap[0][0] - tick < top * slots:
+            _, _, key = heappop(heap)
+            time = self._overflow.pop(key, None)
+            if time is not None:
+                self.insert(key, time)
+
+        for level in range(self._levels - 1, 0, -1):
+            span = slots ** level
+            if tick % span == 0:
+                slot = self._wheels[level][(tick // span) % slots]
+                if slot:
+                    self._wheels[level][(tick // span) % slots] = {}
+                    self._counts[level] -= len(slot)
+                    for key, time in slot.items():
+                        self.insert(key, time)
+
+    def next_tick(self, target):
+        tick = self._tick + 1
+        slots = self._slots
+        step = 1
+        for level in range(self._levels):
+            if self._counts[level]:
+                break
+            step = slots ** (level + 1)
+        else:
+            if not self._overflow_heap:
+                return target
+            # Only the overflow holds keys: jump to the earliest of them
+            return min(target, max(tick, self._overflow_heap[0][0]))
+        return min(target, -(-tick // step) * step)
+
+    def advance(self, now):
+        """
+        Moves the clock forward to now and returns the keys that expired, in
+        order of their tick.
+        """
+        self.start(now)
+        if self._now is not None and now < self._now:
+            raise ValueError('time cannot go backwards: {} < {}'.format(now, self._now))
+        self._now = now
+
+        expired = []
+        if self._due:
+            for key, time in list(self._due.items()):
+                if time <= now:
+                    del self._due[key]
+                    del self._locations[key]
+                    expired.append(key)
+
+        slots = self._slots
+        level0 = self._wheels[0]
+        target = self.to_tick(now)
+
+        # Keys of the current tick may have expired since the last advance()
+        self.take(level0[self._tick % slots], now, expired)
+
+        while self._tick < target:
+            self._tick = self.next_tick(target)
+            self.cascade(self._tick)
+            self.take(level0[self._tick % slots], now, expired)
+
+        return expired
@@ -0,0 +1,59 @@
+from enum import Enum
+
+class Stage(Enum):
+    ORDER_RECEIVED    = 1
+    LEVEL_CREATED     = 2
+    ENTRY_QUEUED      = 3
+    ALLOCATION_DONE   = 4
+    EXECUTION_EMITTED = 5
+    LEVEL_POPPED      = 6
+
+class TraceRecorder:
+    """
+    A tracer that keeps every event in memory. A tracer is any callable
+    tracer(stage, timestamp, order_id), where timestamp is from
+    time.perf_counter_ns(). See Product.tracer for when each stage is emitted.
+    """
+
+    def __init__(self):
+        self._events = []
+
+    @property
+    def events(self):
+        return self._events
+
+    def __call__(self, stage, timestamp, order_id):
+        self._events.append((stage, timestamp, order_id))
+
+    def __len__(self):
+        return len(self._events)
+
+    def clear(self):
+        self._events = []
+
+    def by_order(self):
+        """
+        Returns a dict of order id to its list of (stage, timestamp) pairs, in
+        the order they were emitted.
+        """
+        orders = {}
+        for stage, timestamp, order_id in self._events:
+            orders.setdefault(order_id, []).append((stage, timestamp))
+        return orders
+
+    def durations(self, start, end):
+        """
+        Returns a dict of order id to nanoseconds between the first start stage
+        and the first end stage that follows it, for orders that went through
+        both stages.
+        """
+        durations = {}
+        for order_id, stages in self.by_order().items():
+            started = None
+            for stage, timestamp in stages:
+                if started is None and stage == start:
+                    started = timestamp
+                elif started is not None and stage == end:
+                    durations[order_id] = timestamp - started
+                    break
+        return durations
@@ -1,4 +1,5 @@
-from marketsim import Order, OrderEntry, Side, TimeOrderQueue
+from marketsim import Order, OrderEntry, Side, TimeOrderQueue, Product, Market, Fifo, ProRata, ProRataMinLot, ProRataTopOrder
+import random
 import unittest
 
 class TestAllocation(unittest.TestCase):
@@ -48,5 +49,86 @@ class TestAllocation(unittest.TestCase):
         # [6, 7, 9, 10-1, 12-1]
         self.assertEqual(self.allocate(bid_queue, 42), [(6, 11, 11), (7, 13, 13), (9, 17, 17), (9, 19, 19), (11, 23, 23)])
 
+class TestAllocationPolicy(unittest.TestCase):
+    def queue(self, *quantities):
+        queue = TimeOrderQueue(None)
+        for quantity in quantities:
+            queue.push(OrderEntry(Order(Side.BUY, 'abc', quantity, 120)))
+        return queue
+
+    def allocate(self, queue, sum_quantity, policy):
+        return [allocation.quantity for allocation in queue.allocate(sum_quantity, policy)]
+
+    def test_fifo(self):
+        queue = self.queue(10, 20, 30)
+        self.assertEqual(self.allocate(queue, 25, Fifo()), [10, 15])
+        self.assertEqual(self.allocate(queue, 10, Fifo()), [10])
+        self.assertEqual(self.allocate(queue, 60, Fifo()), [10, 20, 30])
+
+        queue.cancel(queue.entries[0])
+        self.assertEqual(self.allocate(queue, 25, Fifo()), [20, 5])
+
+    def test_pro_rata_min_lot(self):
+        queue = self.queue(10, 20, 30, 200)
+        # Shares of 62 are 2.4, 4.8, 7.2 and 47.7, so 0, 0, 5 and 45 in lots of
+        # 5, and the residual of 12 is filled in arrival order
+        self.assertEqual(self.allocate(queue, 62, ProRataMinLot(5)), [10, 2, 5, 45])
+        # Shares of 1, 2, 3 and 20; only the last reaches the lot
+        self.assertEqual(self.allocate(queue, 26, ProRataMinLot(5)), [6, 20])
+
+    def test_pro_rata_top_order(self):
+        queue = self.queue(10, 20, 30)
+        self.assertEqual(self.allocate(queue, 8, ProRataTopOrder()), [8])
+        self.assertEqual(self.allocate(queue, 30, ProRataTopOrder()), [10, 8, 12])
+        # The top order takes 6 and then shares 24 with the rest: 1, 8 and 13,
+        # plus the residual of 2
+        self.assertEqual(self.allocate(queue, 30, ProRataTopOrder(share=0.2)), [9, 8, 13])
+
+    def test_random(self):
+        rng = random.Random(0)
+        policies = [Fifo(), ProRata(), ProRataMinLot(1), ProRataMinLot(7), ProRataTopOrder(), ProRataTopOrder(0.4, 3)]
+        for _ in range(200):
+            queue = self.queue(*[rng.randint(1, 50) for _ in range(rng.randint(1, 10))])
+            for entry in list(queue.entries):
+                if rng.random() < 0.2:
+                    queue.cancel(entry)
+            if queue.volume == 0:
+                continue
+            sum_quantity = rng.randint(1, queue.volume)
+            for policy in policies:
+                allocations = queue.allocate(sum_quantity, policy)
+                self.assertEqual(sum(allocation.quantity for allocation in allocations), sum_quantity, policy)
+                for allocation in allocations:
+                    self.assertTrue(0 < allocation.quantity <= allocation.entry.remaining, policy)
+                self.assertEqual(len({id(allocation.entry) for allocation in allocations}), len(allocations))
+
+    def test_product(self):
+        product = Product('abc', allocation=Fifo())
+        product.place(Order(Side.BUY, 'abc', 10, 100, time=1, id='a'))
+        product.place(Order(Side.BUY, 'abc', 10, 100, time=1, id='b'))
+        executions = product.execute(Order(Side.SELL, 'abc', 12, 100, time=2))
+        self.assertEqual([(execution.bid_fill.order_id, execution.quantity) for execution in executions], [('a', 10), ('b', 2)])
+
+        market = Market(allocation=ProRataTopOrder(share=0.5))
+        self.assertIsInstance(market['abc'].allocation, ProRataTopOrder)
+        market['abc'].allocation = None
+        self.assertIsInstance(market['abc'].allocation, ProRata)
+
+    def test_fifo_drops_filled_entries(self):
+        product = Product('abc', allocation=Fifo())
+        for i in range(100):
+            product.place(Order(Side.BUY, 'abc', 1, 100, time=1, id=i))
+        product.cancel(Order(id=50))
+        product.cancel(Order(id=0))
+
+        time_queue = product[Side.BUY].heap[-100].heap[1]
+        for i in range(40):
+            product.execute(Order(Side.SELL, 'abc', 1, 100, time=2))
+            # Filled and cancelled entries do not pile up at the front
+            self.assertGreater(time_queue.entries[0].remaining, 0)
+        self.assertEqual(len(time_queue.entries), 59)
+        self.assertEqual(time_queue.count, 58)
+        self.assertEqual(time_queue.entries[0].order_id, 41)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,73 @@
+from marketsim import Market, Order, Side, State, BatchAuction
+import unittest
+
+class TestBatchAuction(unittest.TestCase):
+    def test_interval(self):
+        market = Market()
+        batches = []
+        auction = BatchAuction(market, interval=10, callback=batches.append)
+
+        self.assertIsNone(auction.place(Order(Side.SELL, 'abc', 10, 100, id='sell1')))
+        self.assertIsNone(auction.place(Order(Side.SELL, 'abc', 10, 101, id='sell2')))
+        self.assertIsNone(auction.place(Order(Side.BUY, 'abc', 15, 102, id='buy1')))
+        self.assertIsNone(auction.place(Order(Side.BUY, 'xyz', 5, 50, id='buy2')))
+        self.assertEqual(market.entries['buy1'].state, State.NEW)
+
+        self.assertEqual(auction.advance_time(9), [])
+        result = auction.advance_time(10)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(batches, result)
+
+        batch = batches[0]
+        self.assertEqual((batch.number, batch.time, batch.messages), (1, 10, 4))
+        self.assertEqual(list(batch.executions), ['abc'])
+        self.assertEqual(batch.count, 2)
+        # Uniform clearing price for the whole batch
+        self.assertEqual({execution.price for execution in batch.executions['abc']}, {101.5})
+        self.assertEqual(market.entries['buy1'].state, State.FULLY_FILLED)
+
+        # Intervals without orders are skipped
+        result = auction.advance_time(55)
+        self.assertEqual([batch.time for batch in result], [20])
+        self.assertEqual(auction.next_auction, 60)
+
+    def test_max_messages(self):
+        market = Market()
+        auction = BatchAuction(market, max_messages=3)
+        self.assertIsNone(auction.place(Order(Side.SELL, 'abc', 10, 100, id='sell1')))
+        self.assertIsNone(auction.place(Order(Side.BUY, 'abc', 10, 100, id='buy1')))
+        self.assertEqual(auction.pending_messages, 2)
+
+        batch = auction.cancel(Order(id='sell1'))
+        self.assertEqual(batch.count, 0)
+        self.assertEqual(auction.pending_messages, 0)
+        self.assertEqual(market.entries['buy1'].state, State.NEW)
+
+        batch = auction.place_batch([Order(Side.SELL, 'abc', 4, 100), Order(Side.SELL, 'abc', 4, 100), Order(Side.SELL, 'abc', 4, 100)])
+        self.assertEqual(batch.count, 3)
+        self.assertEqual(market.entries['buy1'].state, State.FULLY_FILLED)
+
+    def test_ioc_and_events(self):
+        market = Market()
+        delivered = []
+        market.subscribe(delivered.append)
+        auction = BatchAuction(market, interval=1)
+
+        auction.place(Order(Side.SELL, 'abc', 10, 100, id='sell1'))
+        auction.place(Order(Side.BUY, 'abc', 15, 100, id='ioc', tif='ioc'))
+        self.assertEqual(delivered, [])
+
+        batch, = auction.advance_time(1)
+        self.assertEqual([execution.quantity for execution in batch.executions['abc']], [10])
+        self.assertEqual(market.entries['ioc'].state, State.CANCELLED)
+        self.assertEqual(len(delivered), 1)
+        self.assertEqual(delivered[0][0].executions, batch.executions['abc'])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            BatchAuction(Market(), interval=0)
+        with self.assertRaises(ValueError):
+            BatchAuction(Market(), max_messages=0)
+
+if __name__ == '__main__':
+    unittest.main()
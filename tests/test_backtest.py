@@ -0,0 +1,83 @@
+from marketsim import Market, Order, Side, State, TimeInForce, Backtest
+import unittest
+
+class TestBacktest(unittest.TestCase):
+    def test_order_time(self):
+        backtest = Backtest()
+        backtest.schedule_order(5, Order(Side.SELL, 'abc', 10, 100, id='sell1'))
+        backtest.schedule_order(3, Order(Side.SELL, 'abc', 10, 100, id='sell2'))
+        backtest.schedule_order(7, Order(Side.BUY, 'abc', 10, 100, id='buy1'))
+        backtest.schedule_order(7, Order(Side.SELL, 'abc', 10, 100, time=1, id='sell3'))
+
+        self.assertEqual(backtest.run(until=6), 2)
+        self.assertEqual(backtest.now, 6)
+        entries = backtest.market.entries
+        self.assertEqual((entries['sell1'].time, entries['sell2'].time), (5, 3))
+
+        self.assertEqual(backtest.run(), 2)
+        self.assertEqual(backtest.now, 7)
+        # Time priority follows the simulated time, an explicit time is kept
+        self.assertEqual(entries['sell2'].state, State.FULLY_FILLED)
+        self.assertEqual(entries['sell1'].state, State.NEW)
+        self.assertEqual(entries['sell3'].time, 1)
+        self.assertEqual(backtest.processed, 4)
+        self.assertEqual(backtest.pending, 0)
+        self.assertFalse(backtest.step())
+
+    def test_cancel_and_auction(self):
+        executions = []
+        backtest = Backtest(on_executions=lambda backtest, batch: executions.append((backtest.now, len(batch))))
+        backtest.schedule_order(1, Order(Side.SELL, 'abc', 10, 100, id='sell1'), execute=False)
+        backtest.schedule_order(1, Order(Side.BUY, 'abc', 10, 100, id='buy1'), execute=False)
+        backtest.schedule_order(1, Order(Side.BUY, 'abc', 5, 99, id='buy2'), execute=False)
+        backtest.schedule_cancel(2, Order(Side.BUY, 'abc', 0, id='buy2'))
+        backtest.schedule_auction(3)
+        backtest.schedule_cancel(4, Order(Side.BUY, 'abc', 0, id='buy1'))
+        backtest.run()
+
+        entries = backtest.market.entries
+        self.assertEqual(entries['buy2'].state, State.CANCELLED)
+        self.assertEqual(entries['buy1'].state, State.FULLY_FILLED)
+        self.assertEqual(executions, [(3, 1)])
+        # Cancel after the fill is skipped
+        self.assertEqual(backtest.rejected_cancels, 1)
+
+        with self.assertRaises(ValueError):
+            backtest.schedule_auction(3)
+
+    def test_callbacks(self):
+        backtest = Backtest()
+        times = []
+
+        def quote(backtest):
+            times.append(backtest.now)
+            backtest.submit(Order(Side.SELL, 'abc', 1, 100))
+
+        backtest.every(10, quote, start=5, end=35)
+        backtest.schedule(20, lambda backtest: backtest.submit(Order(Side.BUY, 'abc', 2, None)))
+        backtest.run()
+        self.assertEqual(times, [5, 15, 25, 35])
+
+        product = backtest.market.products['abc']
+        self.assertEqual([(entry.time, entry.remaining) for entry in product.open_orders(Side.SELL)], [(25, 1), (35, 1)])
+
+    def test_order_not_changed(self):
+        backtest = Backtest()
+        order = Order(Side.SELL, 'abc', 10, 100, id='sell1')
+        backtest.schedule_order(5, order)
+        backtest.run()
+        self.assertIsNone(order.time)
+        entry = backtest.market.entries['sell1']
+        self.assertEqual(entry.time, 5)
+        self.assertEqual((entry.order.id, entry.order.quantity, entry.order.price), ('sell1', 10, 100))
+
+    def test_expiry(self):
+        backtest = Backtest(Market())
+        backtest.schedule_order(1, Order(Side.BUY, 'abc', 10, 100, id='buy1', tif=TimeInForce.GTT, expire_time=5))
+        backtest.run(until=4)
+        self.assertEqual(backtest.market.entries['buy1'].state, State.NEW)
+        backtest.run(until=5)
+        self.assertEqual(backtest.market.entries['buy1'].state, State.CANCELLED)
+
+if __name__ == '__main__':
+    unittest.main()
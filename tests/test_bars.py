@@ -0,0 +1,134 @@
+from marketsim import Market, Product, Order, Side, TradeStats, BarSeries
+import random
+import unittest
+
+class TestTradeStats(unittest.TestCase):
+    def test_add(self):
+        stats = TradeStats()
+        self.assertIsNone(stats.open)
+        self.assertIsNone(stats.vwap)
+
+        for price, quantity in [(100, 10), (102, 5), (99, 5), (101, 20)]:
+            stats.add(price, quantity)
+        self.assertEqual((stats.open, stats.high, stats.low, stats.close), (100, 102, 99, 101))
+        self.assertEqual((stats.volume, stats.count), (40, 4))
+        self.assertAlmostEqual(stats.vwap, (1000 + 510 + 495 + 2020) / 40.0)
+
+class TestBarSeries(unittest.TestCase):
+    def test_bars(self):
+        bars = BarSeries(60)
+        bars.add(5, 100, 1)
+        bars.add(59, 101, 2)
+        self.assertEqual(len(bars), 0)
+        self.assertEqual(bars.start, 0)
+
+        bars.add(60, 102, 3)
+        bars.add(250, 103, 4)
+        self.assertEqual(len(bars), 2)
+        self.assertEqual(bars.start, 240)
+        self.assertEqual(bars.current.close, 103)
+
+        bars.advance(299)
+        self.assertEqual(len(bars), 2)
+        bars.advance(300)
+        self.assertEqual(len(bars), 3)
+
+        arrays = bars.arrays()
+        self.assertEqual(arrays['time'].tolist(), [0, 60, 240])
+        self.assertEqual(arrays['open'].tolist(), [100, 102, 103])
+        self.assertEqual(arrays['close'].tolist(), [101, 102, 103])
+        self.assertEqual(arrays['volume'].tolist(), [3, 3, 4])
+        self.assertEqual(arrays['count'].tolist(), [2, 1, 1])
+
+    def test_random(self):
+        # Compare against bars recomputed from all trades
+        rng = random.Random(0)
+        bars = BarSeries(10, origin=3)
+        trades = []
+        time = 0.0
+        for _ in range(1000):
+            time += rng.expovariate(0.5)
+            trade = (time, rng.randint(90, 110), rng.randint(1, 10))
+            trades.append(trade)
+            bars.add(*trade)
+        bars.advance(time + 10)
+
+        expected = {}
+        for time, price, quantity in trades:
+            expected.setdefault((time - 3) // 10 * 10 + 3, []).append((price, quantity))
+        arrays = bars.arrays()
+        self.assertEqual(arrays['time'].tolist(), sorted(expected))
+        self.assertEqual(arrays['high'].tolist(), [max(price for price, _ in expected[key]) for key in sorted(expected)])
+        self.assertEqual(arrays['low'].tolist(), [min(price for price, _ in expected[key]) for key in sorted(expected)])
+        self.assertEqual(arrays['volume'].tolist(), [sum(quantity for _, quantity in expected[key]) for key in sorted(expected)])
+
+class TestProductTradeStats(unittest.TestCase):
+    def test_product(self):
+        product = Product('abc', bar_interval=60)
+        self.assertIsNone(Product('abc').session)
+
+        product.place(Order(Side.SELL, 'abc', 10, 100, time=0))
+        product.place(Order(Side.SELL, 'abc', 10, 101, time=0))
+        product.execute(Order(Side.BUY, 'abc', 15, 101, time=30))
+        product.place(Order(Side.SELL, 'abc', 10, 99, time=70))
+        product.execute(Order(Side.BUY, 'abc', 10, 99, time=75))
+
+        session = product.session
+        self.assertEqual((session.open, session.high, session.low, session.close), (101, 101, 99, 99))
+        self.assertEqual((session.volume, session.count), (25, 3))
+        self.assertAlmostEqual(session.vwap, (15 * 101 + 10 * 99) / 25.0)
+
+        self.assertEqual(len(product.bars), 1)
+        self.assertEqual(product.bars.arrays()['volume'].tolist(), [15])
+        self.assertEqual(product.bars.current.volume, 10)
+
+        fork = product.fork()
+        fork.place(Order(Side.SELL, 'abc', 10, 99, time=80))
+        fork.execute(Order(Side.BUY, 'abc', 10, 99, time=80))
+        self.assertEqual(fork.session.volume, 35)
+        self.assertEqual(product.session.volume, 25)
+
+    def test_market(self):
+        market = Market(trade_stats=True, bar_interval=60)
+        market.session_end = 1000
+        market.place(Order(Side.SELL, 'abc', 10, 100, time=0))
+        market.execute(Order(Side.BUY, 'abc', 10, 100, time=10))
+        self.assertEqual(market['abc'].session.volume, 10)
+
+        market.advance_time(100)
+        self.assertEqual(len(market['abc'].bars), 1)
+
+        market.end_session()
+        self.assertEqual(market['abc'].session.volume, 0)
+        self.assertIsNone(market['abc'].session.vwap)
+
+    def test_market_bar_ends(self):
+        market = Market(bar_interval=60)
+        for symbol in ['abc', 'xyz', 'def']:
+            market.place(Order(Side.SELL, symbol, 10, 100, time=0))
+        market.execute(Order(Side.BUY, 'abc', 5, 100, time=10))
+        market.execute(Order(Side.BUY, 'xyz', 5, 100, time=70))
+        # Only products with a bar in progress are scheduled
+        self.assertEqual(sorted(market._bar_ends), [(60, 'abc'), (120, 'xyz')])
+
+        fork = market.fork()
+        market.advance_time(60)
+        self.assertEqual(len(market['abc'].bars), 1)
+        self.assertEqual(len(market['xyz'].bars), 0)
+        self.assertEqual(market._bar_ends, [(120, 'xyz')])
+        self.assertEqual(len(fork['abc'].bars), 0)
+
+        # A later trade completes the bar first; the stale end is skipped
+        market.execute(Order(Side.BUY, 'xyz', 5, 100, time=130))
+        market.advance_time(179)
+        self.assertEqual(len(market['xyz'].bars), 1)
+        self.assertEqual(market['xyz'].bars.start, 120)
+        market.advance_time(180)
+        self.assertEqual(len(market['xyz'].bars), 2)
+        self.assertEqual(market._bar_ends, [])
+
+        fork.advance_time(60)
+        self.assertEqual(len(fork['abc'].bars), 1)
+
+if __name__ == '__main__':
+    unittest.main()
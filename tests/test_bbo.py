@@ -0,0 +1,81 @@
+from marketsim import Market, Order, Quote, Side
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class TestBboTable(unittest.TestCase):
+    def make_market(self):
+        market = Market()
+        market.place(Order(Side.SELL, 'abc', 10, 110, id='sell1'))
+        market.place(Order(Side.SELL, 'abc', 5, 110, id='sell2'))
+        market.place(Order(Side.SELL, 'abc', 10, 120, id='sell3'))
+        market.place(Order(Side.BUY, 'abc', 10, 100, id='buy1'))
+        market.place(Order(Side.BUY, 'xyz', 3, 50, id='buy2'))
+        return market
+
+    def test_quotes(self):
+        market = self.make_market()
+        bbo = market.bbo()
+        self.assertEqual(list(bbo), ['abc', 'xyz'])
+        self.assertEqual(bbo['abc'], Quote(100, 110, 10, 15, None))
+        self.assertEqual(bbo['xyz'], Quote(50, None, 3, 0, None))
+        self.assertEqual(dict(bbo)['abc'], market['abc'].quote())
+        self.assertNotIn('def', bbo)
+
+        market.execute(Order(Side.BUY, 'abc', 15, 110, id='buy3'))
+        market.cancel(Order(id='buy1'))
+        market.place(Order(Side.SELL, 'def', 1, 10, id='sell4'))
+        bbo = market.bbo()
+        self.assertEqual(bbo['abc'], Quote(None, 120, 0, 10, 110))
+        self.assertEqual(bbo['def'], Quote(None, 10, 0, 1, None))
+        self.assertEqual(len(bbo), 3)
+
+    def test_incremental(self):
+        market = self.make_market()
+        bbo = market.bbo()
+        version = bbo.version
+
+        # Nothing changed, or a change below the top level only
+        self.assertIs(market.bbo(), bbo)
+        self.assertEqual(bbo.version, version)
+        market.place(Order(Side.SELL, 'abc', 10, 130))
+        self.assertEqual(market.bbo().version, version)
+
+        market.place(Order(Side.BUY, 'xyz', 1, 50))
+        self.assertEqual(market.bbo().version, version + 1)
+        self.assertEqual(bbo['xyz'].bid_volume, 4)
+
+    def test_cancel_all(self):
+        market = self.make_market()
+        market.bbo()
+        market.cancel_all('abc', side=Side.SELL)
+        self.assertEqual(market.bbo()['abc'], Quote(100, None, 10, 0, None))
+        market.cancel_all('abc', side=Side.BUY, price=100)
+        self.assertEqual(market.bbo()['abc'], Quote(None, None, 0, 0, None))
+        market.cancel_all('xyz')
+        self.assertEqual(market.bbo()['xyz'], Quote(None, None, 0, 0, None))
+
+    def test_fork(self):
+        market = self.make_market()
+        market.bbo()
+        fork = market.fork()
+        fork.execute(Order(Side.BUY, 'abc', 15, 110))
+        self.assertEqual(fork.bbo()['abc'], Quote(100, 120, 10, 10, 110))
+        self.assertEqual(market.bbo()['abc'], Quote(100, 110, 10, 15, None))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_arrays(self):
+        market = self.make_market()
+        arrays = market.bbo().arrays()
+        self.assertEqual(arrays['bid_price'].tolist(), [100, 50])
+        self.assertEqual(arrays['ask_price'][0], 110)
+        self.assertTrue(numpy.isnan(arrays['ask_price'][1]))
+        self.assertTrue(numpy.isnan(arrays['last_price']).all())
+        self.assertEqual(arrays['ask_volume'].dtype, numpy.int64)
+        self.assertEqual(arrays['ask_volume'].tolist(), [15, 0])
+
+if __name__ == '__main__':
+    unittest.main()
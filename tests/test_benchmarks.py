@@ -0,0 +1,19 @@
+from benchmarks import run, workloads
+import unittest
+
+class TestBenchmarks(unittest.TestCase):
+    def test_workloads_are_seeded(self):
+        first = [(order.side, order.quantity, order.price) for order in workloads.deep_book(seed=1, levels=10)]
+        second = [(order.side, order.quantity, order.price) for order in workloads.deep_book(seed=1, levels=10)]
+        self.assertEqual(first, second)
+
+    def test_run(self):
+        results = run.run(seed=0, scale=0.001, memory=False)
+        self.assertEqual(set(results['results']), set(run.BENCHMARKS))
+        for name, result in results['results'].items():
+            for op, stats in result.items():
+                self.assertGreater(stats['count'], 0)
+                self.assertLessEqual(stats['p50_us'], stats['max_us'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+from marketsim import Market, Product, Order, Side
+import marketsim.market as market_module
+import unittest
+
+@unittest.skipIf(market_module.numpy is None, 'numpy is not installed')
+class TestBookArrays(unittest.TestCase):
+    def columns(self, arrays):
+        return [column.tolist() for column in arrays]
+
+    def test_order_queue(self):
+        product = Product('abc')
+        product.place(Order(Side.BUY, 'abc', 10, 100, id=1))
+        product.place(Order(Side.BUY, 'abc', 20, 100, id=2))
+        product.place(Order(Side.BUY, 'abc', 30, 99, id=3))
+        product.place(Order(Side.BUY, 'abc', 40, 98, id=4))
+        product.place(Order(Side.SELL, 'abc', 5, None, id=5))
+
+        queue = product[Side.BUY]
+        prices, volumes, counts = queue.get_order_book_arrays()
+        self.assertEqual(prices.dtype.name, 'float64')
+        self.assertEqual(volumes.dtype.name, 'int64')
+        self.assertEqual(self.columns((prices, volumes, counts)), [[100, 99, 98], [30, 30, 40], [2, 1, 1]])
+        self.assertFalse(prices.flags.writeable)
+
+        # Unchanged: views over the same buffer, also at a smaller depth
+        numpy = market_module.numpy
+        self.assertTrue(numpy.shares_memory(queue.get_order_book_arrays()[0], prices))
+        self.assertTrue(numpy.shares_memory(queue.get_order_book_arrays(2)[0], prices))
+        self.assertEqual(self.columns(queue.get_order_book_arrays(2)), [[100, 99], [30, 30], [2, 1]])
+
+        # Market order level is reported with a NaN price
+        ask_prices, ask_volumes, _ = product[Side.SELL].get_order_book_arrays()
+        self.assertEqual(len(ask_prices), 1)
+        self.assertNotEqual(ask_prices[0], ask_prices[0])
+        self.assertEqual(ask_volumes.tolist(), [5])
+
+        product.cancel(Order(id=3))
+        self.assertEqual(self.columns(queue.get_order_book_arrays(2)), [[100, 98], [30, 40], [2, 1]])
+        self.assertEqual(self.columns((prices, volumes, counts)), [[100, 99, 98], [30, 30, 40], [2, 1, 1]])
+
+        product.execute()
+        self.assertEqual(self.columns(queue.get_order_book_arrays()), [[100, 98], [25, 40], [2, 1]])
+
+    def test_matches_order_book(self):
+        product = Product('abc')
+        for i in range(50):
+            product.place(Order(Side.SELL, 'abc', i + 1, 100 + i % 7, id=i))
+        for i in range(0, 50, 3):
+            product.cancel(Order(id=i))
+        for depth in [None, 1, 3, 10]:
+            stats = product[Side.SELL].get_order_book(depth)
+            arrays = product[Side.SELL].get_order_book_arrays(depth)
+            self.assertEqual(self.columns(arrays), [[stat.price for stat in stats], [stat.volume for stat in stats], [stat.count for stat in stats]])
+
+    def test_market(self):
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 100))
+        market.place(Order(Side.SELL, 'xyz', 10, 50))
+        books = market.book_arrays()
+        self.assertEqual(sorted(books), ['abc', 'xyz'])
+        self.assertEqual(self.columns(books['abc'][Side.BUY]), [[100], [10], [1]])
+        self.assertEqual(self.columns(books['abc'][Side.SELL]), [[], [], []])
+        self.assertEqual(list(market.book_arrays(['xyz', 'unknown'])), ['xyz'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from marketsim import Market, Order, Side, State
+import unittest
+
+class TestCancelAll(unittest.TestCase):
+    def setUp(self):
+        self.market = Market()
+        self.market.place(Order(Side.BUY, 'abc', 10, 100, time=0, id=1, account='a'))
+        self.market.place(Order(Side.BUY, 'abc', 20, 100, time=1, id=2, account='b'))
+        self.market.place(Order(Side.BUY, 'abc', 30, 99, time=0, id=3, account='a'))
+        self.market.place(Order(Side.SELL, 'abc', 40, 101, time=0, id=4, account='a'))
+        self.market.place(Order(Side.SELL, 'xyz', 50, 101, time=0, id=5, account='a'))
+
+    def test_side(self):
+        ids = self.market.cancel_all(symbol='abc', side=Side.BUY)
+        self.assertEqual(ids, [1, 2, 3])
+        product = self.market['abc']
+        self.assertEqual(product.bid_price, None)
+        self.assertEqual(product[Side.BUY].count, 0)
+        self.assertEqual(product[Side.BUY].volume, 0)
+        self.assertEqual(product[Side.BUY].get_order_book(), [])
+        self.assertEqual(product.ask_price, 101)
+        for order_id in ids:
+            self.assertEqual(self.market.entries[order_id].state, State.CANCELLED)
+            self.assertEqual(self.market.entries[order_id].remaining, 0)
+
+        # The side still works after being dropped
+        self.market.place(Order(Side.BUY, 'abc', 10, 101, time=2, id=6))
+        self.assertEqual([execution.quantity for execution in self.market.execute()], [10])
+
+    def test_price(self):
+        ids = self.market.cancel_all(symbol='abc', side='buy', price=100)
+        self.assertEqual(ids, [1, 2])
+        product = self.market['abc']
+        self.assertEqual(product.bid_price, 99)
+        self.assertEqual(product[Side.BUY].count, 1)
+        self.assertEqual(product[Side.BUY].volume, 30)
+        self.assertEqual(self.market.cancel_all(symbol='abc', side='buy', price=100), [])
+
+    def test_account(self):
+        ids = self.market.cancel_all(account='a')
+        self.assertEqual(sorted(ids), [1, 3, 4, 5])
+        self.assertEqual(self.market.open_orders(account='a'), [])
+        self.assertEqual([entry.order_id for entry in self.market.open_orders()], [2])
+        product = self.market['abc']
+        self.assertEqual(product.bid_price, 100)
+        self.assertEqual(product.ask_price, None)
+        self.assertEqual(product[Side.BUY].volume, 20)
+        self.assertEqual(product[Side.SELL].volume, 0)
+
+    def test_account_price(self):
+        ids = self.market.cancel_all(symbol='abc', price=100, account='a')
+        self.assertEqual(ids, [1])
+        self.assertEqual(self.market['abc'][Side.BUY].volume, 50)
+
+    def test_everything(self):
+        self.assertEqual(sorted(self.market.cancel_all()), [1, 2, 3, 4, 5])
+        self.assertEqual(self.market.open_orders(), [])
+        self.assertEqual(self.market.cancel_all(), [])
+
+    def test_fork(self):
+        fork = self.market.fork()
+        fork.cancel_all(symbol='abc')
+        self.assertEqual(self.market.entries[1].state, State.NEW)
+        self.assertEqual(self.market['abc'][Side.BUY].volume, 60)
+        self.assertEqual(fork.entries[1].state, State.CANCELLED)
+        self.assertEqual(fork['abc'][Side.BUY].volume, 0)
+
+        fork = self.market.fork()
+        fork.cancel_all(symbol='abc', price=100)
+        self.assertEqual(self.market.entries[2].state, State.NEW)
+        self.assertEqual(self.market['abc'].bid_price, 100)
+        self.assertEqual(fork.entries[2].state, State.CANCELLED)
+
+if __name__ == '__main__':
+    unittest.main()
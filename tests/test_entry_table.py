@@ -0,0 +1,62 @@
+from marketsim import EntryTable
+import sys
+import unittest
+
+class TestEntryTable(unittest.TestCase):
+    def test_layers(self):
+        base = {1: 'a', 2: 'b'}
+        table = EntryTable.layer(base)
+        table[2] = 'B'
+        table[3] = 'c'
+
+        self.assertEqual(table[1], 'a')
+        self.assertEqual(table[2], 'B')
+        self.assertEqual(table.get(3), 'c')
+        self.assertIsNone(table.get(4))
+        self.assertIn(1, table)
+        self.assertNotIn(4, table)
+        with self.assertRaises(KeyError):
+            table[4]
+
+        self.assertEqual(len(table), 3)
+        self.assertEqual(sorted(table), [1, 2, 3])
+        self.assertEqual(dict(table), {1: 'a', 2: 'B', 3: 'c'})
+        self.assertEqual(table, {1: 'a', 2: 'B', 3: 'c'})
+        self.assertEqual(base, {1: 'a', 2: 'b'})
+
+        # A layer of a layered table sees the same entries
+        fork = EntryTable.layer(table)
+        fork[1] = 'A'
+        self.assertEqual(dict(fork.items()), {1: 'A', 2: 'B', 3: 'c'})
+        self.assertEqual(table[1], 'a')
+
+    def test_len(self):
+        table = EntryTable.layer({1: 'a', 2: 'b'})
+        self.assertEqual(len(table), 2)
+        # Only new keys are counted, including keys shadowing a layer
+        table[1] = 'A'
+        table[3] = 'c'
+        table[3] = 'C'
+        self.assertEqual(len(table), 3)
+        table.update({2: 'B', 4: 'd'}, e='e')
+        table.update([(5, 'f')])
+        self.assertEqual(len(table), 6)
+        self.assertEqual(len(table), len(list(table)))
+
+        fork = EntryTable.layer(table)
+        fork[6] = 'g'
+        self.assertEqual(len(fork), 7)
+        self.assertEqual(len(EntryTable([{1: 'a'}, {1: 'b', 2: 'c'}])), 2)
+
+    def test_merge(self):
+        table = {}
+        for i in range(1000):
+            table = EntryTable.layer(table)
+            table[i] = i
+            self.assertLessEqual(len(table.layers), 8)
+        self.assertEqual(len(table), 1000)
+        self.assertEqual(sorted(table.values()), list(range(1000)))
+        self.assertGreater(sys.getsizeof(table), sys.getsizeof({}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+from marketsim import Market, Product, Order, Side, State, Event, StateChange, LevelUpdate
+import unittest
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, batches):
+        self.calls.append(batches)
+
+class TestEvents(unittest.TestCase):
+    def test_product(self):
+        product = Product('abc')
+        recorder = Recorder()
+        product.subscribe(recorder)
+
+        product.place(Order(Side.BUY, 'abc', 10, 100, time=0, id=1))
+        product.place(Order(Side.BUY, 'abc', 10, 99, time=0, id=2))
+        product.cancel(Order(id=2))
+        self.assertEqual(recorder.calls, [])
+
+        executions = product.execute(Order(Side.SELL, 'abc', 4, 100, time=0, id=3))
+        self.assertEqual(len(recorder.calls), 1)
+        [batch] = recorder.calls[0]
+        self.assertEqual(batch.symbol, 'abc')
+        self.assertEqual(batch.executions, executions)
+        self.assertEqual(batch.state_changes, [
+            StateChange(1, Side.BUY, None, State.NEW),
+            StateChange(2, Side.BUY, None, State.NEW),
+            StateChange(2, Side.BUY, State.NEW, State.CANCELLED),
+            StateChange(1, Side.BUY, State.NEW, State.PARTIALLY_FILLED),
+            StateChange(3, Side.SELL, None, State.NEW),
+            StateChange(3, Side.SELL, State.NEW, State.FULLY_FILLED),
+        ])
+        self.assertEqual(batch.level_updates, [
+            LevelUpdate(Side.BUY, 100, 6, 1),
+            LevelUpdate(Side.BUY, 99, 0, 0),
+            LevelUpdate(Side.SELL, 100, 0, 0),
+        ])
+
+        # Nothing happened since the last batch
+        product.execute()
+        self.assertEqual(len(recorder.calls), 1)
+
+    def test_ioc_partial_fill_order(self):
+        product = Product('abc')
+        recorder = Recorder()
+        product.subscribe(recorder)
+
+        product.place(Order(Side.SELL, 'abc', 4, 100, time=0, id=1))
+        product.execute(Order(Side.BUY, 'abc', 10, 100, time=0, id=2, tif='ioc'))
+
+        [batch] = recorder.calls[-1]
+        buys = [change for change in batch.state_changes if change.side == Side.BUY]
+        self.assertEqual(buys, [
+            StateChange(2, Side.BUY, None, State.NEW),
+            StateChange(2, Side.BUY, State.NEW, State.PARTIALLY_FILLED),
+            StateChange(2, Side.BUY, State.PARTIALLY_FILLED, State.CANCELLED),
+        ])
+
+    def test_market_filters(self):
+        market = Market()
+        everything = Recorder()
+        xyz_bids = Recorder()
+        executions = Recorder()
+        market.subscribe(everything)
+        market.subscribe(xyz_bids, symbols=['xyz'], sides=['buy'], events=[Event.STATE_CHANGES, Event.LEVEL_UPDATES])
+        market.subscribe(executions, events=[Event.EXECUTIONS])
+
+        market.place(Order(Side.BUY, 'abc', 10, 100, time=0, id=1))
+        market.place(Order(Side.SELL, 'abc', 10, 100, time=0, id=2))
+        market.place(Order(Side.BUY, 'xyz', 10, 100, time=0, id=3))
+        market.place(Order(Side.SELL, 'xyz', 10, 101, time=0, id=4))
+        market.execute()
+
+        # One call per execute(), with one batch per symbol
+        self.assertEqual(len(everything.calls), 1)
+        self.assertEqual([batch.symbol for batch in everything.calls[0]], ['abc', 'xyz'])
+
+        [[batch]] = xyz_bids.calls
+        self.assertEqual(batch.symbol, 'xyz')
+        self.assertEqual(batch.executions, [])
+        self.assertEqual(batch.state_changes, [StateChange(3, Side.BUY, None, State.NEW)])
+        self.assertEqual(batch.level_updates, [LevelUpdate(Side.BUY, 100, 10, 1)])
+
+        [[batch]] = executions.calls
+        self.assertEqual(batch.symbol, 'abc')
+        self.assertEqual(len(batch.executions), 1)
+        self.assertEqual(batch.state_changes, [])
+
+    def test_unsubscribe(self):
+        market = Market()
+        recorder = Recorder()
+        subscription = market.subscribe(recorder)
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1))
+        market.unsubscribe(subscription)
+        self.assertIsNone(market['abc']._events)
+        market.execute_order(Side.SELL, 'abc', 10, 100)
+        self.assertEqual(recorder.calls, [])
+
+    def test_fork(self):
+        market = Market()
+        recorder = Recorder()
+        market.subscribe(recorder)
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1))
+
+        fork = market.fork()
+        fork.execute(Order(Side.SELL, 'abc', 10, 100, id=2))
+        fork.execute()
+        self.assertEqual(recorder.calls, [])
+
+        market.execute()
+        [[batch]] = recorder.calls
+        self.assertEqual(batch.state_changes, [StateChange(1, Side.BUY, None, State.NEW)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+from marketsim import Market, Product, Order, Side, State, ExecutionSink, EntryTable
+import unittest
+
+class ListWriter:
+    def __init__(self):
+        self.rows = 0
+
+    def write(self, columns):
+        self.rows += len(columns['price'])
+
+    def close(self):
+        pass
+
+class TestFork(unittest.TestCase):
+    def format_executions(self, executions):
+        return [(execution.quantity, execution.price) for execution in executions]
+
+    def get_order_book(self, product, side):
+        return [(stat.count, stat.volume, stat.price) for stat in product[side].get_order_book()]
+
+    def make_market(self):
+        market = Market()
+        for price in [110, 120, 130]:
+            market.place(Order(Side.SELL, 'abc', 10, price, time=0, id='sell-{}'.format(price)))
+        for price in [90, 100]:
+            market.place(Order(Side.BUY, 'abc', 10, price, time=0, id='buy-{}'.format(price)))
+        market.place(Order(Side.SELL, 'xyz', 10, 50, id='sell-xyz'))
+        return market
+
+    def test_product_fork(self):
+        product = Product('abc')
+        product.place(Order(Side.SELL, 'abc', 10, 110, id='sell1'))
+        product.place(Order(Side.SELL, 'abc', 10, 120, id='sell2'))
+
+        fork = product.fork()
+        self.assertEqual(self.format_executions(fork.execute_order(Side.BUY, 'abc', 15, 120, id='buy1')), [(10, 120), (5, 120)])
+        self.assertEqual(fork.entries['sell1'].state, State.FULLY_FILLED)
+        self.assertEqual(fork.entries['sell2'].remaining, 5)
+        self.assertEqual(fork.last_price, 120)
+
+        self.assertEqual(product.entries['sell1'].state, State.NEW)
+        self.assertEqual(product.entries['sell2'].remaining, 10)
+        self.assertNotIn('buy1', product.entries)
+        self.assertIsNone(product.last_price)
+        self.assertEqual(self.get_order_book(product, Side.SELL), [(1, 10, 110), (1, 10, 120)])
+
+        # Mutating the parent does not affect the fork
+        product.cancel_order(id='sell2')
+        self.assertEqual(product.entries['sell2'].state, State.CANCELLED)
+        self.assertEqual(fork.entries['sell2'].state, State.PARTIALLY_FILLED)
+        self.assertEqual(self.get_order_book(fork, Side.SELL), [(1, 5, 120)])
+        self.assertEqual(self.get_order_book(product, Side.SELL), [(1, 10, 110)])
+
+    def test_fork_shares_indexes(self):
+        product = Product('abc')
+        product.place(Order(Side.SELL, 'abc', 10, 110, id='sell1', account='a'))
+        product.place(Order(Side.SELL, 'abc', 10, 120, id='sell2', account='b'))
+
+        fork = product.fork()
+        self.assertIs(fork._open, product._open)
+        self.assertIs(fork._accounts, product._accounts)
+
+        fork.execute_order(Side.BUY, 'abc', 10, 110, id='buy1')
+        self.assertIsNot(fork._open, product._open)
+        self.assertEqual([entry.order_id for entry in fork.open_orders()], ['sell2'])
+        self.assertEqual([entry.order_id for entry in product.open_orders()], ['sell1', 'sell2'])
+        self.assertEqual(fork.open_orders(account='a'), [])
+        self.assertEqual(len(product.open_orders(account='a')), 1)
+
+        product.cancel_all(account='b')
+        self.assertEqual([entry.order_id for entry in product.open_orders()], ['sell1'])
+        self.assertEqual([entry.order_id for entry in fork.open_orders(account='b')], ['sell2'])
+
+    def test_market_fork(self):
+        market = self.make_market()
+        fork = market.fork()
+
+        # Unchanged products are shared
+        self.assertIs(fork.products['abc'], market.products['abc'])
+
+        executions = fork.execute(Order(Side.BUY, 'abc', 15, 120, time=0, id='what-if'))
+        self.assertEqual(self.format_executions(executions), [(10, 120), (5, 120)])
+        self.assertEqual(fork.entries['sell-110'].state, State.FULLY_FILLED)
+        self.assertIs(fork.entries['sell-110'], fork['abc'].entries['sell-110'])
+        self.assertEqual(fork['abc'].last_price, 120)
+
+        self.assertEqual(market.entries['sell-110'].state, State.NEW)
+        self.assertNotIn('what-if', market.entries)
+        self.assertIsNone(market['abc'].last_price)
+        self.assertEqual(self.get_order_book(market['abc'], Side.SELL), [(1, 10, 110), (1, 10, 120), (1, 10, 130)])
+        self.assertEqual(self.get_order_book(fork['abc'], Side.SELL), [(1, 5, 120), (1, 10, 130)])
+
+        # Untouched products and levels are still shared
+        self.assertIs(fork.products['xyz'], market.products['xyz'])
+        self.assertIs(fork['abc'][Side.SELL].heap[130], market['abc'][Side.SELL].heap[130])
+        self.assertIs(fork['abc'][Side.BUY].heap[-90], market['abc'][Side.BUY].heap[-90])
+
+    def test_fork_cancel(self):
+        market = self.make_market()
+        fork = market.fork()
+
+        fork.cancel_order(id='buy-100')
+        self.assertEqual(fork.entries['buy-100'].state, State.CANCELLED)
+        self.assertEqual(market.entries['buy-100'].state, State.NEW)
+
+        market.cancel_order(id='buy-90')
+        self.assertEqual(market.entries['buy-90'].state, State.CANCELLED)
+        self.assertEqual(fork.entries['buy-90'].state, State.NEW)
+        self.assertEqual(self.get_order_book(market['abc'], Side.BUY), [(1, 10, 100)])
+        self.assertEqual(self.get_order_book(fork['abc'], Side.BUY), [(1, 10, 90)])
+
+    def test_fork_auction(self):
+        market = self.make_market()
+        market.place(Order(Side.BUY, 'abc', 25, None, time=0, id='buy-market'))
+        fork = market.fork()
+
+        self.assertEqual(self.format_executions(fork.execute()), [(10, 130), (10, 130), (5, 130)])
+        self.assertEqual(market.entries['buy-market'].remaining, 25)
+        self.assertEqual(self.format_executions(market.execute()), [(10, 130), (10, 130), (5, 130)])
+
+    def test_fork_of_fork(self):
+        market = self.make_market()
+        fork1 = market.fork()
+        fork1.place(Order(Side.BUY, 'abc', 10, 105, id='fork1'))
+        fork2 = fork1.fork()
+        fork2.execute(Order(Side.BUY, 'abc', 10, 110, id='fork2'))
+
+        self.assertEqual(fork2['abc'].bid_price, 105)
+        self.assertEqual(fork1['abc'].bid_price, 105)
+        self.assertEqual(market['abc'].bid_price, 100)
+        self.assertEqual(fork2.entries['sell-110'].state, State.FULLY_FILLED)
+        self.assertEqual(fork1.entries['sell-110'].state, State.NEW)
+        self.assertNotIn('fork2', fork1.entries)
+        self.assertNotIn('fork1', market.entries)
+
+    def test_fork_shares_entries(self):
+        market = self.make_market()
+        fork = market.fork()
+
+        # Neither market copies the entries placed so far
+        self.assertEqual(dict.__len__(fork.entries), 0)
+        self.assertEqual(dict.__len__(market.entries), 0)
+        self.assertEqual(len(fork.entries), 6)
+        self.assertEqual(sorted(fork.entries), sorted(market.entries))
+
+        fork.execute(Order(Side.BUY, 'abc', 10, 110, id='what-if'))
+        # Only the new and changed entries are written to the fork's table
+        self.assertEqual(sorted(dict.keys(fork.entries)), ['sell-110', 'what-if'])
+        self.assertEqual(len(fork.entries), 7)
+        self.assertEqual(fork.entries.get('sell-110').state, State.FULLY_FILLED)
+        self.assertIsNone(market.entries.get('what-if'))
+
+    def test_repeated_forks(self):
+        market = self.make_market()
+        for i in range(200):
+            fork = market.fork()
+            fork.execute(Order(Side.BUY, 'abc', 1, 130, id='what-if-{}'.format(i)))
+            market.place(Order(Side.BUY, 'abc', 1, 80, id='bid-{}'.format(i)))
+
+        # Layers are merged, so lookups stay cheap however many forks were taken
+        self.assertLessEqual(len(market.entries.layers), 5)
+        self.assertEqual(len(market.entries), 206)
+        self.assertEqual(market['abc'][Side.BUY].count, 202)
+        self.assertEqual(fork.entries['what-if-199'].state, State.FULLY_FILLED)
+        self.assertNotIn('what-if-198', fork.entries)
+
+    def test_market_product_fork(self):
+        market = self.make_market()
+        product = market['abc']
+        fork = product.fork()
+        self.assertIsInstance(fork._entries, EntryTable)
+        self.assertEqual(dict.__len__(fork._entries), 0)
+        self.assertIs(product._entries, market.entries)
+        self.assertIs(market['xyz']._entries, market.entries)
+
+        market.execute(Order(Side.BUY, 'abc', 10, 110, id='buy1'))
+        self.assertEqual(market.entries['sell-110'].state, State.FULLY_FILLED)
+        self.assertEqual(fork.entries['sell-110'].state, State.NEW)
+        self.assertNotIn('buy1', fork.entries)
+        self.assertEqual(self.get_order_book(fork, Side.SELL), [(1, 10, 110), (1, 10, 120), (1, 10, 130)])
+
+    def test_fork_sink(self):
+        writer = ListWriter()
+        sink = ExecutionSink(writer, flush_rows=1)
+        market = Market(sink=sink)
+        market.place(Order(Side.SELL, 'abc', 10, 110))
+        market.place(Order(Side.SELL, 'abc', 10, 120))
+        fork = market.fork()
+
+        fork.execute(Order(Side.BUY, 'abc', 10, 110))
+        self.assertEqual(writer.rows, 0)
+
+        market.execute(Order(Side.BUY, 'abc', 10, 120))
+        self.assertEqual(writer.rows, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,24 @@
 from marketsim import KeyedHeap
+import random
 import unittest
 
+class CountingKey:
+    comparisons = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        CountingKey.comparisons += 1
+        return self.value < other.value
+
+    def __eq__(self, other):
+        CountingKey.comparisons += 1
+        return self.value == other.value
+
+    def __hash__(self):
+        return hash(self.value)
+
 class TestKeyedHeap(unittest.TestCase):
     def test_heap(self):
         heap = KeyedHeap()
@@ -104,3 +122,79 @@ class TestKeyedHeap(unittest.TestCase):
         heap.push('key2', 'value2')
         self.assertEqual(heap.peek_value(), 'value2')
         self.assertEqual(heap.pop_value(), 'value2')
+
+    def test_remove(self):
+        heap = KeyedHeap()
+
+        for key in [5, 3, 8, 1, 9, 2]:
+            heap.push(key, str(key))
+
+        self.assertEqual(heap.remove(3), '3')
+        self.assertEqual(heap.remove(1), '1')
+        self.assertNotIn(3, heap)
+        self.assertEqual(len(heap), 4)
+        self.assertEqual(list(heap.keys()), [2, 5, 8, 9])
+
+        with self.assertRaises(KeyError):
+            heap.remove(3)
+
+    def test_remove_any_position(self):
+        rng = random.Random(1)
+        keys = rng.sample(range(1000), 200)
+        heap = KeyedHeap()
+        for key in keys:
+            heap.push(key, key)
+
+        removed = rng.sample(keys, 150)
+        for key in removed:
+            self.assertEqual(heap.remove(key), key)
+            heap.push(-key - 1, None)
+            heap.remove(-key - 1)
+
+        remaining = sorted(set(keys) - set(removed))
+        self.assertEqual(list(heap.keys()), remaining)
+        self.assertEqual([heap.pop_key() for _ in remaining], remaining)
+
+    def test_remove_cost(self):
+        # Removing a key must not search the heap for it
+        rng = random.Random(1)
+        keys = [CountingKey(value) for value in range(20000)]
+        rng.shuffle(keys)
+        heap = KeyedHeap()
+        for key in keys:
+            heap.push(key, None)
+
+        CountingKey.comparisons = 0
+        for key in rng.sample(keys, 100):
+            heap.remove(key)
+        self.assertLess(CountingKey.comparisons, 100 * 20)
+        self.assertEqual(len(heap), 19900)
+
+    def test_remove_top_and_compact(self):
+        heap = KeyedHeap()
+        for key in range(10):
+            heap.push(key, key)
+        heap.remove(5)
+        heap.remove(6)
+        self.assertEqual(heap.dead, {5, 6})
+
+        # Dead keys never stay on top, and are dropped once they outnumber live ones
+        for key in range(5):
+            heap.remove(key)
+        self.assertEqual(heap.peek(), (7, 7))
+        self.assertEqual(heap.dead, set())
+        self.assertEqual(sorted(heap.pq_list), [7, 8, 9])
+
+        for key in range(10, 20):
+            heap.push(key, key)
+        for key in range(11, 19):
+            heap.remove(key)
+        self.assertEqual(len(heap), 5)
+        self.assertLess(len(heap.pq_list), 20)
+        self.assertEqual(list(heap.keys()), [7, 8, 9, 10, 19])
+
+        # A removed key can be pushed again
+        heap.push(5, 'again')
+        heap.remove(7)
+        self.assertEqual([heap.pop() for _ in range(len(heap))], [(5, 'again'), (8, 8), (9, 9), (10, 10), (19, 19)])
+        self.assertEqual(heap.pq_list, [])
@@ -285,6 +285,17 @@ class TestMarket(unittest.TestCase):
         market.cancel(order)
         self.assertEqual(market.execute(), [])
 
+    def test_cancel_top_level(self):
+        market = Market()
+        order = Order(Side.BUY, 'abc', 10, 120)
+        market.place(order)
+        market.place(Order(Side.BUY, 'abc', 10, 100))
+        market.cancel(order)
+        self.assertEqual(market['abc'].bid_price, 100)
+
+        market.place(Order(Side.SELL, 'abc', 10, 110))
+        self.assertEqual(market.execute(), [])
+
     def test_market_shortcuts(self):
         market = Market()
 
@@ -415,5 +426,69 @@ class TestMarket(unittest.TestCase):
         self.assertIs(market['abc'].get_order_by_id('order1'), order1)
         self.assertIs(market['abc'].get_order_by_id('order2'), order2)
 
+    def test_entry_table(self):
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 90, id='order1'))
+        market.place(Order(Side.BUY, 'xyz', 10, 90, id='order2'))
+        self.assertIs(market['abc']._entries, market.entries)
+        self.assertIs(market['xyz']._entries, market.entries)
+        self.assertEqual(len(market.entries), 2)
+
+        # Each product's entries are a view of its own symbol
+        self.assertEqual(dict(market['abc'].entries), {'order1': market.entries['order1']})
+        self.assertNotIn('order2', market['abc'].entries)
+        self.assertEqual(len(market['xyz'].entries), 1)
+
+        # Ids are unique across the market, but each product only knows its own orders
+        with self.assertRaises(ValueError):
+            market['xyz'].place(Order(Side.BUY, 'xyz', 10, 90, id='order1'))
+        with self.assertRaises(ValueError):
+            market['xyz'].cancel(Order(id='order1'))
+        self.assertIs(market['xyz'].get_order_by_id('order1'), None)
+
+        # A standalone product's entries join the table when added to a market
+        product = Product('def')
+        product.place(Order(Side.BUY, 'def', 10, 90, id='order3'))
+        market['def'] = product
+        self.assertIs(market.entries['order3'], product.entries['order3'])
+
+        fork = market.fork()
+        market.execute(Order(Side.SELL, 'abc', 4, 90, id='order4'))
+        self.assertEqual(market.entries['order1'].remaining, 6)
+        self.assertEqual(fork.entries['order1'].remaining, 10)
+        self.assertEqual(fork['abc'].entries['order1'].remaining, 10)
+        self.assertNotIn('order4', fork.entries)
+        self.assertEqual(list(market['abc'].entries), ['order1', 'order4'])
+        self.assertEqual(list(fork['abc'].entries), ['order1'])
+
+    def test_peek_and_evict_idle(self):
+        market = Market()
+        self.assertIsNone(market.peek('abc'))
+        self.assertIsNone(market.get_product('abc'))
+        self.assertNotIn('abc', market)
+
+        # A lookup through market[symbol] still creates the product
+        self.assertIsNone(market['typo'].bid_price)
+        market.place(Order(Side.BUY, 'abc', 10, 90, id='order1'))
+        market.place(Order(Side.SELL, 'xyz', 10, 100, id='order2'))
+        market.place(Order(Side.SELL, 'def', 10, 100, id='order3'))
+        market.cancel(Order(id='order3'))
+        market.place(Order(Side.BUY, 'stp', 10, None, id='order4', stop_price=120))
+        market.place(Order(Side.SELL, 'trd', 5, 100, id='order5'))
+        market.execute(Order(Side.BUY, 'trd', 5, 100, id='order6'))
+        self.assertIs(market.peek('abc'), market.products['abc'])
+        self.assertEqual(market.bbo()['typo'].bid_price, None)
+
+        self.assertEqual(sorted(market.evict_idle()), ['def', 'typo'])
+        self.assertEqual(sorted(market), ['abc', 'stp', 'trd', 'xyz'])
+        self.assertNotIn('typo', market.bbo())
+        self.assertEqual(market.evict_idle(include_traded=True), ['trd'])
+
+        # Entries of evicted products are kept
+        self.assertEqual(market.entries['order3'].state, State.CANCELLED)
+        with self.assertRaises(ValueError):
+            market.cancel(Order(id='order3'))
+        self.assertNotIn('def', market)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,70 @@
+from marketsim import Market, Order, Side
+import sys
+import unittest
+
+class TestMemoryUsage(unittest.TestCase):
+    def test_empty(self):
+        usage = Market().memory_usage()
+        self.assertEqual(usage['symbols'], {})
+        self.assertEqual(usage['total']['entry_count'], 0)
+        self.assertGreater(usage['total']['total'], 0)
+
+    def test_product(self):
+        market = Market()
+        for i in range(10):
+            market.place(Order(Side.BUY, 'abc', 10, 100 - i % 5, time=i % 2, id=i))
+        product = market['abc']
+
+        usage = product.memory_usage()
+        self.assertEqual(usage['entry_count'], 10)
+        self.assertEqual(usage['dead_entry_count'], 0)
+        self.assertEqual(usage['queued_dead_count'], 0)
+        self.assertEqual(usage['dead'], 0)
+        self.assertEqual(usage['level_count'], 5)
+        self.assertEqual(usage['time_queue_count'], 10)
+        self.assertEqual(usage['total'], usage['entries'] + usage['time_queues'] + usage['heaps'])
+
+        market.cancel(Order(id=0))
+        market.execute(Order(Side.SELL, 'abc', 15, 99, time=0, id=10))
+
+        # Order 0 was cancelled, order 5 was filled and order 10 was filled
+        usage = product.memory_usage()
+        self.assertEqual(usage['entry_count'], 11)
+        self.assertEqual(usage['dead_entry_count'], 3)
+        self.assertGreater(usage['dead'], 0)
+        self.assertLess(usage['dead'], usage['entries'])
+
+    def test_market(self):
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1))
+        market.place(Order(Side.BUY, 'xyz', 10, 100, id=2))
+        market.place(Order(Side.BUY, 'xyz', 10, 101, id=3))
+
+        usage = market.memory_usage()
+        self.assertEqual(sorted(usage['symbols']), ['abc', 'xyz'])
+        self.assertEqual(usage['symbols']['xyz']['level_count'], 2)
+        self.assertEqual(usage['total']['entry_count'], 3)
+        self.assertGreater(usage['total']['total'], usage['symbols']['abc']['total'] + usage['symbols']['xyz']['total'])
+
+    def test_evicted_entries(self):
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1))
+        market.place(Order(Side.BUY, 'xyz', 10, 100, id=2))
+        market.place(Order(Side.BUY, 'xyz', 10, 101, id=3))
+        market.cancel_all('xyz')
+        before = market.memory_usage()['total']
+        ids_size = sys.getsizeof(market['xyz']._ids)
+
+        self.assertEqual(market.evict_idle(), ['xyz'])
+        usage = market.memory_usage()
+        self.assertEqual(sorted(usage['symbols']), ['abc'])
+        # The evicted entries are still in the table, and still counted
+        self.assertEqual(len(market.entries), 3)
+        self.assertEqual(usage['total']['evicted_entry_count'], 2)
+        for name in ['entry_count', 'dead_entry_count', 'dead']:
+            self.assertEqual(usage['total'][name], before[name])
+        # Only the product's id set is freed
+        self.assertEqual(usage['total']['entries'], before['entries'] - ids_size)
+
+if __name__ == '__main__':
+    unittest.main()
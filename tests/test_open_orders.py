@@ -0,0 +1,58 @@
+from marketsim import Market, Product, Order, Side
+import unittest
+
+class TestOpenOrders(unittest.TestCase):
+    def ids(self, entries):
+        return [entry.order_id for entry in entries]
+
+    def test_product(self):
+        product = Product('abc')
+        product.place(Order(Side.BUY, 'abc', 10, 100, time=0, id=1, account='a'))
+        product.place(Order(Side.BUY, 'abc', 10, 99, time=0, id=2, account='b'))
+        product.place(Order(Side.SELL, 'abc', 10, 101, time=0, id=3, account='a'))
+
+        self.assertEqual(self.ids(product.open_orders()), [1, 2, 3])
+        self.assertEqual(self.ids(product.open_orders(Side.BUY)), [1, 2])
+        self.assertEqual(self.ids(product.open_orders(account='a')), [1, 3])
+        self.assertEqual(self.ids(product.open_orders('sell', 'a')), [3])
+        self.assertEqual(product.open_orders(account='c'), [])
+
+        # Partially filled entries stay open, fully filled ones are removed
+        product.execute(Order(Side.SELL, 'abc', 15, None, time=0, id=4, account='b'))
+        self.assertEqual(self.ids(product.open_orders(Side.BUY)), [2])
+        self.assertEqual(self.ids(product.open_orders(account='b')), [2])
+        self.assertEqual(product.open_orders(account='b')[0].remaining, 5)
+
+        product.cancel(Order(id=3))
+        self.assertEqual(self.ids(product.open_orders(account='a')), [])
+        self.assertEqual(product._accounts, {'b': {2: None}})
+
+    def test_market(self):
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1, account='a'))
+        market.place(Order(Side.BUY, 'xyz', 10, 100, id=2, account='a'))
+        market.place(Order(Side.SELL, 'xyz', 10, 101, id=3, account='b'))
+        market.place(Order(Side.SELL, 'xyz', 10, 102, id=4))
+
+        self.assertEqual(self.ids(market.open_orders(account='a')), [1, 2])
+        self.assertEqual(self.ids(market.open_orders(account='a', symbol='xyz')), [2])
+        self.assertEqual(self.ids(market.open_orders(account='a', side='sell')), [])
+        self.assertEqual(self.ids(market.open_orders(symbol='xyz', side='sell')), [3, 4])
+        self.assertEqual(self.ids(market.open_orders(symbol='none')), [])
+        self.assertEqual(sorted(self.ids(market.open_orders())), [1, 2, 3, 4])
+
+        market.cancel(Order(id=1))
+        self.assertEqual(self.ids(market.open_orders(account='a')), [2])
+
+    def test_fork(self):
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1, account='a'))
+
+        fork = market.fork()
+        fork.execute(Order(Side.SELL, 'abc', 10, 100, id=2, account='a'))
+        self.assertEqual(self.ids(fork.open_orders(account='a')), [])
+        self.assertEqual(self.ids(market.open_orders(account='a')), [1])
+        self.assertEqual(self.ids(market.open_orders(symbol='abc')), [1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,40 @@ class TestOrder(unittest.TestCase):
         with self.assertRaises(ValueError):
             Side.normalize(1.0)
 
+    def test_default_id(self):
+        ids = [Order(Side.BUY, 'abc', 10).id for _ in range(1000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+
+        # Orders are discarded right away, but their ids are not reused
+        market = Market()
+        for _ in range(1000):
+            market.place(Order(Side.BUY, 'abc', 10, 100))
+        self.assertEqual(len(market.entries), 1000)
+
+    def test_default_id_namespace(self):
+        # Allocated ids are plain ints that skip the ids supplied by the caller
+        order = Order(Side.BUY, 'abc', 10, 100)
+        self.assertIs(type(order.id), int)
+        supplied = Order(Side.BUY, 'abc', 10, 100, id=order.id + 100)
+        self.assertGreater(Order(Side.BUY, 'abc', 10, 100).id, supplied.id)
+
+        # An allocated id taken by a supplied one is redrawn on placement
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=order.id))
+        allocated_id = order.id
+        market.place(order)
+        self.assertNotEqual(order.id, allocated_id)
+        self.assertIs(market.entries[order.id].order, order)
+        self.assertIsNot(market.entries[allocated_id].order, order)
+        market.place_batch([Order(Side.BUY, 'abc', 10, 100, id=order.id + 1000)])
+        self.assertEqual(len(market.entries), 3)
+        self.assertEqual(market['abc'][Side.BUY].count, 3)
+
+        # Supplied ids are still checked
+        with self.assertRaises(ValueError):
+            market.place(Order(Side.BUY, 'abc', 10, 100, id=allocated_id))
+
     def test_objects(self):
         bid_order = Order(Side.BUY, 'abc', 10)
         ask_order = Order(Side.SELL, 'abc', 10)
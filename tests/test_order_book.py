@@ -106,3 +106,58 @@ class TestOrderBook(unittest.TestCase):
             | 20 (2) | 100   |        |
             """
         ))
+
+    def test_drained_levels_removed(self):
+        market = Market()
+
+        for price in [100, 101, 102, 103, 104]:
+            market.place(Order(Side.SELL, 'abc', 10, price, time=0, id='sell-{}-1'.format(price)))
+            market.place(Order(Side.SELL, 'abc', 10, price, time=1, id='sell-{}-2'.format(price)))
+
+        queue = market['abc'].order_queues[Side.SELL]
+
+        # Drained below the top of the heap
+        market.cancel(Order(id='sell-102-1'))
+        self.assertEqual(len(queue.heap[102].heap), 1)
+        market.cancel(Order(id='sell-102-2'))
+        market.cancel_all('abc', price=103)
+        self.assertEqual(len(queue.heap), 3)
+        self.assertNotIn(102, queue.heap)
+        self.assertNotIn(103, queue.heap)
+
+        # Fully filled entries no longer count, partially filled ones do
+        market.execute(Order(Side.BUY, 'abc', 15, 100, time=2))
+        self.assertEqual(queue.get_order_book(), [OrderStat(100, 5, 1), OrderStat(101, 20, 2), OrderStat(104, 20, 2)])
+        self.assertEqual((queue.count, queue.volume), (5, 45))
+
+        market.cancel(Order(id='sell-100-2'))
+        self.assertEqual(list(queue.heap.keys()), [101, 104])
+        self.assertEqual((queue.count, queue.volume, queue.next_price), (4, 40, 101))
+
+    def test_next_price_after_cancel(self):
+        market = Market()
+        for price in [120, 110, 100]:
+            market.place(Order(Side.BUY, 'abc', 10, price, time=0, id='buy-{}'.format(price)))
+        market.place(Order(Side.BUY, 'abc', 10, 120, time=1, id='buy-120-2'))
+        market.place(Order(Side.SELL, 'abc', 10, 115, time=0, id='sell-115'))
+        market.cancel(Order(id='sell-115'))
+        market.place(Order(Side.SELL, 'abc', 10, 130, time=0, id='sell-130'))
+        queue = market['abc'].order_queues[Side.BUY]
+        asks = market['abc'].order_queues[Side.SELL]
+
+        # A partially cancelled top level stays the next price
+        market.cancel(Order(id='buy-120'))
+        self.assertEqual(queue.next_price, 120)
+
+        # Cancelling a deeper level leaves it alone
+        market.cancel(Order(id='buy-110'))
+        self.assertEqual(queue.next_price, 120)
+
+        # A drained top level no longer shows as the next price, so it no
+        # longer crosses an ask it cannot execute against
+        market.cancel(Order(id='buy-120-2'))
+        self.assertEqual(queue.next_price, 100)
+        self.assertFalse(queue.can_execute(asks))
+        market.place(Order(Side.SELL, 'abc', 10, 105, time=1, id='sell-105'))
+        self.assertEqual(market.execute(), [])
+        self.assertEqual(market['abc'].bid_price, 100)
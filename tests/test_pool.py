@@ -0,0 +1,89 @@
+from marketsim import Market, Product, Order, Side, State, QueuePool
+import random
+import unittest
+
+class TestQueuePool(unittest.TestCase):
+    def get_order_book(self, product, side):
+        return [(stat.count, stat.volume, stat.price) for stat in product[side].get_order_book()]
+
+    def format_executions(self, executions):
+        return [(execution.bid_fill.order_id, execution.ask_fill.order_id, execution.quantity, execution.price) for execution in executions]
+
+    def test_flicker(self):
+        product = Product('abc', pool=True)
+        self.assertIsInstance(product.pool, QueuePool)
+
+        for i in range(100):
+            product.place(Order(Side.BUY, 'abc', 10, 100 - i % 5, time=i, id=i))
+            product.cancel(Order(id=i))
+
+        self.assertEqual(len(product.pool), 2)
+        self.assertEqual(product.pool.released, 200)
+        self.assertEqual(product.pool.reused, 198)
+        self.assertEqual(self.get_order_book(product, Side.BUY), [])
+
+        product.place(Order(Side.BUY, 'abc', 10, 90, time=0, id='bid'))
+        self.assertEqual(self.get_order_book(product, Side.BUY), [(1, 10, 90)])
+        self.assertEqual(product.bid_price, 90)
+
+    def test_capacity(self):
+        pool = QueuePool(capacity=1)
+        pool.release_level('a')
+        pool.release_level('b')
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(pool.acquire_level(), 'a')
+        self.assertIsNone(pool.acquire_level())
+
+    def test_random(self):
+        # A pooled product behaves exactly as an unpooled one
+        rng = random.Random(0)
+        products = [Product('abc'), Product('abc', pool=True)]
+        live = []
+        for i in range(3000):
+            action = rng.random()
+            results = []
+            if action < 0.6 or not live:
+                side = rng.choice([Side.BUY, Side.SELL])
+                price = rng.randint(95, 105) if rng.random() < 0.95 else None
+                order = dict(side=side, symbol='abc', quantity=rng.randint(1, 20), price=price, time=rng.randint(0, 20), id=i)
+                for product in products:
+                    results.append(self.format_executions(product.execute(Order(**order))))
+                live.append(i)
+            elif action < 0.9:
+                order_id = live.pop(rng.randrange(len(live)))
+                if products[0].entries[order_id].state in (State.NEW, State.PARTIALLY_FILLED):
+                    for product in products:
+                        product.cancel(Order(id=order_id))
+            else:
+                price = rng.randint(95, 105)
+                for product in products:
+                    results.append(product.cancel_all(side=Side.SELL, price=price))
+            if results:
+                self.assertEqual(results[0], results[1])
+            for side in [Side.BUY, Side.SELL]:
+                self.assertEqual(self.get_order_book(products[0], side), self.get_order_book(products[1], side))
+        self.assertGreater(products[1].pool.reused, 0)
+
+    def test_fork(self):
+        market = Market(pool=True)
+        for i in range(10):
+            market.place(Order(Side.SELL, 'abc', 10, 100 + i, time=0, id=i))
+
+        fork = market.fork()
+        fork.execute(Order(Side.BUY, 'abc', 100, 109, time=1, id='buy'))
+        self.assertEqual(self.get_order_book(fork['abc'], Side.SELL), [])
+
+        # The fork only releases its own copies of the levels shared with the parent
+        self.assertIsNot(fork['abc'].pool, market['abc'].pool)
+        self.assertGreater(len(fork['abc'].pool), 0)
+        self.assertEqual(len(self.get_order_book(market['abc'], Side.SELL)), 10)
+        self.assertEqual(market.entries[0].remaining, 10)
+
+        for i in range(10):
+            fork.place(Order(Side.SELL, 'abc', 10, 200 + i, time=0, id='fork-{}'.format(i)))
+        market.execute(Order(Side.BUY, 'abc', 5, 100, time=1, id='buy'))
+        self.assertEqual(self.get_order_book(market['abc'], Side.SELL)[0], (1, 5, 100))
+        self.assertEqual(len(self.get_order_book(fork['abc'], Side.SELL)), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from marketsim import Market, Order, OrderStat, Side, State
+import threading
+import unittest
+
+class TestReadView(unittest.TestCase):
+    def make_market(self):
+        market = Market()
+        for price in [110, 120, 130]:
+            market.place(Order(Side.SELL, 'abc', 10, price, time=0, id='sell-{}'.format(price), account='maker'))
+        for price in [90, 100]:
+            market.place(Order(Side.BUY, 'abc', 10, price, time=0, id='buy-{}'.format(price), account='maker'))
+        market.place(Order(Side.SELL, 'xyz', 10, 50, id='sell-xyz'))
+        return market
+
+    def test_snapshot(self):
+        market = self.make_market()
+        view = market.read_view()
+        self.assertEqual(view.version, 1)
+        books = view.order_books()
+
+        market.execute(Order(Side.BUY, 'abc', 15, 120, time=1, id='buy-taker', account='taker'))
+        market.cancel(Order(id='buy-90'))
+        market.place(Order(Side.BUY, 'new', 5, 10, id='buy-new'))
+
+        # The view is unchanged
+        self.assertEqual(view.order_books(), books)
+        self.assertEqual(view.order_books(['abc'])['abc'][Side.SELL], [OrderStat(110, 10, 1), OrderStat(120, 10, 1), OrderStat(130, 10, 1)])
+        self.assertEqual(view.entries['sell-110'].state, State.NEW)
+        self.assertEqual(view.entries['buy-90'].state, State.NEW)
+        self.assertIsNone(view.get_order_by_id('buy-taker'))
+        self.assertNotIn('new', view)
+        self.assertIsNone(view['abc'].last_price)
+        self.assertEqual(len(view.open_orders(account='maker')), 5)
+        self.assertEqual(view.open_orders(account='taker'), [])
+
+        # The market went on
+        self.assertEqual(market.entries['sell-110'].state, State.FULLY_FILLED)
+        self.assertEqual(market.entries['buy-90'].state, State.CANCELLED)
+        self.assertEqual(market['abc'][Side.SELL].get_order_book(), [OrderStat(120, 5, 1), OrderStat(130, 10, 1)])
+        self.assertEqual(len(market.open_orders(account='maker')), 3)
+
+        # Only the changed product and levels were copied
+        self.assertIs(market.products['xyz'], view['xyz'])
+        self.assertIsNot(market.products['abc'], view['abc'])
+        self.assertIs(market['abc'][Side.SELL].heap[130], view['abc'][Side.SELL].heap[130])
+        self.assertIsNot(market['abc'][Side.SELL].heap[120], view['abc'][Side.SELL].heap[120])
+
+    def test_no_table_copies(self):
+        market = self.make_market()
+        entries = market.entries
+        accounts = market._accounts
+        view = market.read_view()
+
+        # The view keeps the tables; the market writes to a new layer
+        self.assertIs(view.entries, entries)
+        self.assertIs(market._accounts, accounts)
+        self.assertEqual(dict.__len__(market.entries), 0)
+        self.assertEqual(len(market.entries), 6)
+
+        market.execute(Order(Side.BUY, 'abc', 5, 110, id='buy-taker', account='maker'))
+        self.assertEqual(sorted(dict.keys(market.entries)), ['buy-taker', 'sell-110'])
+        self.assertEqual(view.entries['sell-110'].remaining, 10)
+        self.assertEqual(len(view.open_orders(account='maker', side=Side.SELL)), 3)
+        self.assertEqual(len(view.open_orders(account='maker', symbol='xyz')), 0)
+        self.assertEqual(len(market.open_orders(account='maker')), 5)
+
+    def test_repeated_views(self):
+        market = self.make_market()
+        executions = []
+        market.subscribe(lambda batches: executions.extend(execution for batch in batches for execution in batch.executions))
+
+        views = []
+        for i in range(20):
+            views.append(market.read_view())
+            market.execute(Order(Side.BUY, 'abc', 1, 130, time=i + 1))
+
+        self.assertEqual([view.version for view in views], list(range(1, 21)))
+        self.assertEqual([view['abc'][Side.SELL].volume for view in views], list(range(30, 10, -1)))
+        self.assertEqual(len(executions), 20)
+        self.assertLessEqual(len(market._lineage), 2)
+        self.assertLessEqual(len(market.entries.layers), 3)
+
+    def test_concurrent_reader(self):
+        market = self.make_market()
+        errors = []
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                view = views[-1]
+                books = view.order_books()
+                # Each snapshot is internally consistent
+                for symbol, sides in books.items():
+                    for side, book in sides.items():
+                        if sum(stat.volume for stat in book) != view[symbol][side].volume:
+                            errors.append((view.version, symbol, side))
+
+        views = [market.read_view()]
+        thread = threading.Thread(target=read)
+        thread.start()
+        try:
+            for i in range(2000):
+                market.place(Order(Side.SELL, 'abc', 1, 110 + i % 7, time=i + 1))
+                market.execute(Order(Side.BUY, 'abc', 1, 115, time=i + 1))
+                if i % 100 == 0:
+                    views.append(market.read_view())
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+if __name__ == '__main__':
+    unittest.main()
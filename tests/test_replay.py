@@ -0,0 +1,178 @@
+from marketsim import Market, Order, Side, State, Replay, read_csv_events, read_binary_events, write_binary_events
+from marketsim.replay import PLACE, CANCEL
+import os
+import tempfile
+import unittest
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tempdir.name, name)
+
+    def format_executions(self, executions):
+        return [(execution.quantity, execution.price) for execution in executions]
+
+    def write_csv(self, name, rows):
+        path = self.path(name)
+        with open(path, 'w') as f:
+            f.write('action,side,symbol,quantity,price,time,id\n')
+            for row in rows:
+                f.write(row + '\n')
+        return path
+
+    def test_csv_events(self):
+        path = self.write_csv('events.csv', [
+            'place,buy,abc,10,100,0,1',
+            'place,SELL,abc,5,,0,2',
+            'cancel,,abc,,,,1',
+        ])
+        chunks = list(read_csv_events(path, chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+
+        action, order = chunks[0][0]
+        self.assertEqual(action, PLACE)
+        self.assertEqual((order.side, order.symbol, order.quantity, order.price, order.time, order.id), (Side.BUY, 'abc', 10, 100, 0, 1))
+
+        action, order = chunks[0][1]
+        self.assertEqual(action, PLACE)
+        self.assertEqual((order.side, order.price), (Side.SELL, None))
+
+        action, order = chunks[1][0]
+        self.assertEqual(action, CANCEL)
+        self.assertEqual(order.id, 1)
+
+    def test_binary_events(self):
+        path = self.path('events.bin')
+        write_binary_events(path, [
+            (PLACE, Order(Side.BUY, 'abc', 10, 100.5, 1.0, 1)),
+            (PLACE, Order(Side.SELL, 'abc', 5, None, None, 2)),
+            (CANCEL, Order(symbol='abc', id=1)),
+        ])
+        events = [event for chunk in read_binary_events(path, chunk_size=2) for event in chunk]
+
+        self.assertEqual([action for action, _ in events], [PLACE, PLACE, CANCEL])
+        _, order = events[0]
+        self.assertEqual((order.side, order.symbol, order.quantity, order.price, order.time, order.id), (Side.BUY, 'abc', 10, 100.5, 1.0, 1))
+        _, order = events[1]
+        self.assertEqual((order.price, order.time, order.id), (None, None, 2))
+        _, order = events[2]
+        self.assertEqual((order.symbol, order.id), ('abc', 1))
+
+    def test_replay_auction(self):
+        path = self.write_csv('events.csv', [
+            'place,sell,abc,40,130,0,s1',
+            'place,sell,abc,80,130,0,s2',
+            'place,sell,abc,10,120,0,s3',
+            'place,sell,abc,20,120,0,s4',
+            'place,buy,abc,10,90,0,b1',
+            'cancel,,abc,,,,b1',
+            'place,buy,abc,45,,0,b2',
+        ])
+        for chunk_size in [1, 3, 100]:
+            market = Market()
+            replay = Replay(market, read_csv_events(path, chunk_size=chunk_size), continuous=False)
+            executions = [execution for chunk in replay.stream() for execution in chunk]
+
+            self.assertEqual(self.format_executions(executions), [(10, 130), (20, 130), (5, 130), (10, 130)])
+            self.assertEqual(market.entries['b1'].state, State.CANCELLED)
+            self.assertEqual(replay.stats.events, 7)
+            self.assertEqual(replay.stats.executions, 4)
+
+    def test_chunk_size_independent(self):
+        rows = []
+        for i in range(300):
+            side = 'buy' if i % 2 else 'sell'
+            price = 100 + (i * 7) % 11 - 5
+            rows.append('place,{},abc,{},{},,o{}'.format(side, 1 + i % 4, price, i))
+            if i % 5 == 4:
+                rows.append('cancel,,abc,,,,o{}'.format(i - 3))
+        path = self.write_csv('events.csv', rows)
+
+        for continuous, batch_size in [(True, 10000), (False, 7), (False, 10000)]:
+            results = []
+            for chunk_size in [1, 100, 10000]:
+                replay = Replay(Market(), read_csv_events(path, chunk_size=chunk_size), continuous=continuous, batch_size=batch_size)
+                executions = [execution for chunk in replay.stream() for execution in chunk]
+                results.append(self.format_executions(executions))
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(results[0], results[2])
+            if continuous:
+                self.assertTrue(results[0])
+
+    def test_batch_size(self):
+        path = self.write_csv('events.csv', [
+            'place,buy,abc,10,130,,b1',
+            'place,sell,abc,10,110,,s1',
+            'place,sell,abc,10,120,,s2',
+        ])
+        replay = Replay(Market(), read_csv_events(path, chunk_size=1), continuous=False, batch_size=2)
+        self.assertEqual([len(executions) for executions in replay.stream()], [0, 1, 0, 0])
+        self.assertEqual(replay.stats.executions, 1)
+        self.assertEqual(replay.market['abc'].ask_price, 120)
+
+        with self.assertRaises(ValueError):
+            Replay(Market(), [], batch_size=0)
+
+    def test_replay_continuous(self):
+        path = self.write_csv('events.csv', [
+            'place,buy,abc,10,130,,b1',
+            'place,sell,abc,10,110,,s1',
+        ])
+        market = Market()
+        stats = Replay(market, read_csv_events(path, chunk_size=1)).run()
+
+        self.assertEqual(stats.events, 2)
+        self.assertEqual(stats.chunks, 2)
+        self.assertEqual(stats.executions, 1)
+        self.assertEqual(market['abc'].last_price, 120)
+
+    def test_replay_cancel_filled(self):
+        path = self.write_csv('events.csv', [
+            'place,buy,abc,10,100,,b1',
+            'place,sell,abc,10,100,,s1',
+            'cancel,,abc,,,,b1',
+            'cancel,,abc,,,,s1',
+        ])
+        market = Market()
+        stats = Replay(market, read_csv_events(path)).run()
+
+        self.assertEqual(stats.events, 4)
+        self.assertEqual(stats.rejected_cancels, 2)
+        self.assertEqual(market.entries['b1'].state, State.FULLY_FILLED)
+
+    def test_replay_error(self):
+        path = self.write_csv('events.csv', [
+            'place,buy,abc,10,100,0,1',
+            'invalid,buy,abc,10,100,0,2',
+        ])
+        with self.assertRaises(ValueError):
+            Replay(Market(), read_csv_events(path)).run()
+
+    def test_replay_early_exit(self):
+        events = ([(PLACE, Order(Side.BUY, 'abc', 1, 100, 0))] for _ in range(100))
+        replay = Replay(Market(), events, queue_size=1)
+        for _ in replay.stream():
+            break
+        self.assertEqual(replay.stats.chunks, 1)
+
+    def test_place_batch(self):
+        market = Market()
+        market.place_batch([
+            Order(Side.BUY, 'abc', 10, 100, id='1'),
+            Order(Side.BUY, 'abc', 10, 110, id='2'),
+            Order(Side.SELL, 'def', 10, 120, id='3'),
+        ])
+        self.assertEqual(market['abc'].bid_price, 110)
+        self.assertEqual(market['def'].ask_price, 120)
+        self.assertIs(market.entries['3'], market['def'].entries['3'])
+
+        with self.assertRaises(ValueError):
+            market.place_batch([Order(Side.BUY, 'abc', 10, 100, id='1')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from marketsim import Market, Order, OrderStat, Side, BookSnapshot, SharedOrderBookWriter, SharedOrderBookReader
+from marketsim import shared_book
+import unittest
+
+@unittest.skipIf(shared_book.shared_memory is None, 'multiprocessing.shared_memory is not available')
+class TestSharedOrderBook(unittest.TestCase):
+    def test_publish(self):
+        market = Market()
+        for price in [110, 120, 130]:
+            market.place(Order(Side.SELL, 'abc', 10, price))
+        for price in [90, 100]:
+            market.place(Order(Side.BUY, 'abc', 10, price))
+        market.place(Order(Side.BUY, 'abc', 5, None))
+
+        with SharedOrderBookWriter(market, ['abc', 'xyz'], depth=2) as writer:
+            with SharedOrderBookReader(writer.name) as reader:
+                self.assertEqual(reader.symbols, ['abc', 'xyz'])
+                self.assertEqual(reader.depth, 2)
+                self.assertEqual(reader.read('abc'), BookSnapshot('abc', None, [], []))
+
+                writer.publish()
+                self.assertEqual(reader.version, 2)
+                self.assertEqual(reader.read('abc'), BookSnapshot('abc', None,
+                    [OrderStat(None, 5, 1), OrderStat(100, 10, 1)],
+                    [OrderStat(110, 10, 1), OrderStat(120, 10, 1)],
+                ))
+
+                market.execute(Order(Side.BUY, 'abc', 10, 110))
+                writer.publish(['abc'])
+                self.assertEqual(reader.version, 4)
+
+                snapshots = reader.read_all()
+                self.assertEqual(snapshots['abc'].last_price, 110)
+                self.assertEqual(snapshots['abc'].asks, [OrderStat(120, 10, 1), OrderStat(130, 10, 1)])
+                self.assertEqual(snapshots['xyz'], BookSnapshot('xyz', None, [], []))
+
+    def test_invalid_symbols(self):
+        market = Market()
+        created = set(shared_book._created)
+        with self.assertRaises(ValueError):
+            SharedOrderBookWriter(market, ['abc', 'x' * 33])
+        self.assertEqual(shared_book._created, created)
+
+        with SharedOrderBookWriter(market, ['abc']) as writer:
+            with self.assertRaises(KeyError):
+                writer.publish(['unknown'])
+            # The version stays even, so readers do not spin
+            self.assertEqual(writer.version, 0)
+            writer.publish()
+            self.assertEqual(writer.version, 2)
+
+    def test_order_book_depth(self):
+        market = Market()
+        for price in [110, 120, 130]:
+            market.place(Order(Side.SELL, 'abc', 10, price))
+        self.assertEqual(market['abc'][Side.SELL].get_order_book(2), [OrderStat(110, 10, 1), OrderStat(120, 10, 1)])
+        self.assertEqual(len(market['abc'][Side.SELL].get_order_book()), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+from marketsim.simulation import Simulation, Agent, NoiseTrader, MarketMaker, MomentumTrader
+from marketsim import Side
+import unittest
+
+def agents():
+    return [
+        MarketMaker('maker', quantity=5),
+        NoiseTrader('noise-1', probability=0.8),
+        NoiseTrader('noise-2', probability=0.8),
+        MomentumTrader('momentum', lookback=5),
+    ]
+
+class Buyer(Agent):
+    def act(self, simulation):
+        simulation.place(self, Side.BUY, 1, simulation.offset_price(0))
+
+class Seller(Agent):
+    def act(self, simulation):
+        simulation.place(self, Side.SELL, 1, simulation.offset_price(0))
+
+def crossing_agents():
+    return [Buyer('buyer'), Seller('seller')]
+
+class TestSimulation(unittest.TestCase):
+    def test_run_one(self):
+        simulation = Simulation(crossing_agents, steps=10, initial_price=100.0, tick=0.5)
+        result = simulation.run_one(0)
+        self.assertEqual(len(result.prices), 10)
+        self.assertEqual(result.prices, [100.0] * 10)
+        self.assertEqual(result.executions, 10)
+        self.assertEqual(result.volume, 10)
+        self.assertEqual(result.positions, {'buyer': 10, 'seller': -10})
+        self.assertEqual(result.pnl, {'buyer': 0.0, 'seller': 0.0})
+
+    def test_deterministic(self):
+        simulation = Simulation(agents, steps=50)
+        first = simulation.run_one(1)
+        second = simulation.run_one(1)
+        self.assertEqual(first, second)
+        self.assertGreater(first.executions, 0)
+        self.assertEqual(sum(first.positions.values()), 0)
+        self.assertNotEqual(first.prices, simulation.run_one(2).prices)
+
+    def test_workers(self):
+        simulation = Simulation(agents, steps=50)
+        serial = simulation.run(range(4), workers=1)
+        parallel = simulation.run(range(4), workers=2)
+        self.assertEqual(serial.results, parallel.results)
+        self.assertEqual([result.seed for result in parallel.results], [0, 1, 2, 3])
+        self.assertEqual(serial.summary(), parallel.summary())
+
+    def test_summary(self):
+        report = Simulation(agents, steps=20).run([5, 6, 7], workers=1)
+        summary = report.summary()
+        self.assertEqual(summary['runs'], 3)
+        self.assertEqual(sorted(summary['pnl']), ['maker', 'momentum', 'noise-1', 'noise-2'])
+        self.assertLessEqual(summary['final_price']['p5'], summary['final_price']['p95'])
+        self.assertEqual(len(report.mean_price_path()), 20)
+
+        empty = Simulation(agents, steps=20).run([], workers=1).summary()
+        self.assertEqual(empty['runs'], 0)
+        self.assertIsNone(empty['final_price']['mean'])
+        self.assertEqual(empty['pnl'], {})
+
+    def test_unique_names(self):
+        simulation = Simulation(lambda: [Buyer('a'), Seller('a')], steps=1)
+        with self.assertRaises(ValueError):
+            simulation.run_one(0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from marketsim import Market, Product, Side, ExecutionSink, NpyWriter
+from marketsim import sink as sink_module
+import os
+import tempfile
+import unittest
+
+class ListWriter:
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write(self, columns):
+        self.batches.append({name: list(values) for name, values in columns.items()})
+
+    def close(self):
+        self.closed = True
+
+class TestExecutionSink(unittest.TestCase):
+    def test_market_sink(self):
+        writer = ListWriter()
+        sink = ExecutionSink(writer, flush_rows=2)
+        market = Market(sink=sink)
+
+        market.execute_order(Side.BUY, 'abc', 10, 120, id='b1')
+        market.execute_order(Side.BUY, 'abc', 10, 110, id='b2')
+        market.execute_order(Side.SELL, 'abc', 15, None, id='s1')
+        self.assertEqual(len(writer.batches), 1)
+        self.assertEqual(writer.batches[0], {
+            'symbol': ['abc', 'abc'],
+            'price': [110.0, 110.0],
+            'quantity': [10, 5],
+            'bid_order_id': ['b1', 'b2'],
+            'ask_order_id': ['s1', 's1'],
+            'bid_cumulative_quantity': [10, 5],
+            'ask_cumulative_quantity': [10, 15],
+        })
+
+        market.execute_order(Side.SELL, 'xyz', 1, 100)
+        market.execute_order(Side.BUY, 'xyz', 1, 100)
+        self.assertEqual(len(writer.batches), 1)
+        self.assertEqual(len(sink), 1)
+
+        sink.close()
+        self.assertEqual(len(writer.batches), 2)
+        self.assertEqual(writer.batches[1]['symbol'], ['xyz'])
+        self.assertEqual(sink.rows, 3)
+        self.assertTrue(writer.closed)
+
+    def test_product_sink(self):
+        writer = ListWriter()
+        product = Product('abc')
+        with ExecutionSink(writer) as sink:
+            product.sink = sink
+            product.execute_order(Side.BUY, 'abc', 10, 120)
+            product.execute_order(Side.SELL, 'abc', 10, 120)
+            self.assertEqual(writer.batches, [])
+        self.assertEqual(writer.batches[0]['quantity'], [10])
+
+    @unittest.skipIf(sink_module.numpy is None, 'numpy is not installed')
+    def test_npy_writer(self):
+        numpy = sink_module.numpy
+        with tempfile.TemporaryDirectory() as directory:
+            with ExecutionSink(NpyWriter(directory)) as sink:
+                market = Market(sink=sink)
+                market.execute_order(Side.BUY, 'abc', 10, 120, id=1)
+                market.execute_order(Side.SELL, 'abc', 10, 120, id=2)
+            self.assertEqual(numpy.load(os.path.join(directory, 'price-000000.npy')).tolist(), [120.0])
+            self.assertEqual(numpy.load(os.path.join(directory, 'bid_order_id-000000.npy')).tolist(), [1])
+            self.assertEqual(numpy.load(os.path.join(directory, 'symbol-000000.npy')).tolist(), ['abc'])
+
+    @unittest.skipIf(sink_module.numpy is None, 'numpy is not installed')
+    def test_numpy_column_types(self):
+        to_numpy_column = sink_module.to_numpy_column
+        self.assertEqual(to_numpy_column('symbol', ['007', '7203']).tolist(), ['007', '7203'])
+        self.assertEqual(to_numpy_column('bid_order_id', [1, 2]).dtype, sink_module.numpy.int64)
+        self.assertEqual(to_numpy_column('bid_order_id', [True, 2]).tolist(), ['True', '2'])
+        self.assertEqual(to_numpy_column('bid_order_id', [1.7, 2]).tolist(), ['1.7', '2'])
+        self.assertEqual(to_numpy_column('bid_order_id', ['1', 2]).tolist(), ['1', '2'])
+        self.assertEqual(to_numpy_column('bid_order_id', [2 ** 70]).tolist(), [str(2 ** 70)])
+
+if __name__ == '__main__':
+    unittest.main()
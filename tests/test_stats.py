@@ -0,0 +1,85 @@
+from marketsim import Market, Product, Order, Side
+from marketsim.stats import Histogram
+import unittest
+
+class TestStats(unittest.TestCase):
+    def test_disabled(self):
+        market = Market()
+        market.execute_order(Side.BUY, 'abc', 10, 100)
+        self.assertIsNone(market['abc'].stats())
+        self.assertEqual(market.stats()['symbols'], {})
+        self.assertIsNone(market['abc'][Side.BUY].heap.stats)
+
+    def test_counters(self):
+        market = Market(stats=True)
+        for quantity in [11, 13, 17, 19, 23]:
+            market.place(Order(Side.BUY, 'abc', quantity, 100, time=0))
+        market.place(Order(Side.SELL, 'abc', 5, 120, time=0))
+        market.place(Order(Side.SELL, 'xyz', 5, 120, time=0))
+        order = Order(Side.BUY, 'xyz', 5, 110, time=0)
+        market.place(order)
+        market.cancel(order)
+
+        # Pro-rata allocation of 41 rounds to 39 and needs two adjustments
+        executions = market.execute(Order(Side.SELL, 'abc', 41, None, time=0))
+        self.assertEqual(len(executions), 5)
+
+        stats = market.stats()
+        abc = stats['symbols']['abc']
+        self.assertEqual(abc['auctions'], 1)
+        self.assertEqual(abc['executions'], 5)
+        self.assertEqual(abc['executions_per_auction']['count'], 1)
+        self.assertEqual(abc['executions_per_auction']['max'], 5)
+        self.assertGreater(abc['heap_pushes'], 0)
+        self.assertGreater(abc['heap_pops'], 0)
+        self.assertGreater(abc['pop_empty_iterations'], 0)
+        self.assertEqual(abc['allocation_adjustments'], 2)
+        self.assertEqual(abc['latency']['place']['count'], 7)
+        self.assertEqual(abc['latency']['cancel']['count'], 0)
+        self.assertEqual(abc['latency']['execute']['count'], 1)
+
+        xyz = stats['symbols']['xyz']
+        self.assertEqual(xyz['latency']['cancel']['count'], 1)
+        self.assertEqual(xyz['auctions'], 0)
+
+        self.assertEqual(stats['total']['latency']['place']['count'], 9)
+        self.assertEqual(stats['total']['executions'], 5)
+
+    def test_reset(self):
+        market = Market(stats=True)
+        market.place(Order(Side.BUY, 'abc', 10, 100))
+        self.assertEqual(market.stats(reset=True)['total']['latency']['place']['count'], 1)
+        self.assertEqual(market.stats()['total']['latency']['place']['count'], 0)
+        self.assertEqual(market.stats()['total']['heap_pushes'], 0)
+
+    def test_product_stats(self):
+        product = Product('abc', stats=True)
+        product.execute_order(Side.BUY, 'abc', 10, 100)
+        self.assertEqual(product.stats()['latency']['execute']['count'], 1)
+        self.assertEqual(product.stats()['latency']['place']['count'], 1)
+
+    def test_fork_does_not_count(self):
+        market = Market(stats=True)
+        market.place(Order(Side.BUY, 'abc', 10, 100))
+        market.stats(reset=True)
+
+        fork = market.fork()
+        fork.execute(Order(Side.SELL, 'abc', 10, 100))
+        self.assertEqual(market.stats()['total']['executions'], 0)
+
+        market.execute(Order(Side.SELL, 'abc', 10, 100))
+        self.assertEqual(market.stats()['total']['executions'], 1)
+
+    def test_histogram(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        for value in [0, 1, 2, 3, 100, 1000]:
+            histogram.record(value)
+        self.assertEqual(histogram.count, 6)
+        self.assertEqual(histogram.max, 1000)
+        self.assertEqual(histogram.percentile(50), 3)
+        self.assertEqual(histogram.percentile(100), 1000)
+        self.assertEqual(histogram.snapshot()['buckets'], {0: 1, 1: 1, 3: 2, 127: 1, 1023: 1})
+
+if __name__ == '__main__':
+    unittest.main()
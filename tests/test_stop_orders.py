@@ -0,0 +1,168 @@
+from marketsim import Market, Product, Order, Side, State
+from marketsim.market import TriggerIndex
+import random
+import unittest
+
+class TestTriggerIndex(unittest.TestCase):
+    def test_release(self):
+        index = TriggerIndex()
+        index.push(Side.BUY, 105, 'b1')
+        index.push(Side.BUY, 103, 'b2')
+        index.push(Side.BUY, 103, 'b3')
+        index.push(Side.SELL, 95, 's1')
+        index.push(Side.SELL, 97, 's2')
+
+        self.assertEqual(index.release(100), [])
+        self.assertEqual(index.release(104), ['b2', 'b3'])
+        index.cancel('s2')
+        self.assertEqual(index.release(90), ['s1'])
+        self.assertEqual(index.release(110), ['b1'])
+        self.assertEqual(len(index), 0)
+
+    def test_random(self):
+        # Compare against a brute-force reference
+        rng = random.Random(0)
+        index = TriggerIndex()
+        reference = {}
+        for i in range(3000):
+            action = rng.random()
+            if action < 0.5:
+                side = rng.choice([Side.BUY, Side.SELL])
+                stop_price = rng.randint(90, 110)
+                index.push(side, stop_price, i)
+                reference[i] = (side, stop_price)
+            elif action < 0.8 and reference:
+                key = rng.choice(sorted(reference))
+                index.cancel(key)
+                del reference[key]
+            else:
+                price = rng.randint(90, 110)
+                released = [key for key, (side, stop_price) in reference.items() if index.triggered(side, stop_price, price)]
+                self.assertEqual(sorted(index.release(price)), sorted(released))
+                for key in released:
+                    del reference[key]
+            self.assertEqual(len(index), len(reference))
+
+class TestStopOrders(unittest.TestCase):
+    def trade(self, product, price, quantity=1):
+        product.place(Order(Side.SELL, 'abc', quantity, price))
+        return product.execute(Order(Side.BUY, 'abc', quantity, price))
+
+    def test_buy_stop(self):
+        product = Product('abc')
+        self.trade(product, 100)
+
+        product.place(Order(Side.SELL, 'abc', 10, 104, id='ask'))
+        entry = product.place(Order(Side.BUY, 'abc', 5, None, id='stop', stop_price=103))
+        self.assertEqual(entry.state, State.PENDING)
+        self.assertEqual(product.open_orders(), [product.entries['ask']])
+        self.assertEqual(product.stop_orders(), [entry])
+        self.assertIsNone(product.bid_price)
+
+        self.trade(product, 102)
+        self.assertEqual(product.entries['stop'].state, State.PENDING)
+
+        executions = self.trade(product, 103)
+        self.assertEqual(len(executions), 2)
+        self.assertEqual(executions[1].bid_fill.order_id, 'stop')
+        self.assertEqual(executions[1].price, 104)
+        self.assertEqual(product.entries['stop'].state, State.FULLY_FILLED)
+        self.assertEqual(product.last_price, 104)
+        self.assertEqual(product.stop_orders(), [])
+
+    def test_sell_stop_limit(self):
+        product = Product('abc')
+        self.trade(product, 100)
+
+        product.place(Order(Side.SELL, 'abc', 5, 95, id='stop', stop_price=98))
+        self.trade(product, 98)
+
+        entry = product.entries['stop']
+        self.assertEqual(entry.state, State.NEW)
+        self.assertEqual(product.ask_price, 95)
+        self.assertEqual(product.open_orders(Side.SELL), [entry])
+
+    def test_already_triggered(self):
+        product = Product('abc')
+        self.trade(product, 100)
+
+        entry = product.place(Order(Side.BUY, 'abc', 5, 101, stop_price=99))
+        self.assertEqual(entry.state, State.NEW)
+        self.assertEqual(product.bid_price, 101)
+
+    def test_cascade(self):
+        product = Product('abc')
+        self.trade(product, 100)
+
+        product.place(Order(Side.BUY, 'abc', 1, 90, id='bid1'))
+        product.place(Order(Side.BUY, 'abc', 1, 80, id='bid2'))
+        product.place(Order(Side.SELL, 'abc', 1, None, id='stop1', stop_price=95))
+        product.place(Order(Side.SELL, 'abc', 1, None, id='stop2', stop_price=90))
+        product.place(Order(Side.SELL, 'abc', 1, None, id='stop3', stop_price=70))
+
+        executions = self.trade(product, 95)
+        self.assertEqual([execution.price for execution in executions], [95, 90, 80])
+        self.assertEqual(product.entries['stop1'].state, State.FULLY_FILLED)
+        self.assertEqual(product.entries['stop2'].state, State.FULLY_FILLED)
+        self.assertEqual(product.entries['stop3'].state, State.PENDING)
+
+    def test_cancel(self):
+        product = Product('abc')
+        self.trade(product, 100)
+
+        product.place(Order(Side.BUY, 'abc', 5, None, id='stop1', stop_price=103, account='a'))
+        product.place(Order(Side.SELL, 'abc', 5, 90, id='stop2', stop_price=95, account='b'))
+        product.place(Order(Side.SELL, 'abc', 5, 80, id='stop3', stop_price=95, account='a'))
+
+        product.cancel(Order(id='stop1'))
+        self.assertEqual(product.entries['stop1'].state, State.CANCELLED)
+        with self.assertRaises(ValueError):
+            product.cancel(Order(id='stop1'))
+
+        self.assertEqual(product.cancel_all(account='a'), ['stop3'])
+        self.assertEqual(product.cancel_orders(['stop2']), ['stop2'])
+        self.assertEqual(product.stop_orders(), [])
+
+        executions = self.trade(product, 110) + self.trade(product, 80)
+        self.assertEqual(len(executions), 2)
+
+    def test_market(self):
+        market = Market()
+        market.execute(Order(Side.SELL, 'abc', 1, 100))
+        market.execute(Order(Side.BUY, 'abc', 1, 100))
+
+        market.place(Order(Side.SELL, 'abc', 5, 105, id='ask'))
+        market.place(Order(Side.BUY, 'abc', 5, None, id='stop', stop_price=101))
+        self.assertEqual(market.entries['stop'].state, State.PENDING)
+        with self.assertRaises(ValueError):
+            market.place(Order(Side.BUY, 'abc', 5, None, id='stop', stop_price=101))
+
+        fork = market.fork()
+        fork.place(Order(Side.SELL, 'abc', 1, 101))
+        fork.place(Order(Side.BUY, 'abc', 1, 101))
+        executions = fork.execute()
+        self.assertEqual([execution.price for execution in executions], [101, 105])
+        self.assertEqual(fork.entries['stop'].state, State.FULLY_FILLED)
+        self.assertEqual(market.entries['stop'].state, State.PENDING)
+
+        market.cancel(Order(id='stop'))
+        self.assertEqual(market.entries['stop'].state, State.CANCELLED)
+        self.assertEqual(fork.entries['stop'].state, State.FULLY_FILLED)
+
+    def test_events(self):
+        product = Product('abc')
+        self.trade(product, 100)
+
+        batches = []
+        product.subscribe(batches.extend)
+        product.place(Order(Side.SELL, 'abc', 5, 95, id='stop', stop_price=98))
+        product.flush()
+        self.assertEqual([(change.order_id, change.old_state, change.new_state) for change in batches[-1].state_changes], [('stop', None, State.PENDING)])
+        self.assertEqual(batches[-1].level_updates, [])
+
+        self.trade(product, 98)
+        changes = [(change.old_state, change.new_state) for change in batches[-1].state_changes if change.order_id == 'stop']
+        self.assertEqual(changes, [(State.PENDING, State.NEW)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+from marketsim import Market, Order, Side, State, TimeInForce
+from marketsim.timer_wheel import TimerWheel
+import random
+import unittest
+
+class TestTimerWheel(unittest.TestCase):
+    def test_advance(self):
+        wheel = TimerWheel(resolution=1.0, slots=4, levels=2)
+        wheel.advance(0)
+        wheel.schedule('a', 2.5)
+        wheel.schedule('b', 2.7)
+        wheel.schedule('c', 10)
+        wheel.schedule('d', 100)
+        self.assertEqual(len(wheel), 4)
+
+        self.assertEqual(wheel.advance(2.6), ['a'])
+        self.assertEqual(wheel.advance(2.6), [])
+        self.assertEqual(wheel.advance(9.9), ['b'])
+        wheel.cancel('c')
+        self.assertEqual(wheel.advance(99), [])
+        self.assertEqual(wheel.advance(1000), ['d'])
+        self.assertEqual(len(wheel), 0)
+
+        with self.assertRaises(ValueError):
+            wheel.advance(999)
+
+    def test_due(self):
+        wheel = TimerWheel()
+        wheel.advance(10)
+        wheel.schedule('a', 5)
+        self.assertEqual(wheel.advance(10), ['a'])
+
+    def test_random(self):
+        # Compare against a brute-force reference
+        rng = random.Random(0)
+        wheel = TimerWheel(resolution=0.5, slots=4, levels=3)
+        now = 0.0
+        reference = {}
+        for i in range(2000):
+            action = rng.random()
+            if action < 0.5:
+                time = now + rng.expovariate(1.0 / rng.choice([1, 10, 100, 1000]))
+                wheel.schedule(i, time)
+                reference[i] = time
+            elif action < 0.6 and reference:
+                key = rng.choice(sorted(reference))
+                wheel.cancel(key)
+                del reference[key]
+            else:
+                now += rng.expovariate(1.0 / rng.choice([0.3, 5, 50, 500]))
+                expired = [key for key, time in reference.items() if time <= now]
+                self.assertEqual(sorted(wheel.advance(now)), sorted(expired))
+                for key in expired:
+                    del reference[key]
+            self.assertEqual(len(wheel), len(reference))
+
+    def test_overflow_jump(self):
+        # Microsecond timestamps, a day apart, are far beyond the top level
+        steps = []
+        class CountingWheel(TimerWheel):
+            def next_tick(self, target):
+                steps.append(target)
+                return super().next_tick(target)
+
+        day = 86400 * 10 ** 6
+        wheel = CountingWheel()
+        wheel.advance(0)
+        for i in range(100):
+            wheel.schedule(i, (i + 1) * day)
+        wheel.cancel(50)
+        expired = []
+        for i in range(1, 101):
+            expired.extend(wheel.advance(i * day + 0.5))
+        self.assertEqual(expired, [i for i in range(100) if i != 50])
+        self.assertEqual(len(wheel), 0)
+        self.assertLess(len(steps), 1000)
+
+class TestTimeInForce(unittest.TestCase):
+    def test_order(self):
+        self.assertEqual(Order(Side.BUY, 'abc', 10, 100).tif, TimeInForce.GTC)
+        self.assertEqual(Order(Side.BUY, 'abc', 10, 100, tif='ioc').tif, TimeInForce.IOC)
+        self.assertEqual(Order(Side.BUY, 'abc', 10, 100, tif=0).tif, TimeInForce.DAY)
+        with self.assertRaises(ValueError):
+            Order(Side.BUY, 'abc', 10, 100, tif=TimeInForce.GTT)
+
+    def test_gtt(self):
+        market = Market()
+        market.advance_time(0)
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1, tif='gtt', expire_time=10))
+        market.place(Order(Side.BUY, 'abc', 10, 99, id=2, tif='gtt', expire_time=20))
+        market.place(Order(Side.BUY, 'abc', 10, 98, id=3))
+        market.place(Order(Side.SELL, 'abc', 5, 99, id=4, tif='gtt', expire_time=15))
+
+        self.assertEqual(market.advance_time(5), [])
+        self.assertEqual(market.advance_time(10), [1])
+        self.assertEqual(market.entries[1].state, State.CANCELLED)
+        self.assertEqual(market['abc'].bid_price, 99)
+
+        # Filled orders are skipped when they expire
+        market.execute()
+        self.assertEqual(market.entries[4].state, State.FULLY_FILLED)
+        self.assertEqual(market.advance_time(30), [2])
+        self.assertEqual(market['abc'].bid_price, 98)
+        self.assertEqual(market.now, 30)
+
+        with self.assertRaises(ValueError):
+            market.place(Order(Side.BUY, 'abc', 10, 100, id=5, tif='gtt', expire_time=30))
+
+    def test_timer_resolution(self):
+        market = Market(timer_resolution=1e-6, timer_slots=16, timer_levels=2)
+        market.advance_time(0)
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1, tif='gtt', expire_time=0.000002))
+        market.place(Order(Side.BUY, 'abc', 10, 99, id=2, tif='gtt', expire_time=3600.0))
+        self.assertEqual(market.advance_time(0.000001), [])
+        self.assertEqual(market.advance_time(0.000002), [1])
+        self.assertEqual(market.advance_time(3599.999999), [])
+        self.assertEqual(market.advance_time(3600.0), [2])
+        self.assertEqual(market.fork().now, 3600.0)
+
+    def test_day(self):
+        market = Market()
+        with self.assertRaises(ValueError):
+            market.place(Order(Side.BUY, 'abc', 10, 100, id=1, tif='day'))
+        self.assertNotIn(1, market.entries)
+
+        market.session_end = 100
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1, tif='day'))
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=2))
+        self.assertEqual(market.end_session(200), [1])
+        self.assertEqual(market.session_end, 200)
+        self.assertEqual([entry.order_id for entry in market.open_orders()], [2])
+
+    def test_ioc(self):
+        market = Market()
+        market.place(Order(Side.SELL, 'abc', 10, 100, id=1))
+        executions = market.execute(Order(Side.BUY, 'abc', 15, 100, id=2, tif='ioc'))
+        self.assertEqual([execution.quantity for execution in executions], [10])
+        self.assertEqual(market.entries[2].state, State.CANCELLED)
+        self.assertEqual(market['abc'].bid_price, None)
+        self.assertEqual(market['abc'][Side.BUY].volume, 0)
+
+    def test_ioc_auction(self):
+        market = Market()
+        market.place(Order(Side.BUY, 'abc', 10, 99, id=1, tif='ioc'))
+        market.place(Order(Side.SELL, 'abc', 10, 100, id=2))
+        self.assertEqual(market.execute(), [])
+        self.assertEqual(market.entries[1].state, State.CANCELLED)
+        self.assertEqual(market.entries[2].state, State.NEW)
+
+    def test_fork(self):
+        market = Market()
+        market.advance_time(0)
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1, tif='gtt', expire_time=10))
+        fork = market.fork()
+        self.assertEqual(fork.advance_time(10), [1])
+        self.assertEqual(market.entries[1].state, State.NEW)
+        self.assertEqual(market.advance_time(10), [1])
+
+if __name__ == '__main__':
+    unittest.main()
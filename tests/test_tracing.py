@@ -0,0 +1,53 @@
+from marketsim import Market, Order, Side, Stage, TraceRecorder
+import unittest
+
+class TestTracing(unittest.TestCase):
+    def test_place(self):
+        tracer = TraceRecorder()
+        market = Market(tracer=tracer)
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=1))
+        market.place(Order(Side.BUY, 'abc', 10, 100, id=2))
+
+        stages = tracer.by_order()
+        self.assertEqual([stage for stage, _ in stages[1]], [Stage.ORDER_RECEIVED, Stage.LEVEL_CREATED, Stage.ENTRY_QUEUED])
+        self.assertEqual([stage for stage, _ in stages[2]], [Stage.ORDER_RECEIVED, Stage.ENTRY_QUEUED])
+
+        timestamps = [timestamp for _, timestamp, _ in tracer.events]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_execute(self):
+        tracer = TraceRecorder()
+        market = Market()
+        market.place(Order(Side.SELL, 'abc', 10, 100, time=0, id=1))
+        market.place(Order(Side.SELL, 'abc', 10, 101, time=0, id=2))
+        market.tracer = tracer
+
+        market.execute(Order(Side.BUY, 'abc', 15, 101, time=0, id=3))
+
+        stages = tracer.by_order()
+        self.assertEqual([stage for stage, _ in stages[1]], [Stage.ALLOCATION_DONE, Stage.LEVEL_POPPED, Stage.EXECUTION_EMITTED])
+        self.assertEqual([stage for stage, _ in stages[2]], [Stage.ALLOCATION_DONE, Stage.EXECUTION_EMITTED])
+        self.assertEqual([stage for stage, _ in stages[3]], [
+            Stage.ORDER_RECEIVED, Stage.LEVEL_CREATED, Stage.ENTRY_QUEUED,
+            Stage.ALLOCATION_DONE, Stage.ALLOCATION_DONE, Stage.LEVEL_POPPED,
+            Stage.EXECUTION_EMITTED, Stage.EXECUTION_EMITTED,
+        ])
+
+        durations = tracer.durations(Stage.ORDER_RECEIVED, Stage.EXECUTION_EMITTED)
+        self.assertEqual(list(durations), [3])
+        self.assertGreaterEqual(durations[3], 0)
+
+    def test_fork(self):
+        tracer = TraceRecorder()
+        market = Market(tracer=tracer)
+        market.place(Order(Side.SELL, 'abc', 10, 100, id=1))
+
+        fork = market.fork()
+        fork.execute(Order(Side.BUY, 'abc', 10, 100, id=2))
+        self.assertEqual(len(tracer), 3)
+
+        market.place(Order(Side.SELL, 'abc', 10, 100, id=3))
+        self.assertEqual(len(tracer), 5)
+
+if __name__ == '__main__':
+    unittest.main()